@@ -0,0 +1,235 @@
+"""In-memory chart-of-accounts resolver for names produced by the LLM.
+
+Each tenant gets an ``AccountResolver`` holding exact, normalized, code,
+alias and character bigram indexes over its accounts. Resolvers are cached
+per key and must be invalidated whenever the chart changes.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .settings import settings
+
+
+# Common shorthand -> canonical account name. Only applied when the canonical
+# account exists in the tenant's chart.
+DEFAULT_ALIASES: Dict[str, str] = {
+    "交通費": "旅費交通費",
+    "旅費": "旅費交通費",
+    "電車代": "旅費交通費",
+    "タクシー代": "旅費交通費",
+    "交際費": "接待交際費",
+    "接待費": "接待交際費",
+    "消耗品": "消耗品費",
+    "事務用品費": "消耗品費",
+    "電話代": "通信費",
+    "切手代": "通信費",
+    "家賃": "地代家賃",
+    "電気代": "水道光熱費",
+    "ガス代": "水道光熱費",
+    "水道代": "水道光熱費",
+    "光熱費": "水道光熱費",
+    "手数料": "支払手数料",
+    "振込手数料": "支払手数料",
+    "書籍代": "新聞図書費",
+    "図書費": "新聞図書費",
+    "売上": "売上高",
+    "仕入": "仕入高",
+    "預金": "普通預金",
+}
+
+_STRIP_RE = re.compile(r"[\s　・･\-‐―()（）\[\]［］「」『』【】<>＜＞.,、。:：;；/／_'\"]+")
+_CODE_PREFIX_RE = re.compile(r"^\s*([0-9A-Za-z]+)[\s:：\-]+(.+)$")
+
+
+def normalize_name(text: str | None) -> str:
+    """NFKC-fold, lowercase and drop whitespace/punctuation."""
+    if not text:
+        return ""
+    s = unicodedata.normalize("NFKC", text).lower()
+    s = _STRIP_RE.sub("", s)
+    if s.endswith("勘定") and len(s) > 2:
+        s = s[:-2]
+    return s
+
+
+def char_ngrams(text: str, n: int = 2) -> Set[str]:
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+@dataclass(frozen=True)
+class AccountMatch:
+    account_id: int
+    code: str
+    name: str
+    score: float
+    method: str  # exact / normalized / code / alias / ngram
+
+
+# (id, code, name, aliases) as loaded from an accounts table
+AccountRow = Tuple[int, str, str, Optional[str]]
+
+
+class AccountResolver:
+    def __init__(self, rows: Iterable[AccountRow], aliases: Optional[Dict[str, str]] = None) -> None:
+        self._accounts: Dict[int, Tuple[str, str]] = {}
+        self._exact: Dict[str, int] = {}
+        self._normalized: Dict[str, int] = {}
+        self._codes: Dict[str, int] = {}
+        self._aliases: Dict[str, int] = {}
+        self._grams: Dict[str, Set[int]] = defaultdict(set)
+        self._gram_sizes: Dict[int, int] = {}
+
+        for account_id, code, name, extra in rows:
+            if not name:
+                continue
+            self._accounts[account_id] = (code or "", name)
+            self._exact.setdefault(name, account_id)
+            norm = normalize_name(name)
+            self._normalized.setdefault(norm, account_id)
+            if code:
+                self._codes.setdefault(normalize_name(code), account_id)
+            grams = char_ngrams(norm)
+            self._gram_sizes[account_id] = len(grams)
+            for g in grams:
+                self._grams[g].add(account_id)
+            for alias in (extra or "").split(","):
+                alias_norm = normalize_name(alias)
+                if alias_norm:
+                    self._aliases.setdefault(alias_norm, account_id)
+
+        for alias, target in (DEFAULT_ALIASES if aliases is None else aliases).items():
+            target_id = self._normalized.get(normalize_name(target))
+            alias_norm = normalize_name(alias)
+            if target_id is not None and alias_norm not in self._normalized:
+                self._aliases.setdefault(alias_norm, target_id)
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def _match(self, account_id: int, score: float, method: str) -> AccountMatch:
+        code, name = self._accounts[account_id]
+        return AccountMatch(account_id=account_id, code=code, name=name, score=score, method=method)
+
+    def resolve(self, text: str | None, min_score: Optional[float] = None) -> Optional[AccountMatch]:
+        """Return the best matching account for ``text`` or None below ``min_score``."""
+        if not text or not self._accounts:
+            return None
+        threshold = settings.account_match_min_score if min_score is None else min_score
+
+        account_id = self._exact.get(text)
+        if account_id is not None:
+            return self._match(account_id, 1.0, "exact")
+        norm = normalize_name(text)
+        if not norm:
+            return None
+        account_id = self._normalized.get(norm)
+        if account_id is not None:
+            return self._match(account_id, 0.98, "normalized")
+
+        # "601 旅費交通費" or a bare code
+        m = _CODE_PREFIX_RE.match(unicodedata.normalize("NFKC", text))
+        if m:
+            named = self._normalized.get(normalize_name(m.group(2)))
+            if named is not None:
+                return self._match(named, 0.97, "code")
+        account_id = self._codes.get(norm)
+        if account_id is not None:
+            return self._match(account_id, 0.97, "code")
+
+        account_id = self._aliases.get(norm)
+        if account_id is not None:
+            return self._match(account_id, 0.95, "alias")
+
+        best = self._best_ngram(norm)
+        if best is None or best[1] < threshold:
+            return None
+        return self._match(best[0], round(best[1], 4), "ngram")
+
+    def _best_ngram(self, norm: str) -> Optional[Tuple[int, float]]:
+        grams = char_ngrams(norm)
+        if not grams:
+            return None
+        shared: Dict[int, int] = defaultdict(int)
+        for g in grams:
+            for account_id in self._grams.get(g, ()):
+                shared[account_id] += 1
+        best: Optional[Tuple[int, float]] = None
+        for account_id, count in shared.items():
+            # Dice coefficient over character bigrams
+            score = 2.0 * count / (len(grams) + self._gram_sizes[account_id])
+            if best is None or score > best[1] or (
+                score == best[1] and len(self._accounts[account_id][1]) < len(self._accounts[best[0]][1])
+            ):
+                best = (account_id, score)
+        return best
+
+
+_resolvers: Dict[str, AccountResolver] = {}
+# Bumped by invalidate_resolver, so a build that raced an invalidation is not cached
+_generations: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _load_client_accounts(client_code: str) -> List[AccountRow]:
+    from .db_manager import get_session_for_client
+    from .models_account import Account
+
+    db = get_session_for_client(client_code)
+    try:
+        return [(a.id, a.code, a.name, a.aliases) for a in db.query(Account).all()]
+    finally:
+        db.close()
+
+
+def get_resolver(key: str, loader: Optional[Callable[[], Iterable[AccountRow]]] = None) -> AccountResolver:
+    """Return the cached resolver for ``key`` (a client code), building it on first use."""
+    with _lock:
+        resolver = _resolvers.get(key)
+        generation = _generations.get(key, 0)
+    if resolver is not None:
+        return resolver
+    rows = loader() if loader is not None else _load_client_accounts(key)
+    resolver = AccountResolver(rows)
+    with _lock:
+        if _generations.get(key, 0) == generation:
+            _resolvers[key] = resolver
+    return resolver
+
+
+def invalidate_resolver(key: str) -> None:
+    with _lock:
+        _resolvers.pop(key, None)
+        _generations[key] = _generations.get(key, 0) + 1
+
+
+def validate_accounts(client_code: str, result: Dict) -> Dict:
+    """Map LLM account names onto the tenant chart and flag whether they are usable.
+
+    Tenants without a chart of accounts keep the LLM names untouched.
+    """
+    resolver = get_resolver(client_code)
+    if not len(resolver):
+        result["accounts_valid"] = bool(result.get("debit_account") and result.get("credit_account"))
+        return result
+    debit = resolver.resolve(result.get("debit_account"))
+    credit = resolver.resolve(result.get("credit_account"))
+    result["debit_account_id"] = debit.account_id if debit else None
+    result["credit_account_id"] = credit.account_id if credit else None
+    if debit:
+        result["debit_account"] = debit.name
+    if credit:
+        result["credit_account"] = credit.name
+    result["account_match"] = {
+        "debit": debit.score if debit else 0.0,
+        "credit": credit.score if credit else 0.0,
+    }
+    result["accounts_valid"] = bool(debit and credit)
+    return result
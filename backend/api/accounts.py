@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from typing import List
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from pydantic import BaseModel
+
+from ..account_resolver import get_resolver, invalidate_resolver
+from ..db_manager import get_client_by_key, get_session_for_client
+from ..models_account import Account
+from ..read_model import account_rows
+from .responses import FastJSONResponse, conditional_list
+
+
+router = APIRouter(prefix="/api/accounts", tags=["accounts"])
+
+
+class AccountCreate(BaseModel):
+    code: str
+    name: str
+    type: str | None = None
+    aliases: str | None = None
+
+
+class AccountRead(AccountCreate):
+    id: int
+
+
+class AccountResolveRead(BaseModel):
+    query: str
+    account_id: int | None = None
+    code: str | None = None
+    name: str | None = None
+    score: float = 0.0
+    method: str | None = None
+
+
+def _client_code(x_client_key: str) -> str:
+    client = get_client_by_key(x_client_key)
+    if not client:
+        raise HTTPException(status_code=401, detail="Invalid client key")
+    return client.code
+
+
+@router.get("/", response_model=List[AccountRead], response_class=FastJSONResponse)
+def list_accounts(request: Request, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    return conditional_list(request, code, ("accounts",), lambda: account_rows(code))
+
+
+@router.post("/", response_model=AccountRead)
+def create_account(payload: AccountCreate, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    db = get_session_for_client(code)
+    try:
+        if db.query(Account).filter(Account.code == payload.code).first():
+            raise HTTPException(status_code=400, detail="Account code already exists")
+        a = Account(code=payload.code, name=payload.name, type=payload.type, aliases=payload.aliases)
+        db.add(a)
+        db.commit()
+        db.refresh(a)
+        invalidate_resolver(code)
+        return AccountRead(id=a.id, code=a.code, name=a.name, type=a.type, aliases=a.aliases)
+    finally:
+        db.close()
+
+
+@router.delete("/{account_id}")
+def delete_account(account_id: int, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    db = get_session_for_client(code)
+    try:
+        a = db.get(Account, account_id)
+        if not a:
+            raise HTTPException(status_code=404, detail="Account not found")
+        db.delete(a)
+        db.commit()
+        invalidate_resolver(code)
+        return {"status": "deleted"}
+    finally:
+        db.close()
+
+
+@router.get("/resolve", response_model=AccountResolveRead)
+def resolve_account(q: str, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    match = get_resolver(code).resolve(q)
+    if not match:
+        return AccountResolveRead(query=q)
+    return AccountResolveRead(
+        query=q,
+        account_id=match.account_id,
+        code=match.code,
+        name=match.name,
+        score=match.score,
+        method=match.method,
+    )
@@ -0,0 +1,72 @@
+"""Office-wide views across every client DB."""
+from __future__ import annotations
+
+import json
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..db_manager import get_master_session
+from ..fanout import OK, QUERIES, cached, default_params, run_query, stream_query
+from ..models_client import Client
+from .admin_auth import require_admin
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+# Revenue window bound; far larger values would run the start month before year 1
+MAX_MONTHS = 120
+
+
+def _count(rows) -> int:
+    return rows[0]["count"] if rows else 0
+
+
+@router.get("/dashboard")
+async def dashboard(months: int = Query(12, ge=1, le=MAX_MONTHS)):
+    """Per-client review backlog and monthly revenue, served from a short-lived cache."""
+    params = default_params(months)
+    hit = cached("dashboard", params)
+    results = hit if hit is not None else await run_in_threadpool(run_query, "dashboard", params)
+    with get_master_session() as s:
+        names = dict(s.query(Client.code, Client.name))
+    clients = []
+    for r in sorted(results, key=lambda r: r.client_code):
+        row = {"client_code": r.client_code, "name": names.get(r.client_code), "status": r.status}
+        if r.status == OK:
+            row.update(
+                unreviewed=_count(r.data["unreviewed"]),
+                low_confidence=_count(r.data["low_confidence"]),
+                monthly_revenue={m["month"]: m["revenue"] for m in r.data["monthly_revenue"]},
+            )
+        elif r.error:
+            row["error"] = r.error
+        clients.append(row)
+    ok = [c for c in clients if c["status"] == OK]
+    return {
+        "generated_at": datetime.utcnow().isoformat(),
+        "cached": hit is not None,
+        "totals": {
+            "clients": len(clients),
+            "unreviewed": sum(c["unreviewed"] for c in ok),
+            "low_confidence": sum(c["low_confidence"] for c in ok),
+        },
+        "incomplete": [c["client_code"] for c in clients if c["status"] != OK],
+        "clients": clients,
+    }
+
+
+@router.get("/fanout/{name}")
+def fanout_query(name: str, months: int = Query(12, ge=1, le=MAX_MONTHS)):
+    """NDJSON, one line per client in completion order."""
+    if name not in QUERIES:
+        raise HTTPException(status_code=404, detail=f"Unknown query: {name}")
+    params = default_params(months)
+
+    def lines():
+        for r in stream_query(name, params):
+            yield json.dumps(r.as_dict(), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,26 @@
+"""Access check for the office-wide endpoints (dashboard, backups, maintenance).
+
+With ``ADMIN_API_KEY`` set, requests must send it as ``X-Admin-Key``. Without
+it the endpoints only answer requests from the local machine.
+"""
+from __future__ import annotations
+
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException, Request
+
+from ..settings import settings
+
+
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def require_admin(request: Request, x_admin_key: Optional[str] = Header(None)) -> None:
+    if settings.admin_api_key:
+        if not x_admin_key or not hmac.compare_digest(x_admin_key, settings.admin_api_key):
+            raise HTTPException(status_code=401, detail="Invalid admin key")
+        return
+    host = request.client.host if request.client else None
+    if host not in LOOPBACK_HOSTS:
+        raise HTTPException(status_code=403, detail="Admin endpoints are only available from localhost")
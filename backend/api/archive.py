@@ -0,0 +1,42 @@
+"""Fiscal-year archive partitions of a tenant."""
+from __future__ import annotations
+
+from fastapi import APIRouter, Header, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from ..archive import ArchiveError, archive_fiscal_year, partitions
+from ..db_manager import get_client_by_key
+
+
+router = APIRouter(prefix="/api/archive", tags=["archive"])
+
+
+def _client_code(x_client_key: str) -> str:
+    client = get_client_by_key(x_client_key)
+    if not client:
+        raise HTTPException(status_code=401, detail="Invalid client key")
+    return client.code
+
+
+@router.get("/")
+def list_partitions(x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    return [
+        {
+            "fiscal_year": p.fiscal_year,
+            "start_date": p.start_date.isoformat(),
+            "end_date": p.end_date.isoformat(),
+            "entry_count": p.entry_count,
+            "correction_count": p.correction_count,
+        }
+        for p in partitions(code)
+    ]
+
+
+@router.post("/{fiscal_year}")
+async def archive_year(fiscal_year: int, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    try:
+        return await run_in_threadpool(archive_fiscal_year, code, fiscal_year)
+    except ArchiveError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
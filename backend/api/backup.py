@@ -0,0 +1,44 @@
+"""Backup snapshots: listing, on-demand runs and verification.
+
+Restores are deliberately not exposed over HTTP; use ``python -m backend.backup restore``.
+"""
+from __future__ import annotations
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from ..backup import BackupError, list_snapshots, run_backup, verify_snapshot
+from .admin_auth import require_admin
+
+
+router = APIRouter(prefix="/api/backups", tags=["backups"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/")
+def list_backups():
+    return [
+        {
+            "id": s["id"],
+            "created_at": s.get("created_at"),
+            "finished_at": s.get("finished_at"),
+            "ok": s.get("ok"),
+            "files": {n: {"size": f["size"], "gz_size": f["gz_size"]} for n, f in s["files"].items()},
+            "errors": s.get("errors") or {},
+            "verification": s.get("verification"),
+        }
+        for s in list_snapshots()
+    ]
+
+
+@router.post("/run", status_code=202)
+def trigger(background: BackgroundTasks):
+    background.add_task(run_backup)
+    return {"status": "scheduled"}
+
+
+@router.post("/{snapshot_id}/verify")
+async def verify(snapshot_id: str):
+    try:
+        return await run_in_threadpool(verify_snapshot, snapshot_id)
+    except BackupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
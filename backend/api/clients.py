@@ -17,6 +17,8 @@ class ClientCreate(BaseModel):
     name: str
     code: str
     base_folder: str | None = None
+    scan_min_seconds: int | None = None
+    scan_max_seconds: int | None = None
 
 
 class ClientRead(BaseModel):
@@ -25,6 +27,25 @@ class ClientRead(BaseModel):
     code: str
     base_folder: str | None
     api_key: str | None
+    scan_min_seconds: int | None = None
+    scan_max_seconds: int | None = None
+
+
+class ScanScheduleUpdate(BaseModel):
+    scan_min_seconds: int | None = None
+    scan_max_seconds: int | None = None
+
+
+def _client_read(c: Client) -> ClientRead:
+    return ClientRead(id=c.id, name=c.name, code=c.code, base_folder=c.base_folder, api_key=c.api_key,
+                      scan_min_seconds=c.scan_min_seconds, scan_max_seconds=c.scan_max_seconds)
+
+
+def _check_bounds(lo: int | None, hi: int | None) -> None:
+    if (lo is not None and lo <= 0) or (hi is not None and hi <= 0):
+        raise HTTPException(status_code=400, detail="Scan intervals must be positive")
+    if lo is not None and hi is not None and lo > hi:
+        raise HTTPException(status_code=400, detail="scan_min_seconds exceeds scan_max_seconds")
 
 
 @router.post("/", response_model=ClientRead)
@@ -33,19 +54,36 @@ def create_client(payload: ClientCreate):
         existing = s.query(Client).filter(Client.code == payload.code).first()
         if existing:
             raise HTTPException(status_code=400, detail="Client code exists")
+        _check_bounds(payload.scan_min_seconds, payload.scan_max_seconds)
         api_key = secrets.token_urlsafe(24)
-        c = Client(name=payload.name, code=payload.code, base_folder=payload.base_folder, api_key=api_key)
+        c = Client(name=payload.name, code=payload.code, base_folder=payload.base_folder, api_key=api_key,
+                   scan_min_seconds=payload.scan_min_seconds, scan_max_seconds=payload.scan_max_seconds)
         s.add(c)
         s.commit()
         s.refresh(c)
-        return ClientRead(id=c.id, name=c.name, code=c.code, base_folder=c.base_folder, api_key=c.api_key)
+        return _client_read(c)
 
 
 @router.get("/", response_model=List[ClientRead])
 def list_clients():
     with get_master_session() as s:
         rows = s.query(Client).order_by(Client.code).all()
-        return [ClientRead(id=c.id, name=c.name, code=c.code, base_folder=c.base_folder, api_key=c.api_key) for c in rows]
+        return [_client_read(c) for c in rows]
+
+
+@router.patch("/{client_code}/schedule", response_model=ClientRead)
+def update_scan_schedule(client_code: str, payload: ScanScheduleUpdate):
+    """Set the client's adaptive scan bounds; null restores the defaults. Applied within a minute."""
+    _check_bounds(payload.scan_min_seconds, payload.scan_max_seconds)
+    with get_master_session() as s:
+        c = s.query(Client).filter(Client.code == client_code).first()
+        if not c:
+            raise HTTPException(status_code=404, detail="Client not found")
+        c.scan_min_seconds = payload.scan_min_seconds
+        c.scan_max_seconds = payload.scan_max_seconds
+        s.commit()
+        s.refresh(c)
+        return _client_read(c)
 
 
 @router.delete("/{client_code}")
@@ -0,0 +1,57 @@
+"""Document download API backed by the per-tenant content-addressed store."""
+from __future__ import annotations
+
+import re
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+
+from ..db_manager import get_client_by_key
+from ..document_store import DocumentStore
+
+
+router = APIRouter(prefix="/api/documents", tags=["documents"])
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _store(x_client_key: str) -> DocumentStore:
+    client = get_client_by_key(x_client_key)
+    if not client:
+        raise HTTPException(status_code=401, detail="Invalid client key")
+    return DocumentStore(client.code)
+
+
+@router.head("/{sha256}")
+@router.get("/{sha256}")
+def download_document(sha256: str, x_client_key: str = Header(...), range: str | None = Header(default=None)):
+    store = _store(x_client_key)
+    if not store.exists(sha256):
+        raise HTTPException(status_code=404, detail="Document not found")
+    size = store.path_for(sha256).stat().st_size
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{sha256}"',
+        "Cache-Control": "private, max-age=31536000, immutable",
+    }
+    media_type = store.media_type(sha256)
+
+    if range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(store.iter_range(sha256), media_type=media_type, headers=headers)
+
+    m = _RANGE_RE.match(range.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        raise HTTPException(status_code=416, detail="Invalid range", headers={"Content-Range": f"bytes */{size}"})
+    if m.group(1):
+        start = int(m.group(1))
+        end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    else:
+        # suffix range: last N bytes
+        start = max(size - int(m.group(2)), 0)
+        end = size - 1
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(store.iter_range(sha256, start, end), status_code=206, media_type=media_type, headers=headers)
@@ -0,0 +1,127 @@
+"""``Idempotency-Key`` support for tenant writes.
+
+A POST or PATCH carrying both ``Idempotency-Key`` and ``X-Client-Key`` runs
+once per key and tenant (see :mod:`backend.idempotency`); retries get the
+stored response with ``Idempotent-Replayed: true``. Reusing a key for a
+different request body is rejected with 422, and a retry that arrives while
+the first request is still running gets 409 with ``Retry-After``. 5xx
+responses are not stored, so the retry runs again.
+
+Multipart bodies are not fingerprinted because HTTP clients pick a new
+boundary for every attempt; for uploads the key alone identifies the request.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Callable, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .. import idempotency
+from ..db_manager import get_client_by_key
+
+
+METHODS = ("POST", "PATCH")
+MAX_KEY_LENGTH = 255
+
+
+async def _send_json(send: Send, status: int, detail: str, extra: Optional[List[tuple]] = None) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *(extra or []),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp, client_lookup: Callable[[str], Any] = get_client_by_key) -> None:
+        # client_lookup maps X-Client-Key to an object with ``code``; the legacy app passes its own registry
+        self.app = app
+        self.client_lookup = client_lookup
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        token, client_key = headers.get("idempotency-key"), headers.get("x-client-key")
+        if not token or not client_key:
+            await self.app(scope, receive, send)
+            return
+        if len(token) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key longer than {MAX_KEY_LENGTH} characters")
+            return
+        client = await run_in_threadpool(self.client_lookup, client_key)
+        if client is None:
+            # The endpoint answers 401
+            await self.app(scope, receive, send)
+            return
+
+        code = client.code
+        key = f"{scope['method']} {scope['path']} {token}"
+        fingerprint = hashlib.sha256(scope.get("query_string", b""))
+        hash_body = not headers.get("content-type", "").startswith("multipart/")
+        state, stored = await run_in_threadpool(idempotency.claim, code, key)
+
+        if state == idempotency.PENDING:
+            await _send_json(send, 409, "A request with this Idempotency-Key is still in progress",
+                             [(b"retry-after", b"1")])
+            return
+        if state == idempotency.DONE:
+            while True:
+                message = await receive()
+                if message["type"] != "http.request":
+                    return
+                if hash_body:
+                    fingerprint.update(message.get("body", b""))
+                if not message.get("more_body", False):
+                    break
+            if stored.fingerprint is not None and stored.fingerprint != fingerprint.hexdigest():
+                await _send_json(send, 422, "Idempotency-Key was already used for a different request")
+                return
+            replay = [(b"content-length", str(len(stored.body)).encode()), (b"idempotent-replayed", b"true")]
+            if stored.content_type:
+                replay.append((b"content-type", stored.content_type.encode()))
+            await send({"type": "http.response.start", "status": stored.status_code, "headers": replay})
+            await send({"type": "http.response.body", "body": stored.body})
+            return
+
+        status = 500
+        content_type: Optional[str] = None
+        chunks: List[bytes] = []
+        body_read = False
+
+        async def hashing_receive() -> Message:
+            nonlocal body_read
+            message = await receive()
+            if message["type"] == "http.request":
+                if hash_body:
+                    fingerprint.update(message.get("body", b""))
+                body_read = not message.get("more_body", False)
+            return message
+
+        async def recording_send(message: Message) -> None:
+            nonlocal status, content_type
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = Headers(raw=message["headers"]).get("content-type")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, hashing_receive, recording_send)
+        except BaseException:
+            await run_in_threadpool(idempotency.release, code, key)
+            raise
+        if status >= 500:
+            await run_in_threadpool(idempotency.release, code, key)
+            return
+        # An endpoint that answered before reading the whole body (e.g. a validation error) leaves
+        # nothing to compare retries against
+        response = idempotency.StoredResponse(fingerprint.hexdigest() if body_read else None, status, content_type,
+                                              b"".join(chunks))
+        await run_in_threadpool(idempotency.complete, code, key, response)
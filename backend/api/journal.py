@@ -1,18 +1,28 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Any, List
+from typing import Any, AsyncIterator, List
 
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from ..archive import archived_year_for
 from ..auto_journal import record_correction
 from ..db_manager import get_client_by_key, get_session_for_client
+from .. import journal_events
+from ..duplicate_index import get_duplicate_index
 from ..models_journal import JournalEntry
+from ..read_model import dumps, journal_rows
+from ..txn_classifier import invalidate_vendor_classifier
+from .responses import FastJSONResponse, conditional_list
 
 
 router = APIRouter(prefix="/api/journal", tags=["journal"])
 
+# Writes to these tables change the journal list's ETag
+JOURNAL_TABLES = ("journal_entries", "correction_history")
+
 
 class JournalCreate(BaseModel):
     date: date
@@ -20,6 +30,7 @@ class JournalCreate(BaseModel):
     amount: float
     debit_account: str
     credit_account: str
+    tax_type: str | None = None  # 税区分, e.g. 課税売上10%, 課税仕入8%(軽), 非課税
 
 
 class JournalRead(BaseModel):
@@ -33,33 +44,24 @@ class JournalRead(BaseModel):
     ai_reason: str | None = None
     reviewed: bool
     pdf_path: str | None = None
+    document_sha256: str | None = None
+    tax_type: str | None = None
+    duplicate_of: List[int] = []
+
 
+@router.get("/", response_model=List[JournalRead], response_class=FastJSONResponse)
+def list_entries(request: Request, date_from: date | None = None, date_to: date | None = None,
+                 x_client_key: str = Header(...)):
+    """Active entries; with a date range, archived fiscal years in that range are included.
 
-@router.get("/", response_model=List[JournalRead])
-def list_entries(x_client_key: str = Header(...)):
+    JSON by default; ``Accept: application/msgpack`` or ``application/x-ndjson`` for bulk transfers.
+    Send the last ``ETag`` back as ``If-None-Match`` to get a 304 while nothing was written.
+    """
     client = get_client_by_key(x_client_key)
     if not client:
         raise HTTPException(status_code=401, detail="Invalid client key")
-    db = get_session_for_client(client.code)
-    try:
-        rows = db.query(JournalEntry).order_by(JournalEntry.id.desc()).all()
-        return [
-            JournalRead(
-                id=r.id,
-                date=r.date,
-                summary=r.summary,
-                amount=r.amount,
-                debit_account=r.debit_account,
-                credit_account=r.credit_account,
-                confidence=r.confidence,
-                ai_reason=r.ai_reason,
-                reviewed=bool(r.reviewed),
-                pdf_path=r.pdf_path,
-            )
-            for r in rows
-        ]
-    finally:
-        db.close()
+    # Returned as a Response so FastAPI skips per-row validation; the records already match JournalRead
+    return conditional_list(request, client.code, JOURNAL_TABLES, lambda: journal_rows(client.code, date_from, date_to))
 
 
 @router.post("/", response_model=JournalRead)
@@ -67,6 +69,11 @@ def create_entry(payload: JournalCreate, x_client_key: str = Header(...)):
     client = get_client_by_key(x_client_key)
     if not client:
         raise HTTPException(status_code=401, detail="Invalid client key")
+    archived = archived_year_for(client.code, payload.date)
+    if archived is not None:
+        raise HTTPException(status_code=409, detail=f"Fiscal year {archived} is archived and read-only")
+    index = get_duplicate_index(client.code)
+    duplicate_of = index.find(payload.date, payload.amount, payload.summary)
     db = get_session_for_client(client.code)
     try:
         r = JournalEntry(
@@ -75,11 +82,13 @@ def create_entry(payload: JournalCreate, x_client_key: str = Header(...)):
             amount=payload.amount,
             debit_account=payload.debit_account,
             credit_account=payload.credit_account,
+            tax_type=payload.tax_type,
             reviewed=False,
         )
         db.add(r)
         db.commit()
         db.refresh(r)
+        index.add(r.id, r.date, r.amount, r.summary)
         return JournalRead(
             id=r.id,
             date=r.date,
@@ -91,11 +100,62 @@ def create_entry(payload: JournalCreate, x_client_key: str = Header(...)):
             ai_reason=r.ai_reason,
             reviewed=bool(r.reviewed),
             pdf_path=r.pdf_path,
+            document_sha256=r.document_sha256,
+            tax_type=r.tax_type,
+            duplicate_of=duplicate_of,
         )
     finally:
         db.close()
 
 
+class DuplicateCluster(BaseModel):
+    amount: float
+    entries: List[JournalRead]
+
+
+@router.get("/duplicates", response_model=List[DuplicateCluster])
+def list_duplicates(window_days: int | None = None, x_client_key: str = Header(...)):
+    """Clusters of entries with the same amount, close dates and similar vendors."""
+    client = get_client_by_key(x_client_key)
+    if not client:
+        raise HTTPException(status_code=401, detail="Invalid client key")
+    clusters = get_duplicate_index(client.code).clusters(window_days)
+    ids = [i for c in clusters for i in c]
+    db = get_session_for_client(client.code)
+    try:
+        rows = {}
+        for start in range(0, len(ids), 500):
+            for r in db.query(JournalEntry).filter(JournalEntry.id.in_(ids[start:start + 500])):
+                rows[r.id] = r
+        out = []
+        for cluster in clusters:
+            members = [rows[i] for i in cluster if i in rows]
+            if len(members) < 2:
+                continue
+            out.append(DuplicateCluster(
+                amount=members[0].amount,
+                entries=[
+                    JournalRead(
+                        id=r.id,
+                        date=r.date,
+                        summary=r.summary,
+                        amount=r.amount,
+                        debit_account=r.debit_account,
+                        credit_account=r.credit_account,
+                        confidence=r.confidence,
+                        ai_reason=r.ai_reason,
+                        reviewed=bool(r.reviewed),
+                        pdf_path=r.pdf_path,
+                        document_sha256=r.document_sha256,
+                    )
+                    for r in members
+                ],
+            ))
+        return out
+    finally:
+        db.close()
+
+
 class CorrectionPayload(BaseModel):
     entry_id: int
     new_debit: str
@@ -109,5 +169,36 @@ def correct_entry(payload: CorrectionPayload, x_client_key: str = Header(...)):
     if not client:
         raise HTTPException(status_code=401, detail="Invalid client key")
     record_correction(client.code, payload.entry_id, payload.new_debit, payload.new_credit, payload.reason, reviewer="user")
+    invalidate_vendor_classifier(client.code)
     return {"status": "corrected"}
 
+
+def _sse(item) -> bytes:
+    if item == journal_events.KEEPALIVE:
+        return b": keepalive\n\n"
+    if item == journal_events.RESET:
+        return b"event: reset\ndata: {}\n\n"
+    return b"id: %d\nevent: journal\ndata: %s\n\n" % (item.id, dumps(item))
+
+
+@router.get("/events")
+async def journal_event_stream(request: Request, last_event_id: str | None = Header(None),
+                               x_client_key: str = Header(...)):
+    """Server-sent events with each journal insert, update, delete and correction as it is committed.
+
+    ``data`` is ``{"id", "op", "entry_id", "entry"}`` where ``entry`` is the row as listed by
+    ``GET /api/journal/`` (null once deleted). Reconnect with ``Last-Event-ID`` to receive the
+    events missed meanwhile; ``event: reset`` means they are gone and the list should be reloaded.
+    """
+    client = get_client_by_key(x_client_key)
+    if not client:
+        raise HTTPException(status_code=401, detail="Invalid client key")
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    async def stream() -> AsyncIterator[bytes]:
+        yield b"retry: 3000\n\n"
+        async for item in journal_events.subscribe(client.code, after):
+            yield _sse(item)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
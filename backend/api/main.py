@@ -4,14 +4,16 @@ from __future__ import annotations
 from datetime import date
 from typing import Any, Generator
 
-from fastapi import Depends, FastAPI, HTTPException, Header
+from fastapi import Depends, FastAPI, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from backend import models
+from backend.account_resolver import get_resolver, invalidate_resolver
 from backend.auto_journal import suggest_accounts
 from backend.db import SessionLocal, engine, get_client_by_key
+from backend.read_model import legacy_account_rows, legacy_journal_rows
 from backend.models import Account, Journal, Client
 from utils.logging_config import setup_logging
 from utils.scheduler import shutdown_scheduler, start_scheduler
@@ -19,6 +21,9 @@ from utils.settings import settings
 from .ai_classifier import get_classifier
 from .bank_connector import fetch_bank_transactions
 from .card_connector import fetch_card_transactions
+from .compression import CompressionMiddleware
+from .idempotency import IdempotencyMiddleware
+from .responses import FastJSONResponse, negotiated
 from .scan_import import router as scan_router
 
 setup_logging()
@@ -32,6 +37,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(IdempotencyMiddleware, client_lookup=get_client_by_key)
+app.add_middleware(CompressionMiddleware)
 
 
 class AccountCreate(BaseModel):
@@ -75,6 +82,8 @@ class JournalSuggestionRequest(BaseModel):
 class AutoJournalResponse(BaseModel):
     debit: int | None = None
     credit: int | None = None
+    debit_score: float | None = None
+    credit_score: float | None = None
 
 
 class ImportResponse(BaseModel):
@@ -89,6 +98,16 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+LEGACY_RESOLVER_KEY = "__legacy__"
+
+
+def get_account_resolver(db: Session):
+    return get_resolver(
+        LEGACY_RESOLVER_KEY,
+        loader=lambda: [(a.id, a.code, a.name, None) for a in db.query(Account).all()],
+    )
+
+
 def get_client(x_client_key: str | None = Header(default=None)) -> Client:
     if not x_client_key:
         raise HTTPException(status_code=401, detail="X-Client-Key required")
@@ -109,9 +128,9 @@ def on_shutdown() -> None:
     shutdown_scheduler()
 
 
-@app.get("/api/accounts", response_model=list[AccountRead])
-def list_accounts(db: Session = Depends(get_db)) -> list[AccountRead]:
-    return db.query(Account).order_by(Account.code).all()
+@app.get("/api/accounts", response_model=list[AccountRead], response_class=FastJSONResponse)
+def list_accounts(request: Request, db: Session = Depends(get_db)) -> Response:
+    return negotiated(request, legacy_account_rows(db))
 
 
 @app.post("/api/accounts", response_model=AccountRead, status_code=201)
@@ -123,17 +142,13 @@ def create_account(account: AccountCreate, db: Session = Depends(get_db)) -> Acc
     db.add(account_obj)
     db.commit()
     db.refresh(account_obj)
+    invalidate_resolver(LEGACY_RESOLVER_KEY)
     return account_obj
 
 
-@app.get("/api/journal", response_model=list[JournalRead])
-def list_journals(db: Session = Depends(get_db), client: Client = Depends(get_client)) -> list[JournalRead]:
-    return (
-        db.query(Journal)
-        .filter(Journal.client_id == client.id)
-        .order_by(Journal.date.desc())
-        .all()
-    )
+@app.get("/api/journal", response_model=list[JournalRead], response_class=FastJSONResponse)
+def list_journals(request: Request, db: Session = Depends(get_db), client: Client = Depends(get_client)) -> Response:
+    return negotiated(request, legacy_journal_rows(db, client.id))
 
 
 @app.post("/api/journal", response_model=JournalRead, status_code=201)
@@ -198,11 +213,14 @@ async def auto_journal(entry: JournalSuggestionRequest, db: Session = Depends(ge
         from backend.auto_journal import suggest_accounts_llm_rich
         # Use rich to leverage client-scoped few-shot, then map names back to IDs
         result = suggest_accounts_llm_rich(db, entry.summary, entry.amount, date.today().isoformat(), client_id=client.id)
-        debit = db.query(Account).filter(Account.name == result.get("debit_account")).first() if result.get("debit_account") else None
-        credit = db.query(Account).filter(Account.name == result.get("credit_account")).first() if result.get("credit_account") else None
+        resolver = get_account_resolver(db)
+        debit = resolver.resolve(result.get("debit_account"))
+        credit = resolver.resolve(result.get("credit_account"))
         return AutoJournalResponse(
-            debit=debit.id if debit else None,
-            credit=credit.id if credit else None,
+            debit=debit.account_id if debit else None,
+            credit=credit.account_id if credit else None,
+            debit_score=debit.score if debit else None,
+            credit_score=credit.score if credit else None,
         )
     # Fallback to local ML model
     classifier = get_classifier()
@@ -0,0 +1,54 @@
+"""Maintenance job registry, run history and manual triggering."""
+from __future__ import annotations
+
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+
+from ..db_manager import get_master_session
+from ..maintenance import JOBS, run_maintenance
+from ..models_maintenance import MaintenanceRun
+from .admin_auth import require_admin
+
+
+router = APIRouter(prefix="/api/maintenance", tags=["maintenance"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/jobs")
+def list_jobs():
+    return [
+        {"name": j.name, "priority": j.priority, "budget_seconds": j.budget_seconds, "description": j.description}
+        for j in sorted(JOBS.values(), key=lambda j: j.priority)
+    ]
+
+
+@router.get("/runs")
+def list_runs(job: Optional[str] = None, client_code: Optional[str] = None, limit: int = 100):
+    with get_master_session() as s:
+        q = s.query(MaintenanceRun)
+        if job:
+            q = q.filter(MaintenanceRun.job == job)
+        if client_code:
+            q = q.filter(MaintenanceRun.client_code == client_code)
+        rows = q.order_by(MaintenanceRun.id.desc()).limit(limit).all()
+        return [
+            {
+                "job": r.job,
+                "client_code": r.client_code,
+                "started_at": r.started_at.isoformat() if r.started_at else None,
+                "duration": r.duration,
+                "status": r.status,
+                "detail": json.loads(r.detail) if r.detail else None,
+            }
+            for r in rows
+        ]
+
+
+@router.post("/run", status_code=202)
+def trigger(background: BackgroundTasks, job: Optional[List[str]] = Query(None)):
+    unknown = [n for n in job or [] if n not in JOBS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown job: {', '.join(unknown)}")
+    background.add_task(run_maintenance, job)
+    return {"status": "scheduled", "jobs": job or sorted(JOBS, key=lambda n: JOBS[n].priority)}
@@ -0,0 +1,83 @@
+"""Reconciliation (消込) API: compute proposals, list them, confirm or reject."""
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, List
+
+from fastapi import APIRouter, Header, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from ..db_manager import get_client_by_key, get_session_for_client
+from ..models_reconcile import ReconcileLink, ReconcileMatch
+from ..reconcile import decide_match, run_reconciliation
+
+
+router = APIRouter(prefix="/api/reconcile", tags=["reconcile"])
+
+
+def _client_code(x_client_key: str) -> str:
+    client = get_client_by_key(x_client_key)
+    if not client:
+        raise HTTPException(status_code=401, detail="Invalid client key")
+    return client.code
+
+
+def _match_dict(m: ReconcileMatch, links: List[ReconcileLink]) -> dict:
+    refs: Dict[str, List[int]] = defaultdict(list)
+    for link in links:
+        refs[link.kind].append(link.ref_id)
+    return {
+        "id": m.id,
+        "method": m.method,
+        "score": m.score,
+        "status": m.status,
+        "bank_ids": refs.get("bank", []),
+        "statement_ids": refs.get("statement", []),
+        "journal_ids": refs.get("journal", []),
+        "decided_at": m.decided_at.isoformat() if m.decided_at else None,
+    }
+
+
+@router.post("/run")
+async def run(x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    return await run_in_threadpool(run_reconciliation, code)
+
+
+@router.get("/matches")
+def list_matches(status: str | None = "proposed", offset: int = 0, limit: int = 200, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    db = get_session_for_client(code)
+    try:
+        q = db.query(ReconcileMatch)
+        if status:
+            q = q.filter(ReconcileMatch.status == status)
+        matches = q.order_by(ReconcileMatch.score.desc(), ReconcileMatch.id).offset(offset).limit(limit).all()
+        links: Dict[int, List[ReconcileLink]] = defaultdict(list)
+        if matches:
+            for link in db.query(ReconcileLink).filter(ReconcileLink.match_id.in_([m.id for m in matches])):
+                links[link.match_id].append(link)
+        return [_match_dict(m, links[m.id]) for m in matches]
+    finally:
+        db.close()
+
+
+def _decide(match_id: int, x_client_key: str, confirm: bool) -> dict:
+    code = _client_code(x_client_key)
+    try:
+        match = decide_match(code, match_id, confirm)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if match is None:
+        raise HTTPException(status_code=404, detail="Match not found")
+    return {"id": match.id, "status": match.status}
+
+
+@router.post("/matches/{match_id}/confirm")
+def confirm_match(match_id: int, x_client_key: str = Header(...)):
+    return _decide(match_id, x_client_key, confirm=True)
+
+
+@router.post("/matches/{match_id}/reject")
+def reject_match(match_id: int, x_client_key: str = Header(...)):
+    return _decide(match_id, x_client_key, confirm=False)
@@ -0,0 +1,88 @@
+"""Response classes shared by the routers."""
+from __future__ import annotations
+
+import zlib
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .. import read_model
+from ..read_model import change_versions, dumps, dumps_msgpack, dumps_ndjson
+
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+NDJSON = "application/x-ndjson"
+_ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK, "application/ndjson": NDJSON,
+            "application/jsonl": NDJSON, "*/*": JSON, "application/*": JSON}
+_FORMAT_TAGS = {JSON: "j", MSGPACK: "m", NDJSON: "n"}
+
+
+class FastJSONResponse(Response):
+    """JSON rendered by :func:`backend.read_model.dumps`; accepts slotted read-model records as-is."""
+
+    media_type = JSON
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def preferred_format(accept: Optional[str]) -> str:
+    """Best of JSON / MessagePack / NDJSON for an ``Accept`` header; JSON unless another is preferred."""
+    best, best_q = JSON, -1.0
+    for part in (accept or "").split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        media = _ALIASES.get(media.lower(), media.lower())
+        if media not in (JSON, MSGPACK, NDJSON) or (media == MSGPACK and read_model.msgpack is None):
+            continue
+        q = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = media, q
+    return best if best_q > 0 else JSON
+
+
+def negotiated(request: Request, rows: Sequence[Any], fmt: Optional[str] = None) -> Response:
+    """List response in the format the client asked for with ``Accept``."""
+    fmt = fmt or preferred_format(request.headers.get("accept"))
+    if fmt == MSGPACK:
+        body = dumps_msgpack(rows)
+    elif fmt == NDJSON:
+        body = dumps_ndjson(rows)
+    else:
+        body = dumps(rows)
+    return Response(body, media_type=fmt, headers={"Vary": "Accept"})
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison, as for GET: W/"x" and "x" are the same tag
+    opaque = etag.removeprefix("W/")
+    return any(t == "*" or t.strip().removeprefix("W/") == opaque for t in if_none_match.split(","))
+
+
+def conditional_list(request: Request, client_code: str, tables: Sequence[str],
+                     load: Callable[[], Sequence[Any]]) -> Response:
+    """:func:`negotiated` with an ETag from the tenant's change versions of ``tables``.
+
+    ``If-None-Match`` with the current tag gets a 304 before ``load`` runs.
+    The versions are read first, so a write racing with ``load`` can only make
+    the tag older than the body, never newer.
+    """
+    fmt = preferred_format(request.headers.get("accept"))
+    versions = ".".join(str(v) for v in change_versions(client_code, tables))
+    query = f"-{zlib.crc32(str(request.query_params).encode()):08x}" if request.query_params else ""
+    etag = f'W/"{client_code}-{versions}-{_FORMAT_TAGS[fmt]}{query}"'
+    headers = {"ETag": etag, "Vary": "Accept", "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response = negotiated(request, load(), fmt)
+    response.headers.update(headers)
+    return response
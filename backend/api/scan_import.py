@@ -1,26 +1,237 @@
-"""FastAPI route for manual ScanSnap OCR XML upload (multi-tenant)."""
+"""FastAPI routes for manual ScanSnap OCR XML upload (multi-tenant).
+
+Uploads are streamed to disk and processed in the background by the ingest
+worker pool; the response carries a job ID that can be polled.
+"""
 from __future__ import annotations
 
+import hashlib
+import re
+import shutil
+import uuid
+import zipfile
 from pathlib import Path
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, UploadFile, Header, HTTPException
+from fastapi import APIRouter, File, Header, HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
 
-from ..auto_journal_scan import process_scansnap_xml
 from ..db_manager import get_client_by_key
+from ..document_store import DocumentStore
+from ..ingest_ledger import file_sha256, get_ledger
+from ..ingest_pool import QueueFull
+from ..scan_jobs import JobItem, ScanJob, jobs
+from ..scheduler import pool, scan_schedule
+from ..settings import settings
 
 
 router = APIRouter(prefix="/api/scan", tags=["scan"])
 
+_UNSAFE_NAME = re.compile(r"[^0-9A-Za-z._\-぀-ヿ一-鿿]+")
 
-@router.post("/import")
-async def import_scansnap(file: UploadFile, x_client_key: str = Header(...)):
-    tmp_dir = Path("tmp")
-    tmp_dir.mkdir(parents=True, exist_ok=True)
-    path = tmp_dir / file.filename
-    data = await file.read()
-    path.write_bytes(data)
+
+def _client_code(x_client_key: str) -> str:
     client = get_client_by_key(x_client_key)
     if not client:
         raise HTTPException(status_code=401, detail="Invalid client key")
-    result = process_scansnap_xml(path, client_code=client.code)
-    return {"status": "ok", "client": client.code, **result}
+    return client.code
+
+
+def _unique_path(upload_dir: Path, filename: str) -> Path:
+    name = _UNSAFE_NAME.sub("_", Path(filename or "upload").name) or "upload"
+    return upload_dir / f"{uuid.uuid4().hex}_{name}"
+
+
+def _write_and_hash(out, h, chunk: bytes) -> None:
+    h.update(chunk)
+    out.write(chunk)
+
+
+async def _stream_to_disk(file: UploadFile, path: Path) -> str:
+    """Copy the upload in chunks, returning its sha256."""
+    h = hashlib.sha256()
+    chunk_size = settings.scan_upload_chunk_bytes
+    with open(path, "wb") as out:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            await run_in_threadpool(_write_and_hash, out, h, chunk)
+    return h.hexdigest()
+
+
+class ZipLimitError(ValueError):
+    pass
+
+
+def _xml_members(zf: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """The archive's XML members, checked against the SCAN_ZIP_* limits from their headers."""
+    members = [i for i in zf.infolist() if not i.is_dir() and i.filename.lower().endswith(".xml")]
+    if len(members) > settings.scan_zip_max_members:
+        raise ZipLimitError(f"zip has more than {settings.scan_zip_max_members} XML files")
+    if sum(i.file_size for i in members) > settings.scan_zip_max_bytes:
+        raise ZipLimitError(f"zip expands to more than {settings.scan_zip_max_bytes} bytes")
+    for i in members:
+        if i.file_size > settings.scan_zip_max_ratio * max(i.compress_size, 1):
+            raise ZipLimitError(f"{i.filename} is compressed more than {settings.scan_zip_max_ratio:g}:1")
+    return members
+
+
+def _check_zip(archive: Path) -> None:
+    with zipfile.ZipFile(archive) as zf:
+        _xml_members(zf)
+
+
+def _extract_zip(archive: Path, upload_dir: Path) -> List[Tuple[str, Path]]:
+    out: List[Tuple[str, Path]] = []
+    try:
+        with zipfile.ZipFile(archive) as zf:
+            for info in _xml_members(zf):
+                # Never trust member paths; only the base name is kept. zipfile stops at the declared size.
+                target = _unique_path(upload_dir, info.filename)
+                out.append((info.filename, target))
+                with zf.open(info) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst, settings.scan_upload_chunk_bytes)
+    except Exception:
+        for _, target in out:
+            target.unlink(missing_ok=True)
+        raise
+    finally:
+        archive.unlink(missing_ok=True)
+    return out
+
+
+def _is_zip(filename: Optional[str], path: Path) -> bool:
+    return (filename or "").lower().endswith(".zip") or zipfile.is_zipfile(path)
+
+
+def _enqueue(job: ScanJob, name: str, path: Path, content_hash: str) -> None:
+    item = JobItem(name=name, path=str(path))
+    job.items.append(item)
+    known = get_ledger(job.client_code).find_hash(content_hash)
+    if known is not None:
+        path.unlink(missing_ok=True)
+        jobs.finish_item(job, item, {
+            "saved": False,
+            "duplicate": True,
+            "duplicate_of": known.path,
+            "state": known.state,
+            "entry_id": known.entry_id,
+        }, None)
+        return
+
+    # The upload temp file becomes the stored document; the pool processes it in place
+    store = DocumentStore(job.client_code)
+    path = store.path_for(store.put_file(path, move=True))
+    item.path = str(path)
+
+    def on_done(result, error) -> None:
+        if error is not None:
+            jobs.finish_item(job, item, None, repr(error))
+        elif result is None:
+            entry = get_ledger(job.client_code).get(str(path.resolve()))
+            jobs.finish_item(job, item, None, (entry.error if entry else None) or "not processed")
+        else:
+            jobs.finish_item(job, item, result, None)
+
+    try:
+        pool.submit(job.client_code, path, on_done=on_done)
+    except QueueFull:
+        jobs.finish_item(job, item, None, "ingest queue full; retry later")
+
+
+@router.post("/import")
+async def import_scansnap(
+    file: Optional[UploadFile] = File(None),
+    files: Optional[List[UploadFile]] = File(None),
+    x_client_key: str = Header(...),
+):
+    code = _client_code(x_client_key)
+    uploads = ([file] if file is not None else []) + list(files or [])
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    upload_dir = Path(settings.scan_upload_dir) / code
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    # Everything is on disk and every archive is checked before any work is queued
+    received: List[Tuple[Optional[str], Path, str, bool]] = []
+    try:
+        for upload in uploads:
+            path = _unique_path(upload_dir, upload.filename)
+            content_hash = await _stream_to_disk(upload, path)
+            is_zip = await run_in_threadpool(_is_zip, upload.filename, path)
+            received.append((upload.filename, path, content_hash, is_zip))
+            if is_zip:
+                await run_in_threadpool(_check_zip, path)
+    except (ZipLimitError, zipfile.BadZipFile) as exc:
+        for _, path, _, _ in received:
+            path.unlink(missing_ok=True)
+        detail = str(exc) if isinstance(exc, ZipLimitError) else "invalid zip archive"
+        raise HTTPException(status_code=400, detail=detail)
+
+    # A tenant uploading by hand is likely scanning too
+    scan_schedule.activity(code)
+    pool.start()
+    job = jobs.create(code)
+    for filename, path, content_hash, is_zip in received:
+        if is_zip:
+            members = await run_in_threadpool(_extract_zip, path, upload_dir)
+            for name, member in members:
+                member_hash = await run_in_threadpool(file_sha256, member)
+                await run_in_threadpool(_enqueue, job, name, member, member_hash)
+        elif (filename or "").lower().endswith(".pdf"):
+            item = JobItem(name=filename)
+            job.items.append(item)
+            sha256 = await run_in_threadpool(DocumentStore(code).put_file, path, True)
+            jobs.finish_item(job, item, {"saved": False, "stored": True, "document_sha256": sha256}, None)
+        else:
+            await run_in_threadpool(_enqueue, job, filename, path, content_hash)
+    jobs.seal(job)
+    return job.to_dict(with_items=False)
+
+
+@router.get("/jobs")
+def list_jobs(x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    return [j.to_dict(with_items=False) for j in jobs.list(code)]
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    job = jobs.get(job_id, code)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.get("/ledger")
+def list_ledger(state: str | None = None, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    return [
+        {
+            "path": e.path,
+            "content_hash": e.content_hash,
+            "state": e.state,
+            "attempts": e.attempts,
+            "retry_after": e.retry_after.isoformat() if e.retry_after else None,
+            "entry_id": e.entry_id,
+            "duplicate_of": e.duplicate_of,
+            "error": e.error,
+        }
+        for e in get_ledger(code).entries(state)
+    ]
+
+
+@router.get("/metrics")
+def ingest_metrics(x_client_key: str = Header(...)):
+    """Queue depth and processing rate of the ingest worker pool for the calling client."""
+    code = _client_code(x_client_key)
+    return {c: m for c, m in pool.metrics().items() if c == code}
+
+
+@router.get("/schedule")
+def scan_schedule_status(x_client_key: str = Header(...)):
+    """Current adaptive scan interval and next scan for the calling client (on the leader process)."""
+    code = _client_code(x_client_key)
+    return {c: s for c, s in scan_schedule.snapshot().items() if c == code}
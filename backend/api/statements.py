@@ -0,0 +1,134 @@
+"""Statement file import (全銀 / CSV / OFX) and review of the staged rows."""
+from __future__ import annotations
+
+import uuid
+from datetime import date as _date, datetime
+from pathlib import Path
+from typing import List
+
+from fastapi import APIRouter, File, Header, HTTPException, UploadFile
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from ..db_manager import get_client_by_key, get_session_for_client
+from ..models_bank import StagedTransaction, StatementImport
+from ..settings import settings
+from ..statement_import import FORMATS, ArchivedPeriodError, StatementFormatError, import_statement, post_staged
+
+
+router = APIRouter(prefix="/api/statements", tags=["statements"])
+
+
+class StatementImportRead(BaseModel):
+    id: int
+    filename: str | None = None
+    format: str | None = None
+    row_count: int = 0
+    created_at: datetime | None = None
+
+
+class StagedRowRead(BaseModel):
+    id: int
+    line_no: int | None = None
+    date: _date | None = None
+    amount: float
+    description: str | None = None
+    balance: float | None = None
+    debit_account: str | None = None
+    credit_account: str | None = None
+    status: str
+    journal_entry_id: int | None = None
+
+
+class StagedRowUpdate(BaseModel):
+    debit_account: str | None = None
+    credit_account: str | None = None
+    status: str | None = None  # pending / rejected
+
+
+def _client_code(x_client_key: str) -> str:
+    client = get_client_by_key(x_client_key)
+    if not client:
+        raise HTTPException(status_code=401, detail="Invalid client key")
+    return client.code
+
+
+def _row_read(r: StagedTransaction) -> StagedRowRead:
+    return StagedRowRead(id=r.id, line_no=r.line_no, date=r.date, amount=r.amount or 0.0,
+                         description=r.description, balance=r.balance, debit_account=r.debit_account,
+                         credit_account=r.credit_account, status=r.status or "pending",
+                         journal_entry_id=r.journal_entry_id)
+
+
+@router.post("/import")
+async def import_statement_file(file: UploadFile = File(...), format: str | None = None, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    if format is not None and format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    upload_dir = Path(settings.scan_upload_dir) / code
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    path = upload_dir / f"{uuid.uuid4().hex}.statement"
+    try:
+        with open(path, "wb") as out:
+            while chunk := await file.read(settings.scan_upload_chunk_bytes):
+                await run_in_threadpool(out.write, chunk)
+        return await run_in_threadpool(import_statement, code, path, file.filename, format)
+    except StatementFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    finally:
+        path.unlink(missing_ok=True)
+
+
+@router.get("/", response_model=List[StatementImportRead])
+def list_imports(x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    db = get_session_for_client(code)
+    try:
+        rows = db.query(StatementImport).order_by(StatementImport.id.desc()).all()
+        return [StatementImportRead(id=r.id, filename=r.filename, format=r.format, row_count=r.row_count or 0,
+                                    created_at=r.created_at) for r in rows]
+    finally:
+        db.close()
+
+
+@router.get("/{import_id}/rows", response_model=List[StagedRowRead])
+def list_rows(import_id: int, status: str | None = None, offset: int = 0, limit: int = 500,
+              x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    db = get_session_for_client(code)
+    try:
+        q = db.query(StagedTransaction).filter(StagedTransaction.import_id == import_id)
+        if status:
+            q = q.filter(StagedTransaction.status == status)
+        return [_row_read(r) for r in q.order_by(StagedTransaction.id).offset(offset).limit(limit).all()]
+    finally:
+        db.close()
+
+
+@router.patch("/rows/{row_id}", response_model=StagedRowRead)
+def update_row(row_id: int, payload: StagedRowUpdate, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    if payload.status not in (None, "pending", "rejected"):
+        raise HTTPException(status_code=400, detail="status must be pending or rejected")
+    db = get_session_for_client(code)
+    try:
+        row = db.get(StagedTransaction, row_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Row not found")
+        if row.status == "posted":
+            raise HTTPException(status_code=400, detail="Row already posted")
+        for field, value in payload.dict(exclude_unset=True).items():
+            setattr(row, field, value)
+        db.commit()
+        return _row_read(row)
+    finally:
+        db.close()
+
+
+@router.post("/{import_id}/post")
+def post_import(import_id: int, allow_duplicates: bool = False, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    try:
+        return post_staged(code, import_id, allow_duplicates)
+    except ArchivedPeriodError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
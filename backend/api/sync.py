@@ -0,0 +1,111 @@
+"""Bank/card sync API: register provider accounts, trigger a sync, list transactions."""
+from __future__ import annotations
+
+from datetime import date as _date, datetime
+from typing import List
+
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel
+
+from ..connectors import sync_all
+from ..db_manager import get_client_by_key, get_session_for_client
+from ..models_bank import BankTransaction, SyncAccount
+from ..settings import settings
+
+
+router = APIRouter(prefix="/api/sync", tags=["sync"])
+
+
+class SyncAccountCreate(BaseModel):
+    provider: str
+    account_ref: str
+    kind: str = "bank"
+
+
+class SyncAccountRead(SyncAccountCreate):
+    id: int
+    cursor: str | None = None
+    last_synced_at: datetime | None = None
+    last_error: str | None = None
+
+
+class BankTransactionRead(BaseModel):
+    id: int
+    provider: str
+    account_ref: str
+    provider_txn_id: str
+    date: _date | None = None
+    amount: float
+    description: str | None = None
+    debit_account: str | None = None
+    credit_account: str | None = None
+
+
+def _client_code(x_client_key: str) -> str:
+    client = get_client_by_key(x_client_key)
+    if not client:
+        raise HTTPException(status_code=401, detail="Invalid client key")
+    return client.code
+
+
+def _account_read(a: SyncAccount) -> SyncAccountRead:
+    return SyncAccountRead(id=a.id, provider=a.provider, account_ref=a.account_ref, kind=a.kind or "bank",
+                           cursor=a.cursor, last_synced_at=a.last_synced_at, last_error=a.last_error)
+
+
+@router.get("/accounts", response_model=List[SyncAccountRead])
+def list_sync_accounts(x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    db = get_session_for_client(code)
+    try:
+        return [_account_read(a) for a in db.query(SyncAccount).order_by(SyncAccount.id).all()]
+    finally:
+        db.close()
+
+
+@router.post("/accounts", response_model=SyncAccountRead)
+def create_sync_account(payload: SyncAccountCreate, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    if payload.provider not in settings.sync_providers:
+        raise HTTPException(status_code=400, detail="Unknown provider")
+    db = get_session_for_client(code)
+    try:
+        exists = db.query(SyncAccount).filter(
+            SyncAccount.provider == payload.provider, SyncAccount.account_ref == payload.account_ref
+        ).first()
+        if exists:
+            raise HTTPException(status_code=400, detail="Account already registered")
+        account = SyncAccount(provider=payload.provider, account_ref=payload.account_ref, kind=payload.kind)
+        db.add(account)
+        db.commit()
+        db.refresh(account)
+        return _account_read(account)
+    finally:
+        db.close()
+
+
+@router.post("/run")
+async def run_sync(x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    results = await sync_all([code])
+    return {"accounts": results, "inserted": sum(r["inserted"] for r in results)}
+
+
+@router.get("/transactions", response_model=List[BankTransactionRead])
+def list_transactions(account_ref: str | None = None, limit: int = 200, x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    db = get_session_for_client(code)
+    try:
+        q = db.query(BankTransaction)
+        if account_ref:
+            q = q.filter(BankTransaction.account_ref == account_ref)
+        rows = q.order_by(BankTransaction.date.desc(), BankTransaction.id.desc()).limit(limit).all()
+        return [
+            BankTransactionRead(id=t.id, provider=t.provider, account_ref=t.account_ref,
+                                provider_txn_id=t.provider_txn_id, date=t.date, amount=t.amount or 0.0,
+                                description=t.description, debit_account=t.debit_account,
+                                credit_account=t.credit_account)
+            for t in rows
+        ]
+    finally:
+        db.close()
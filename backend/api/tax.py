@@ -0,0 +1,69 @@
+"""Consumption tax (消費税) totals and return worksheet."""
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+
+from ..archive import fiscal_start_month, fiscal_year_range
+from ..consumption_tax import TaxPeriodError, monthly_totals, rebuild_tax_totals, worksheet
+from ..db_manager import get_client_by_key
+
+
+router = APIRouter(prefix="/api/tax", tags=["tax"])
+
+
+def _client_code(x_client_key: str) -> str:
+    client = get_client_by_key(x_client_key)
+    if not client:
+        raise HTTPException(status_code=401, detail="Invalid client key")
+    return client.code
+
+
+def _period(code: str, start: Optional[str], end: Optional[str], fiscal_year: Optional[int]) -> Tuple[str, str]:
+    if fiscal_year is not None:
+        first, after = fiscal_year_range(fiscal_year, fiscal_start_month(code))
+        last_month = after.year * 12 + after.month - 2
+        return first.strftime("%Y-%m"), f"{last_month // 12:04d}-{last_month % 12 + 1:02d}"
+    if not start or not end:
+        raise HTTPException(status_code=400, detail="Give from/to (YYYY-MM) or fiscal_year")
+    return start, end
+
+
+@router.get("/worksheet")
+def get_worksheet(
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    fiscal_year: Optional[int] = None,
+    x_client_key: str = Header(...),
+):
+    code = _client_code(x_client_key)
+    try:
+        return worksheet(code, *_period(code, start, end, fiscal_year))
+    except TaxPeriodError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.get("/totals")
+def get_totals(
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    fiscal_year: Optional[int] = None,
+    x_client_key: str = Header(...),
+):
+    code = _client_code(x_client_key)
+    try:
+        months = monthly_totals(code, *_period(code, start, end, fiscal_year))
+    except TaxPeriodError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {
+        period: {cat: {"gross": gross, "entries": entries} for cat, (gross, entries) in cats.items()}
+        for period, cats in months.items()
+    }
+
+
+@router.post("/rebuild")
+async def rebuild(x_client_key: str = Header(...)):
+    code = _client_code(x_client_key)
+    return await run_in_threadpool(rebuild_tax_totals, code)
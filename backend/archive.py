@@ -0,0 +1,222 @@
+"""Fiscal-year archiving of tenant journal data into read-only SQLite files.
+
+A closed fiscal year's ``journal_entries`` and their ``correction_history``
+rows move to ``clients/<code>.fy<YYYY>.db`` in a single transaction spanning
+both files, and the file is then made read-only. Reads that ask for a date
+range overlapping archived years attach just those files (``immutable=1``
+with a large ``mmap_size``) to a read-only connection and ``UNION ALL`` them
+with the active DB; everything else only touches the small active DB.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import stat
+from datetime import date as _date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import MetaData, create_engine, func, select, union_all
+from sqlalchemy.pool import NullPool
+
+from .db_manager import get_client_by_code, get_engine_for_client, get_session_for_client
+from .duplicate_index import invalidate_duplicate_index
+from .models_archive import ArchivePartition
+from .models_journal import CorrectionHistory, JournalEntry
+from .settings import settings
+from .txn_classifier import invalidate_vendor_classifier
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def fiscal_start_month(client_code: str) -> int:
+    client = get_client_by_code(client_code)
+    month = client.fiscal_year_start_month if client is not None else None
+    return month or settings.fiscal_year_start_month
+
+
+def fiscal_year_of(day: _date, start_month: int) -> int:
+    return day.year if day.month >= start_month else day.year - 1
+
+
+def fiscal_year_range(fiscal_year: int, start_month: int) -> Tuple[_date, _date]:
+    """First day and the exclusive end of a fiscal year."""
+    return _date(fiscal_year, start_month, 1), _date(fiscal_year + 1, start_month, 1)
+
+
+def archive_path(client_code: str, fiscal_year: int) -> Path:
+    return Path("clients") / f"{client_code}.fy{fiscal_year}.db"
+
+
+def _columns(table) -> str:
+    return ", ".join(c.name for c in table.columns)
+
+
+def archive_fiscal_year(client_code: str, fiscal_year: int, today: Optional[_date] = None) -> Dict[str, Any]:
+    start_month = fiscal_start_month(client_code)
+    start, end = fiscal_year_range(fiscal_year, start_month)
+    if end > (today or _date.today()):
+        raise ArchiveError(f"Fiscal year {fiscal_year} is not closed yet")
+
+    db = get_session_for_client(client_code)
+    try:
+        if db.query(ArchivePartition).filter(ArchivePartition.fiscal_year == fiscal_year).first():
+            raise ArchiveError(f"Fiscal year {fiscal_year} is already archived")
+        in_range = (JournalEntry.date >= start) & (JournalEntry.date < end)
+        count, max_id = db.query(func.count(JournalEntry.id), func.max(JournalEntry.id)).filter(in_range).one()
+        newer = db.query(func.max(JournalEntry.id)).filter(~in_range | JournalEntry.date.is_(None)).scalar()
+    finally:
+        db.close()
+    if not count:
+        raise ArchiveError(f"No entries in fiscal year {fiscal_year}")
+    if newer is None or newer < max_id:
+        # SQLite reuses the highest rowid; keep a newer row so archived ids are never handed out again
+        raise ArchiveError("The active DB must keep entries with higher ids than the archived year")
+
+    path = archive_path(client_code, fiscal_year)
+    if path.exists():
+        raise ArchiveError(f"{path} already exists")
+    archive_engine = create_engine(f"sqlite:///{path}")
+    JournalEntry.__table__.create(archive_engine)
+    CorrectionHistory.__table__.create(archive_engine)
+    archive_engine.dispose()
+
+    entry_cols = _columns(JournalEntry.__table__)
+    corr_cols = _columns(CorrectionHistory.__table__)
+    bounds = (start.isoformat(), end.isoformat())
+    engine = get_engine_for_client(client_code)
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ATTACH DATABASE ? AS arch", (str(path),))
+            try:
+                moved = conn.exec_driver_sql(
+                    f"INSERT INTO arch.journal_entries ({entry_cols}) SELECT {entry_cols} FROM main.journal_entries "
+                    "WHERE date >= ? AND date < ?", bounds,
+                ).rowcount
+                corrections = conn.exec_driver_sql(
+                    f"INSERT INTO arch.correction_history ({corr_cols}) SELECT {corr_cols} FROM main.correction_history "
+                    "WHERE entry_id IN (SELECT id FROM arch.journal_entries)"
+                ).rowcount
+                if moved != count:
+                    raise ArchiveError("Entries changed while archiving; retry")
+                # Recorded before the delete so the consumption tax triggers keep the year's totals
+                conn.execute(ArchivePartition.__table__.insert().values(
+                    fiscal_year=fiscal_year, path=str(path), start_date=start, end_date=end, entry_count=moved,
+                    correction_count=corrections, max_entry_id=max_id, created_at=datetime.utcnow(),
+                ))
+                conn.exec_driver_sql(
+                    "DELETE FROM main.correction_history WHERE entry_id IN (SELECT id FROM arch.journal_entries)"
+                )
+                conn.exec_driver_sql("DELETE FROM main.journal_entries WHERE date >= ? AND date < ?", bounds)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.exec_driver_sql("DETACH DATABASE arch")
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+
+    with sqlite3.connect(path) as raw:
+        raw.execute("ANALYZE")
+    os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    invalidate_duplicate_index(client_code)
+    invalidate_vendor_classifier(client_code)
+    return {"fiscal_year": fiscal_year, "path": str(path), "entries": moved, "corrections": corrections,
+            "start_date": start.isoformat(), "end_date": (end - timedelta(days=1)).isoformat()}
+
+
+def archive_closed_years(client_code: str, keep_years: Optional[int] = None, today: Optional[_date] = None) -> List[Dict[str, Any]]:
+    """Archive every fiscal year older than the newest ``keep_years`` (current year included)."""
+    keep = settings.archive_keep_years if keep_years is None else keep_years
+    if keep <= 0:
+        return []
+    today = today or _date.today()
+    start_month = fiscal_start_month(client_code)
+    oldest_kept = fiscal_year_of(today, start_month) - (keep - 1)
+    db = get_session_for_client(client_code)
+    try:
+        first = db.query(func.min(JournalEntry.date)).scalar()
+        done = {fy for (fy,) in db.query(ArchivePartition.fiscal_year)}
+    finally:
+        db.close()
+    if first is None:
+        return []
+    out = []
+    for fy in range(fiscal_year_of(first, start_month), oldest_kept):
+        if fy in done:
+            continue
+        try:
+            out.append(archive_fiscal_year(client_code, fy, today=today))
+        except ArchiveError as exc:
+            out.append({"fiscal_year": fy, "skipped": str(exc)})
+    return out
+
+
+def partitions(client_code: str) -> List[ArchivePartition]:
+    db = get_session_for_client(client_code)
+    try:
+        rows = db.query(ArchivePartition).order_by(ArchivePartition.fiscal_year).all()
+        for r in rows:
+            db.expunge(r)
+        return rows
+    finally:
+        db.close()
+
+
+def archived_year_for(client_code: str, day: _date) -> Optional[int]:
+    db = get_session_for_client(client_code)
+    try:
+        row = db.query(ArchivePartition.fiscal_year).filter(
+            ArchivePartition.start_date <= day, ArchivePartition.end_date > day
+        ).first()
+        return row[0] if row else None
+    finally:
+        db.close()
+
+
+def _span_engine(client_code: str, parts: Sequence[ArchivePartition]):
+    main = Path(f"clients/{client_code}.db").resolve()
+
+    def connect():
+        conn = sqlite3.connect(f"{main.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        for p in parts:
+            schema = f"fy{p.fiscal_year}"
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (f"{Path(p.path).resolve().as_uri()}?immutable=1",))
+            conn.execute(f"PRAGMA {schema}.mmap_size = {int(settings.archive_mmap_bytes)}")
+        return conn
+
+    return create_engine("sqlite://", creator=connect, poolclass=NullPool)
+
+
+def query_entries(client_code: str, date_from: Optional[_date] = None, date_to: Optional[_date] = None) -> List[Any]:
+    """Journal rows dated ``date_from``..``date_to`` (inclusive), newest first, across archived years as needed."""
+    lo = date_from or _date.min
+    hi = date_to + timedelta(days=1) if date_to else None
+    needed = [p for p in partitions(client_code) if p.end_date > lo and (hi is None or p.start_date < hi)]
+
+    def ranged(table):
+        stmt = select(*table.columns).where(table.c.date >= lo)
+        return stmt.where(table.c.date < hi) if hi is not None else stmt
+
+    if not needed:
+        db = get_session_for_client(client_code)
+        try:
+            t = JournalEntry.__table__
+            return list(db.execute(ranged(t).order_by(t.c.date.desc(), t.c.id.desc())))
+        finally:
+            db.close()
+
+    metadata = MetaData()
+    tables = [JournalEntry.__table__.to_metadata(metadata, schema=s)
+              for s in ["main"] + [f"fy{p.fiscal_year}" for p in needed]]
+    union = union_all(*(ranged(t) for t in tables)).subquery()
+    engine = _span_engine(client_code, needed)
+    try:
+        with engine.connect() as conn:
+            return list(conn.execute(select(union).order_by(union.c.date.desc(), union.c.id.desc())))
+    finally:
+        engine.dispose()
@@ -6,6 +6,7 @@ from typing import Any, Dict
 
 from utils.llm_client import LLMClient
 
+from .account_resolver import validate_accounts
 from .db_manager import get_session_for_client
 from .models_journal import CorrectionHistory, JournalEntry
 from . import llm_trainer
@@ -44,9 +45,10 @@ def classify_with_llm(summary: str, amount: float, date: str, client_code: str)
         temperature=0.0,
     )
     try:
-        return json.loads(content)
+        result = json.loads(content)
     except Exception:
-        return {"debit_account": None, "credit_account": None, "confidence": 0.0, "reason": ""}
+        result = {"debit_account": None, "credit_account": None, "confidence": 0.0, "reason": ""}
+    return validate_accounts(client_code, result)
 
 
 def record_correction(client_code: str, entry_id: int, new_debit: str, new_credit: str, reason: str, reviewer: str) -> None:
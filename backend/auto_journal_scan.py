@@ -1,75 +1,218 @@
 from __future__ import annotations
 
+import itertools
 import xml.etree.ElementTree as ET
 from datetime import date as _date
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, List
 
 from .auto_journal import classify_with_llm
 from .db_manager import get_session_for_client
+from .document_store import DocumentStore, store_source_document
+from .duplicate_index import get_duplicate_index, invalidate_duplicate_index
 from .models_journal import JournalEntry
 from .settings import settings
 
 
-def _parse_scansnap_xml(file_path: Path) -> dict[str, Any]:
-    tree = ET.parse(file_path)
-    root = tree.getroot()
+FIELD_TAGS = {"Date", "Vendor", "Amount", "TaxIncluded", "Confidence"}
+
+
+def _record_from_fields(fields: Dict[str, str]) -> dict[str, Any]:
     data: Dict[str, Any] = {}
-    data["date"] = (root.findtext("Date") or "").strip()
-    data["vendor"] = (root.findtext("Vendor") or "").strip()
+    data["date"] = (fields.get("Date") or "").strip()
+    data["vendor"] = (fields.get("Vendor") or "").strip()
     try:
-        data["amount"] = float((root.findtext("Amount") or "0").strip())
+        data["amount"] = float((fields.get("Amount") or "0").strip())
     except ValueError:
         data["amount"] = 0.0
-    data["tax_included"] = (root.findtext("TaxIncluded") or "").strip().lower() in {"1", "true", "yes"}
-    data["confidence"] = float((root.findtext("Confidence") or "1.0").strip() or 1.0)
+    data["tax_included"] = (fields.get("TaxIncluded") or "").strip().lower() in {"1", "true", "yes"}
+    data["confidence"] = float((fields.get("Confidence") or "1.0").strip() or 1.0)
     return data
 
 
-def process_scansnap_xml(file_path: Path, client_code: str) -> dict[str, Any]:
-    payload = _parse_scansnap_xml(file_path)
+def iter_scansnap_records(file_path: Path) -> Iterator[dict[str, Any]]:
+    """Yield one dict per receipt, parsing incrementally.
+
+    A record is any element with ``Date``/``Vendor``/``Amount``... children, so
+    both the classic single ``<Root>`` export and batch files with many
+    ``<Root><Receipt>...</Receipt>...</Root>`` children are supported. Finished
+    records are detached from the tree to keep memory flat.
+    """
+    stack: List[ET.Element] = []
+    for event, elem in ET.iterparse(str(file_path), events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        if elem.tag in FIELD_TAGS:
+            continue
+        fields = {child.tag: child.text or "" for child in elem if child.tag in FIELD_TAGS}
+        if not fields:
+            continue
+        yield _record_from_fields(fields)
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+
+
+def _parse_scansnap_xml(file_path: Path) -> dict[str, Any]:
+    return next(iter_scansnap_records(file_path), _record_from_fields({}))
+
+
+def _parse_date(date_str: str) -> _date:
+    """``YYYY-MM-DD`` or ``YYYY/MM/DD``; raises ValueError for anything else."""
+    return _date.fromisoformat(date_str.replace("/", "-"))
+
+
+def _classify_record(payload: dict[str, Any], client_code: str) -> dict[str, Any]:
     summary = payload.get("vendor") or ""
     amount = float(payload.get("amount") or 0.0)
     date_str = payload.get("date") or _date.today().isoformat()
-
+    # Validated before the LLM call so a malformed date fails this record only
+    entry_date = _parse_date(date_str)
     result = classify_with_llm(summary=summary, amount=amount, date=date_str, client_code=client_code)
+    confidence = float(result.get("confidence", 0.0) or 0.0)
     debit = result.get("debit_account")
     credit = result.get("credit_account")
-    confidence = float(result.get("confidence", 0.0) or 0.0)
-    reason = result.get("reason") or ""
+    return {
+        "summary": summary,
+        "amount": amount,
+        "date": date_str,
+        "entry_date": entry_date,
+        "debit": debit,
+        "credit": credit,
+        "confidence": confidence,
+        "reason": result.get("reason") or "",
+        "account_match": result.get("account_match"),
+        "autopost": bool(
+            confidence >= settings.ai_autopost_threshold and debit and credit and result.get("accounts_valid", True)
+        ),
+    }
+
+
+def _entry_for(decision: dict[str, Any], document_path: Path, document_sha256: str) -> JournalEntry:
+    return JournalEntry(
+        date=decision["entry_date"],
+        summary=decision["summary"],
+        amount=decision["amount"],
+        debit_account=decision["debit"],
+        credit_account=decision["credit"],
+        confidence=decision["confidence"],
+        ai_reason=decision["reason"],
+        reviewed=False,
+        client_id=None,
+        pdf_path=str(document_path),
+        document_sha256=document_sha256,
+    )
+
+
+def _entry_dict(entry: JournalEntry) -> dict[str, Any]:
+    return {
+        "id": entry.id,
+        "date": entry.date.isoformat(),
+        "summary": entry.summary,
+        "amount": entry.amount,
+        "debit_account": entry.debit_account,
+        "credit_account": entry.credit_account,
+        "document_sha256": entry.document_sha256,
+    }
+
+
+def _suggestion(decision: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "debit_account": decision["debit"],
+        "credit_account": decision["credit"],
+        "confidence": decision["confidence"],
+        "reason": decision["reason"],
+        "account_match": decision["account_match"],
+    }
 
-    threshold = settings.ai_autopost_threshold
+
+def _post_chunk(decisions: List[dict[str, Any]], document_sha256: str, client_code: str, offset: int) -> List[dict[str, Any]]:
+    """Post the auto-postable records of a chunk in one tenant transaction.
+
+    Records matching an existing entry in the duplicate index are left as
+    suggestions flagged with ``duplicate_of``.
+    """
+    document_path = DocumentStore(client_code).path_for(document_sha256)
+    index = get_duplicate_index(client_code)
     db = get_session_for_client(client_code)
     try:
-        if confidence >= threshold and debit and credit:
-            entry = JournalEntry(
-                date=_date.fromisoformat(date_str.replace("/", "-")) if date_str else _date.today(),
-                summary=summary,
-                amount=amount,
-                debit_account=debit,
-                credit_account=credit,
-                confidence=confidence,
-                ai_reason=reason,
-                reviewed=False,
-                client_id=None,
-                pdf_path=str(file_path),
-            )
+        entries: Dict[int, JournalEntry] = {}
+        duplicates: Dict[int, List[int]] = {}
+        for i, d in enumerate(decisions):
+            if not d["autopost"]:
+                continue
+            entry = _entry_for(d, document_path, document_sha256)
+            dup = index.find(entry.date, entry.amount, entry.summary)
+            if dup:
+                duplicates[i] = dup
+                continue
             db.add(entry)
+            db.flush()
+            # Visible to the rest of the chunk so repeats inside one batch are caught too
+            index.add(entry.id, entry.date, entry.amount, entry.summary)
+            entries[i] = entry
+        try:
             db.commit()
-            db.refresh(entry)
-            return {"saved": True, "entry": {
-                "id": entry.id,
-                "date": entry.date.isoformat(),
-                "summary": entry.summary,
-                "amount": entry.amount,
-                "debit_account": entry.debit_account,
-                "credit_account": entry.credit_account,
-            }, "confidence": confidence, "reason": reason}
-        else:
-            return {
-                "saved": False,
-                "suggestion": {"debit_account": debit, "credit_account": credit, "confidence": confidence, "reason": reason},
-            }
+        except Exception:
+            invalidate_duplicate_index(client_code)
+            raise
+        results: List[dict[str, Any]] = []
+        for i, d in enumerate(decisions):
+            if "error" in d:
+                results.append({"index": offset + i, "saved": False, "error": d["error"]})
+            elif i in entries:
+                results.append({"index": offset + i, "saved": True, "entry": _entry_dict(entries[i]),
+                                "confidence": d["confidence"], "reason": d["reason"]})
+            elif i in duplicates:
+                results.append({"index": offset + i, "saved": False, "suggestion": _suggestion(d),
+                                "duplicate_of": duplicates[i]})
+            else:
+                results.append({"index": offset + i, "saved": False, "suggestion": _suggestion(d)})
+        return results
     finally:
         db.close()
 
+
+def process_scansnap_records(records: Iterable[dict[str, Any]], document_sha256: str, client_code: str) -> dict[str, Any]:
+    """Classify and post a stream of records, committing once per ``scan_batch_size`` chunk."""
+    results: List[dict[str, Any]] = []
+    it = iter(records)
+    while True:
+        chunk = list(itertools.islice(it, settings.scan_batch_size))
+        if not chunk:
+            break
+        decisions: List[dict[str, Any]] = []
+        for payload in chunk:
+            try:
+                decisions.append(_classify_record(payload, client_code))
+            except Exception as exc:
+                # One bad record must not sink the whole batch
+                decisions.append({**payload, "error": repr(exc), "autopost": False})
+        results.extend(_post_chunk(decisions, document_sha256, client_code, len(results)))
+    saved = sum(1 for r in results if r.get("saved"))
+    return {
+        "saved": saved > 0,
+        "batch": True,
+        "document_sha256": document_sha256,
+        "records": results,
+        "saved_count": saved,
+        "suggested_count": sum(1 for r in results if "suggestion" in r),
+        "failed_count": sum(1 for r in results if "error" in r),
+        "duplicate_count": sum(1 for r in results if "duplicate_of" in r),
+    }
+
+
+def process_scansnap_xml(file_path: Path, client_code: str) -> dict[str, Any]:
+    document_sha256 = store_source_document(file_path, client_code)
+    records = iter_scansnap_records(file_path)
+    head = list(itertools.islice(records, 2))
+    if len(head) > 1:
+        return process_scansnap_records(itertools.chain(head, records), document_sha256, client_code)
+
+    payload = head[0] if head else _record_from_fields({})
+    decision = _classify_record(payload, client_code)
+    result = _post_chunk([decision], document_sha256, client_code, 0)[0]
+    result.pop("index", None)
+    return result
@@ -0,0 +1,402 @@
+"""Online backups of the tenant databases and the master DB.
+
+Snapshots are taken with the SQLite online backup API, ``BACKUP_STEP_PAGES``
+pages at a time: the source is only read-locked for the duration of a step,
+so the scheduler and API keep writing while a backup runs (a write from
+another connection simply makes SQLite restart that file's copy). Files are
+copied in parallel by ``BACKUP_WORKERS`` threads that share one
+``BACKUP_IO_BYTES_PER_SEC`` budget.
+
+A snapshot is a directory ``<BACKUP_DIR>/<UTC timestamp>/`` holding one
+gzipped copy per database and a ``manifest.json`` with the SHA-256 of the
+raw and compressed files. Verification and restore decompress into a
+temporary directory and never open the live files for checking.
+
+Restore from the command line with the scheduler stopped::
+
+    python -m backend.backup list
+    python -m backend.backup verify [SNAPSHOT]
+    python -m backend.backup restore SNAPSHOT [--only clients/A001.db]
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .account_resolver import invalidate_resolver
+from .db_manager import get_master_engine, refresh_client_schema
+from .duplicate_index import invalidate_duplicate_index
+from .ingest_ledger import invalidate_ledger
+from .settings import settings
+from .txn_classifier import invalidate_vendor_classifier
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+_CHUNK = 1 << 20
+
+
+class BackupError(RuntimeError):
+    pass
+
+
+class IoBudget:
+    """Token bucket shared by the backup workers; ``consume`` sleeps once the rate is exceeded."""
+
+    def __init__(self, bytes_per_sec: int, clock=time.monotonic, sleep=time.sleep) -> None:
+        self.rate = max(int(bytes_per_sec), 0)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._available = float(self.rate)
+        self._stamp = clock()
+
+    def consume(self, nbytes: int) -> float:
+        if not self.rate or nbytes <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._available = min(self._available + (now - self._stamp) * self.rate, float(self.rate))
+            self._stamp = now
+            self._available -= nbytes
+            wait = -self._available / self.rate if self._available < 0 else 0.0
+        if wait:
+            self._sleep(wait)
+        return wait
+
+
+def _backup_root() -> Path:
+    return Path(settings.backup_dir)
+
+
+def _master_path() -> Optional[Path]:
+    url = get_master_engine().url
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return None
+    return Path(url.database)
+
+
+def live_databases() -> Dict[str, Path]:
+    """Snapshot name → live file: ``master.db`` and every ``clients/*.db`` (archived years included)."""
+    out: Dict[str, Path] = {}
+    master = _master_path()
+    if master is not None and master.exists():
+        out["master.db"] = master
+    for p in sorted(Path("clients").glob("*.db")):
+        out[f"clients/{p.name}"] = p
+    return out
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _online_copy(src: Path, dst: Path, budget: IoBudget, pages: Optional[int] = None) -> int:
+    """Copy ``src`` into ``dst`` through the backup API; returns the page count."""
+    source = sqlite3.connect(f"{src.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+    target = sqlite3.connect(dst)
+    try:
+        page_size = source.execute("PRAGMA page_size").fetchone()[0]
+        copied = {"left": None, "total": 0}
+
+        def progress(status, remaining, total):
+            left = copied["left"] if copied["left"] is not None else total
+            copied["left"], copied["total"] = remaining, total
+            budget.consume(max(left - remaining, 0) * page_size)
+
+        source.backup(target, pages=pages or settings.backup_step_pages, progress=progress)
+        return copied["total"]
+    finally:
+        target.close()
+        source.close()
+
+
+def _compress(raw: Path, gz: Path) -> Dict[str, Any]:
+    h = hashlib.sha256()
+    with open(raw, "rb") as f, gzip.open(gz, "wb", compresslevel=settings.backup_compress_level) as out:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+            out.write(chunk)
+    return {"size": raw.stat().st_size, "sha256": h.hexdigest(),
+            "gz_size": gz.stat().st_size, "gz_sha256": _file_sha256(gz)}
+
+
+def _snapshot_file(name: str, src: Path, workdir: Path, budget: IoBudget) -> Dict[str, Any]:
+    t0 = time.monotonic()
+    gz = workdir / f"{name}.gz"
+    gz.parent.mkdir(parents=True, exist_ok=True)
+    raw = gz.with_name(gz.name + ".tmp")
+    try:
+        pages = _online_copy(src, raw, budget)
+        info = _compress(raw, gz)
+    finally:
+        raw.unlink(missing_ok=True)
+    info.update(pages=pages, seconds=round(time.monotonic() - t0, 3))
+    return info
+
+
+def _new_snapshot_id(root: Path) -> str:
+    base = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    sid, n = base, 0
+    while (root / sid).exists() or (root / f"{sid}.partial").exists():
+        n += 1
+        sid = f"{base}-{n}"
+    return sid
+
+
+def create_snapshot(names: Optional[Iterable[str]] = None, budget: Optional[IoBudget] = None) -> Dict[str, Any]:
+    """Back up the live databases (default: all) into a new snapshot directory."""
+    live = live_databases()
+    if names is not None:
+        wanted = set(names)
+        live = {n: p for n, p in live.items() if n in wanted}
+    root = _backup_root()
+    root.mkdir(parents=True, exist_ok=True)
+    sid = _new_snapshot_id(root)
+    workdir = root / f"{sid}.partial"
+    workdir.mkdir()
+    budget = budget or IoBudget(settings.backup_io_bytes_per_sec)
+    manifest: Dict[str, Any] = {"id": sid, "created_at": datetime.utcnow().isoformat(), "files": {}, "errors": {}}
+    with ThreadPoolExecutor(max_workers=max(settings.backup_workers, 1), thread_name_prefix="backup") as ex:
+        futures = {name: ex.submit(_snapshot_file, name, path, workdir, budget) for name, path in live.items()}
+        for name, fut in futures.items():
+            try:
+                manifest["files"][name] = fut.result()
+            except Exception as exc:
+                logger.exception("Backup of %s failed", name)
+                manifest["errors"][name] = repr(exc)
+    manifest["finished_at"] = datetime.utcnow().isoformat()
+    manifest["ok"] = not manifest["errors"]
+    (workdir / MANIFEST).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    workdir.rename(root / sid)
+    return manifest
+
+
+def _read_manifest(snapshot_id: str) -> Dict[str, Any]:
+    path = _backup_root() / snapshot_id / MANIFEST
+    if not path.exists():
+        raise BackupError(f"Unknown snapshot {snapshot_id}")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def list_snapshots() -> List[Dict[str, Any]]:
+    """Complete snapshots, newest first."""
+    root = _backup_root()
+    if not root.exists():
+        return []
+    out = []
+    for d in sorted(root.iterdir(), reverse=True):
+        if d.is_dir() and not d.name.endswith(".partial") and (d / MANIFEST).exists():
+            out.append(json.loads((d / MANIFEST).read_text(encoding="utf-8")))
+    return out
+
+
+def prune_snapshots(keep: Optional[int] = None) -> List[str]:
+    """Keep the newest ``keep`` good snapshots and drop everything older than them."""
+    keep = settings.backup_keep if keep is None else keep
+    snaps = list_snapshots()
+    good = [s["id"] for s in snaps if s.get("ok")]
+    if keep <= 0 or len(good) <= keep:
+        return []
+    oldest_kept = good[keep - 1]
+    removed = [s["id"] for s in snaps if s["id"] < oldest_kept]
+    for sid in removed:
+        shutil.rmtree(_backup_root() / sid, ignore_errors=True)
+    return removed
+
+
+def _extract(snapshot_id: str, name: str, info: Dict[str, Any], dest: Path) -> Dict[str, Any]:
+    """Decompress one file into ``dest`` and check its checksums and SQLite integrity."""
+    gz = _backup_root() / snapshot_id / f"{name}.gz"
+    if not gz.exists():
+        return {"ok": False, "error": "missing"}
+    if _file_sha256(gz) != info["gz_sha256"]:
+        return {"ok": False, "error": "compressed checksum mismatch"}
+    h = hashlib.sha256()
+    try:
+        with gzip.open(gz, "rb") as f, open(dest, "wb") as out:
+            for chunk in iter(lambda: f.read(_CHUNK), b""):
+                h.update(chunk)
+                out.write(chunk)
+    except (OSError, EOFError) as exc:
+        return {"ok": False, "error": f"decompress failed: {exc}"}
+    if h.hexdigest() != info["sha256"]:
+        return {"ok": False, "error": "checksum mismatch"}
+    conn = sqlite3.connect(f"{dest.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        result = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+    except sqlite3.DatabaseError as exc:
+        result = [str(exc)]
+    finally:
+        conn.close()
+    if result != ["ok"]:
+        return {"ok": False, "error": "; ".join(result[:5])}
+    return {"ok": True}
+
+
+def verify_snapshot(snapshot_id: Optional[str] = None, record: bool = True) -> Dict[str, Any]:
+    """Check every file of a snapshot (default: the newest) in a scratch directory."""
+    if snapshot_id is None:
+        snaps = list_snapshots()
+        if not snaps:
+            raise BackupError("No snapshots")
+        snapshot_id = snaps[0]["id"]
+    manifest = _read_manifest(snapshot_id)
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="kaikei-verify-") as tmp:
+        for i, (name, info) in enumerate(sorted(manifest["files"].items())):
+            dest = Path(tmp) / f"{i}.db"
+            results[name] = _extract(snapshot_id, name, info, dest)
+            dest.unlink(missing_ok=True)
+    summary = {"id": snapshot_id, "verified_at": datetime.utcnow().isoformat(),
+               "ok": all(r["ok"] for r in results.values()), "files": results}
+    if record:
+        manifest["verification"] = {k: summary[k] for k in ("verified_at", "ok")}
+        manifest["verification"]["failed"] = {n: r["error"] for n, r in results.items() if not r["ok"]}
+        path = _backup_root() / snapshot_id / MANIFEST
+        path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return summary
+
+
+def _restore_target(name: str) -> Path:
+    if name == "master.db":
+        master = _master_path()
+        if master is None:
+            raise BackupError("The master DB is not a SQLite file")
+        return master
+    return Path(name)
+
+
+def _invalidate_caches(name: str) -> None:
+    if not name.startswith("clients/"):
+        return
+    code = Path(name).name.split(".", 1)[0]
+    # The snapshot may predate newer tables, and clients must not get 304s for content they never saw
+    refresh_client_schema(code)
+    invalidate_resolver(code)
+    invalidate_vendor_classifier(code)
+    invalidate_duplicate_index(code)
+    invalidate_ledger(code)
+
+
+def restore_snapshot(snapshot_id: str, names: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Restore files from a snapshot over the live databases.
+
+    Every selected file is verified first; nothing is written unless all of
+    them pass. Each file is then copied back through the backup API, so open
+    connections see the restored content rather than a replaced inode.
+    """
+    manifest = _read_manifest(snapshot_id)
+    selected = list(names) if names else sorted(manifest["files"])
+    unknown = [n for n in selected if n not in manifest["files"]]
+    if unknown:
+        raise BackupError(f"Not in snapshot {snapshot_id}: {', '.join(unknown)}")
+    restored: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="kaikei-restore-") as tmp:
+        staged: Dict[str, Path] = {}
+        for i, name in enumerate(selected):
+            dest = Path(tmp) / f"{i}.db"
+            check = _extract(snapshot_id, name, manifest["files"][name], dest)
+            if not check["ok"]:
+                raise BackupError(f"{name}: {check['error']}")
+            staged[name] = dest
+        unthrottled = IoBudget(0)
+        for name, src in staged.items():
+            target = _restore_target(name)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            mode = target.stat().st_mode if target.exists() else None
+            if mode is not None and not mode & stat.S_IWUSR:
+                os.chmod(target, mode | stat.S_IWUSR)
+            try:
+                pages = _online_copy(src, target, unthrottled, pages=-1)
+            finally:
+                if mode is not None:
+                    os.chmod(target, stat.S_IMODE(mode))
+            _invalidate_caches(name)
+            restored[name] = {"path": str(target), "pages": pages}
+    return {"id": snapshot_id, "restored": restored}
+
+
+# ---------------------------------------------------------------- scheduler entry points
+
+_run_lock = threading.Lock()
+
+
+def run_backup() -> Optional[Dict[str, Any]]:
+    """Snapshot, verify and prune; overlapping runs are skipped."""
+    if not _run_lock.acquire(blocking=False):
+        logger.info("Backup already running; skipped")
+        return None
+    try:
+        manifest = create_snapshot()
+        verification = verify_snapshot(manifest["id"])
+        if not verification["ok"]:
+            logger.error("Backup %s failed verification: %s", manifest["id"], verification["files"])
+        removed = prune_snapshots() if manifest["ok"] and verification["ok"] else []
+        return {"id": manifest["id"], "files": len(manifest["files"]), "errors": manifest["errors"],
+                "verified": verification["ok"], "pruned": removed}
+    finally:
+        _run_lock.release()
+
+
+def verify_backups() -> List[Dict[str, Any]]:
+    """Re-check every kept snapshot so a rotten file is found before it is needed."""
+    out = []
+    for snap in list_snapshots():
+        result = verify_snapshot(snap["id"])
+        if not result["ok"]:
+            logger.error("Backup %s failed verification: %s", snap["id"], result["files"])
+        out.append({"id": snap["id"], "ok": result["ok"]})
+    return out
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.backup", description="Online backups of kaikei databases")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("backup", help="take a snapshot now, verify it and apply retention")
+    sub.add_parser("list", help="list snapshots, newest first")
+    p_verify = sub.add_parser("verify", help="check a snapshot (default: newest)")
+    p_verify.add_argument("snapshot", nargs="?")
+    p_restore = sub.add_parser("restore", help="restore a snapshot over the live databases")
+    p_restore.add_argument("snapshot")
+    p_restore.add_argument("--only", action="append", metavar="NAME", help="e.g. master.db or clients/A001.db")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "backup":
+            result: Any = run_backup()
+        elif args.command == "list":
+            result = [{k: s.get(k) for k in ("id", "created_at", "ok", "verification")} | {"files": len(s["files"])}
+                      for s in list_snapshots()]
+        elif args.command == "verify":
+            result = verify_snapshot(args.snapshot)
+        else:
+            result = restore_snapshot(args.snapshot, args.only)
+    except BackupError as exc:
+        parser.exit(1, f"error: {exc}\n")
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0 if not isinstance(result, dict) or result.get("ok", True) is not False else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(main())
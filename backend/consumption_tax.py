@@ -0,0 +1,160 @@
+"""消費税 return worksheet from precomputed per-month totals.
+
+Triggers on ``journal_entries`` (see :mod:`backend.models_tax`) keep
+``tax_period_totals`` current per month and tax category as entries are
+inserted, edited or deleted, so a worksheet for any run of months only reads
+those rows. Everything is integer yen; divisions use exact fractions and are
+truncated once at the step where the return form truncates.
+
+The worksheet follows the general method (一般課税) with 割戻し計算 for both
+sales and purchases. 仕入税額控除 is prorated by 課税売上割合 (一括比例配分)
+when that ratio is below 95%. Purchases without a qualified invoice are
+credited at the transitional rate that applies to the month they were booked in.
+"""
+from __future__ import annotations
+
+import re
+from fractions import Fraction
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import text
+
+from .archive import partitions
+from .db_manager import get_engine_for_client, get_session_for_client
+from .models_tax import TAX_CATEGORIES, TaxPeriodTotal, backfill_tax_totals, category_sql, signed_yen_sql
+
+
+_MONTH_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+# National share of the tax-included price: 7.8/110 at the standard rate, 6.24/108 at the reduced rate
+NATIONAL_RATE = {"10": Fraction(78, 1100), "8": Fraction(624, 10800)}
+TAX_EXCLUDED = {"10": Fraction(100, 110), "8": Fraction(100, 108)}
+LOCAL_RATIO = Fraction(22, 78)
+
+# Share of input tax creditable for purchases without a qualified invoice, by first month it applies
+NO_INVOICE_CREDIT: List[Tuple[str, int]] = [("0000-01", 100), ("2023-10", 80), ("2026-10", 50), ("2029-10", 0)]
+
+
+class TaxPeriodError(ValueError):
+    pass
+
+
+def _check_period(start: str, end: str) -> None:
+    for m in (start, end):
+        if not _MONTH_RE.match(m or ""):
+            raise TaxPeriodError(f"Expected YYYY-MM, got {m!r}")
+    if start > end:
+        raise TaxPeriodError("Period start is after its end")
+
+
+def no_invoice_credit_percent(month: str) -> int:
+    pct = 100
+    for first, value in NO_INVOICE_CREDIT:
+        if month >= first:
+            pct = value
+    return pct
+
+
+def monthly_totals(client_code: str, start: str, end: str) -> Dict[str, Dict[str, Tuple[int, int]]]:
+    """period → category → (tax-included yen, entry count)."""
+    _check_period(start, end)
+    db = get_session_for_client(client_code)
+    try:
+        rows = (
+            db.query(TaxPeriodTotal.period, TaxPeriodTotal.category, TaxPeriodTotal.gross, TaxPeriodTotal.entries)
+            .filter(TaxPeriodTotal.period >= start, TaxPeriodTotal.period <= end)
+            .order_by(TaxPeriodTotal.period, TaxPeriodTotal.category)
+        )
+        out: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        for period, category, gross, entries in rows:
+            if gross or entries:
+                out.setdefault(period, {})[category] = (gross, entries)
+        return out
+    finally:
+        db.close()
+
+
+def _floor_to(value: int, unit: int) -> int:
+    return value // unit * unit if value >= 0 else -((-value) // unit * unit)
+
+
+def worksheet(client_code: str, start: str, end: str) -> Dict[str, Any]:
+    """Return-form figures for the months ``start``..``end`` (inclusive, YYYY-MM)."""
+    months = monthly_totals(client_code, start, end)
+    gross = {c: 0 for c in TAX_CATEGORIES}
+    creditable = {"10": Fraction(0), "8": Fraction(0)}  # tax-included purchases after the invoice rules
+    for period, cats in months.items():
+        pct = Fraction(no_invoice_credit_percent(period), 100)
+        for category, (yen, _) in cats.items():
+            gross[category] += yen
+        for rate in ("10", "8"):
+            creditable[rate] += cats.get(f"purchase_{rate}_invoice", (0, 0))[0]
+            creditable[rate] += cats.get(f"purchase_{rate}_noinvoice", (0, 0))[0] * pct
+
+    # 課税標準額: tax-excluded sales per rate, truncated to 1,000 yen
+    taxable_sales = {r: int(gross[f"sales_{r}"] * TAX_EXCLUDED[r]) for r in ("10", "8")}
+    tax_base = {r: _floor_to(v, 1000) for r, v in taxable_sales.items()}
+    output_tax = {"10": tax_base["10"] * 78 // 1000, "8": tax_base["8"] * 624 // 10000}
+
+    # 課税売上割合 = (taxable + exempt sales) / (taxable + exempt + non-taxable sales), all tax-excluded
+    numerator = sum(taxable_sales.values()) + gross["sales_exempt"]
+    denominator = numerator + gross["sales_nontaxable"]
+    ratio = Fraction(numerator, denominator) if denominator > 0 else Fraction(1)
+    input_before = {r: int(creditable[r] * NATIONAL_RATE[r]) for r in ("10", "8")}
+    full = ratio >= Fraction(95, 100)
+    input_tax = sum(input_before.values()) if full else int(sum(input_before.values()) * ratio)
+
+    net = sum(output_tax.values()) - input_tax
+    national_due = _floor_to(net, 100) if net > 0 else 0
+    national_refund = -net if net < 0 else 0
+    local_due = _floor_to(int(national_due * LOCAL_RATIO), 100)
+    local_refund = int(national_refund * LOCAL_RATIO)
+    return {
+        "from": start,
+        "to": end,
+        "gross": gross,
+        "entries": sum(n for cats in months.values() for _, n in cats.values()),
+        "taxable_sales": taxable_sales,  # 課税資産の譲渡等の対価の額
+        "tax_base": tax_base,  # 課税標準額
+        "output_tax": output_tax,  # 消費税額
+        "taxable_sales_ratio": float(ratio),  # 課税売上割合
+        "deduction_method": "full" if full else "proportional",
+        "input_tax_before_ratio": input_before,
+        "input_tax": input_tax,  # 控除対象仕入税額
+        "net_tax": net,
+        "national_tax_due": national_due,  # 差引税額 (百円未満切捨て)
+        "national_tax_refund": national_refund,  # 控除不足還付税額
+        "local_tax_due": local_due,  # 地方消費税 譲渡割額
+        "local_tax_refund": local_refund,
+        "total_due": national_due + local_due - national_refund - local_refund,
+    }
+
+
+def rebuild_tax_totals(client_code: str) -> Dict[str, int]:
+    """Recompute the totals from the active DB and every archived fiscal year (e.g. after changing REVENUE_ACCOUNTS)."""
+    parts = partitions(client_code)
+    engine = get_engine_for_client(client_code)
+    attached: List[str] = []
+    with engine.connect() as conn:
+        for p in parts:
+            schema = f"fy{p.fiscal_year}"
+            conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (p.path,))
+            cols = {r[1] for r in conn.exec_driver_sql(f"PRAGMA {schema}.table_info(journal_entries)")}
+            if "tax_type" in cols:
+                attached.append(schema)
+        try:
+            backfill_tax_totals(conn)
+            for schema in attached:
+                conn.execute(text(
+                    "INSERT INTO main.tax_period_totals (period, category, gross, entries) "
+                    f"SELECT strftime('%Y-%m', j.date), {category_sql('j')} AS cat, SUM({signed_yen_sql('j')}), COUNT(*) "
+                    f"FROM {schema}.journal_entries j WHERE j.date IS NOT NULL AND cat IS NOT NULL GROUP BY 1, 2 "
+                    "ON CONFLICT (period, category) DO UPDATE SET gross = gross + excluded.gross, "
+                    "entries = entries + excluded.entries"
+                ))
+            conn.commit()
+        finally:
+            for p in parts:
+                conn.exec_driver_sql(f"DETACH DATABASE fy{p.fiscal_year}")
+        rows = conn.exec_driver_sql("SELECT COUNT(*) FROM tax_period_totals").scalar()
+    return {"rows": rows, "archived_years": len(attached)}
@@ -3,21 +3,65 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Dict, Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 
 from .models_base import Base
+from .models_account import Account
+from .models_archive import ArchivePartition
+from .models_bank import BankTransaction, StagedTransaction, StatementImport, SyncAccount
 from .models_client import Client
+from .models_events import JournalEvent, install_event_triggers
+from .models_ingest import IngestRecord
+from .models_idempotency import IdempotencyRecord
 from .models_journal import JournalEntry, CorrectionHistory
+from .models_lease import SchedulerLease
+from .models_maintenance import MaintenanceRun
+from .models_migration import MigrationCheckpoint
+from .models_reconcile import ReconcileLink, ReconcileMatch
+from .models_tax import TaxPeriodTotal, backfill_tax_totals, install_tax_triggers
+from .models_version import ChangeVersion, bump_versions, install_version_triggers
 from .settings import settings
 
 
 _engine_cache: Dict[str, any] = {}
 
 
-def _ensure_client_schema(engine) -> None:
+def _add_missing_columns(engine) -> None:
+    # create_all() never alters existing tables; add nullable columns introduced later
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            added = [col for col in table.columns if col.name not in existing]
+            for col in added:
+                ddl = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {ddl}"))
+            for index in table.indexes:
+                if any(col in added for col in index.columns):
+                    index.create(conn, checkfirst=True)
+
+
+def _ensure_client_schema(engine, client_code: str) -> None:
     # Create tables for per-client DB
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns(engine)
+    with engine.begin() as conn:
+        fresh_tax = install_tax_triggers(conn)
+        has_archives = fresh_tax and conn.execute(text("SELECT 1 FROM archive_partitions LIMIT 1")).first() is not None
+        if fresh_tax and not has_archives:
+            backfill_tax_totals(conn)
+        install_version_triggers(conn)
+        install_event_triggers(conn)
+        # Left behind by the removed monthly_totals maintenance job
+        conn.exec_driver_sql("DROP TABLE IF EXISTS account_monthly_totals")
+    if has_archives:
+        # Years archived before the tax triggers existed are only in their archive files
+        from .consumption_tax import rebuild_tax_totals
+
+        rebuild_tax_totals(client_code)
 
 
 def get_engine_for_client(client_code: str):
@@ -28,10 +72,18 @@ def get_engine_for_client(client_code: str):
         return _engine_cache[url]
     engine = create_engine(url, connect_args={"check_same_thread": False})
     _engine_cache[url] = engine
-    _ensure_client_schema(engine)
+    _ensure_client_schema(engine, client_code)
     return engine
 
 
+def refresh_client_schema(client_code: str) -> None:
+    """Re-apply schema and triggers after the DB file was replaced in place (e.g. a restore) and advance its versions."""
+    engine = get_engine_for_client(client_code)
+    _ensure_client_schema(engine, client_code)
+    with engine.begin() as conn:
+        bump_versions(conn)
+
+
 def get_session_for_client(client_code: str):
     engine = get_engine_for_client(client_code)
     Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
@@ -50,6 +102,7 @@ def get_master_engine():
         from sqlalchemy.orm import declarative_base
         # Reuse Base; ensure table exists
         Client.metadata.create_all(bind=_master_engine)  # type: ignore[attr-defined]
+        _add_missing_columns(_master_engine)
     return _master_engine
 
 
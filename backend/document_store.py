@@ -0,0 +1,121 @@
+"""Per-tenant content-addressed store for receipt PDFs and XMLs.
+
+Documents live at ``<document_store_dir>/<client>/<aa>/<bb>/<sha256>``.
+Ingesting the same bytes twice stores them once. Files are hardlinked into
+the store when possible (``document_store_mode=link``) and copied otherwise.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+from .ingest_ledger import file_sha256
+from .settings import settings
+
+
+CHUNK_SIZE = 1 << 16
+
+
+def sniff_media_type(head: bytes) -> str:
+    if head.startswith(b"%PDF"):
+        return "application/pdf"
+    stripped = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if stripped.startswith(b"<"):
+        return "application/xml"
+    if head[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    return "application/octet-stream"
+
+
+class DocumentStore:
+    def __init__(self, client_code: str, root: Optional[Path] = None) -> None:
+        self.client_code = client_code
+        self.root = (Path(root or settings.document_store_dir) / client_code).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def exists(self, sha256: str) -> bool:
+        if len(sha256) != 64 or not all(c in "0123456789abcdef" for c in sha256):
+            return False
+        return self.path_for(sha256).is_file()
+
+    def _tmp_path(self) -> Path:
+        fd, name = tempfile.mkstemp(prefix=".incoming-", dir=self.root)
+        os.close(fd)
+        return Path(name)
+
+    def _commit(self, tmp: Path, sha256: str) -> str:
+        dest = self.path_for(sha256)
+        if dest.exists():
+            tmp.unlink(missing_ok=True)
+            return sha256
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, dest)
+        return sha256
+
+    def put_file(self, src: Path, move: bool = False) -> str:
+        """Add ``src`` to the store and return its sha256.
+
+        ``move`` transfers a file the caller owns (e.g. an upload temp file);
+        otherwise the source is hardlinked or copied and left in place.
+        """
+        sha256 = file_sha256(src)
+        if self.path_for(sha256).exists():
+            if move:
+                src.unlink(missing_ok=True)
+            return sha256
+        tmp = self._tmp_path()
+        if move:
+            os.replace(src, tmp)
+            return self._commit(tmp, sha256)
+        if settings.document_store_mode == "link":
+            tmp.unlink()
+            try:
+                os.link(src, tmp)
+                return self._commit(tmp, sha256)
+            except OSError:
+                pass  # other filesystem or no hardlink support
+        shutil.copyfile(src, tmp)
+        return self._commit(tmp, sha256)
+
+    def put_stream(self, stream: BinaryIO) -> str:
+        h = hashlib.sha256()
+        tmp = self._tmp_path()
+        with open(tmp, "wb") as out:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                h.update(chunk)
+                out.write(chunk)
+        return self._commit(tmp, h.hexdigest())
+
+    def media_type(self, sha256: str) -> str:
+        with open(self.path_for(sha256), "rb") as f:
+            return sniff_media_type(f.read(16))
+
+    def iter_range(self, sha256: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield bytes ``start``..``end`` (inclusive) in chunks."""
+        path = self.path_for(sha256)
+        last = path.stat().st_size - 1 if end is None else end
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = last - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+def store_source_document(xml_file: Path, client_code: str) -> str:
+    """Store the receipt for a ScanSnap XML: the sibling PDF when present, else the XML itself."""
+    store = DocumentStore(client_code)
+    pdf = xml_file.with_suffix(".pdf")
+    return store.put_file(pdf if pdf.is_file() else xml_file)
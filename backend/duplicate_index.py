@@ -0,0 +1,196 @@
+"""Per-tenant duplicate receipt/journal detection.
+
+Entries are indexed by integer-yen amount, each bucket holding a date-sorted
+list, so a lookup for "same amount within ±N days" is a bisect plus a short
+scan. Vendor names are compared after normalization with a bigram Dice score.
+
+A cached index catches up with the tenant's ``journal_events`` log (see
+:mod:`backend.models_events`) on every lookup, so updates and deletes made by
+any process, including rows archived away, are reflected. It is rebuilt when
+the events it missed have been trimmed.
+"""
+from __future__ import annotations
+
+import bisect
+import re
+import threading
+from collections import defaultdict
+from datetime import date as _date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from .account_resolver import char_ngrams, normalize_name
+from .db_manager import get_engine_for_client, get_session_for_client
+from .models_events import JournalEvent
+from .models_journal import JournalEntry
+from .settings import settings
+
+
+_NOISE_RE = re.compile(r"[0-9,.]+|円|¥|税込|税抜|領収書|レシート")
+
+# (date ordinal, entry id, vendor key)
+_Item = Tuple[int, int, str]
+
+
+def vendor_key(text: str | None) -> str:
+    """Normalize a vendor/summary string, dropping amounts and receipt boilerplate."""
+    return _NOISE_RE.sub("", normalize_name(text))
+
+
+def vendor_similarity(a: str, b: str) -> float:
+    if not a or not b:
+        return 0.0
+    if a == b or a in b or b in a:
+        return 1.0
+    ga, gb = char_ngrams(a), char_ngrams(b)
+    return 2.0 * len(ga & gb) / (len(ga) + len(gb))
+
+
+def amount_key(amount: float | None) -> int:
+    return int(round(abs(amount or 0.0)))
+
+
+class DuplicateIndex:
+    def __init__(self) -> None:
+        self._buckets: Dict[int, List[_Item]] = defaultdict(list)
+        self._items: Dict[int, Tuple[int, _Item]] = {}  # entry id -> (amount key, item)
+        self._lock = threading.Lock()
+        self.last_event_id = 0
+
+    def _discard(self, entry_id: int) -> None:
+        held = self._items.pop(entry_id, None)
+        if held is None:
+            return
+        bucket = self._buckets[held[0]]
+        i = bisect.bisect_left(bucket, held[1])
+        if i < len(bucket) and bucket[i] == held[1]:
+            del bucket[i]
+
+    def add(self, entry_id: int, day: _date, amount: float, vendor: str | None) -> None:
+        """Index an entry, replacing what was indexed for the same id before."""
+        key, item = amount_key(amount), (day.toordinal(), entry_id, vendor_key(vendor))
+        with self._lock:
+            self._discard(entry_id)
+            bisect.insort(self._buckets[key], item)
+            self._items[entry_id] = (key, item)
+
+    def remove(self, entry_id: int) -> None:
+        with self._lock:
+            self._discard(entry_id)
+
+    def find(
+        self,
+        day: _date,
+        amount: float,
+        vendor: str | None,
+        window_days: Optional[int] = None,
+        exclude_id: Optional[int] = None,
+    ) -> List[int]:
+        """Return ids of entries with the same amount within the window and a similar vendor."""
+        window = settings.duplicate_window_days if window_days is None else window_days
+        key = vendor_key(vendor)
+        ordinal = day.toordinal()
+        out: List[int] = []
+        with self._lock:
+            bucket = self._buckets.get(amount_key(amount))
+            if not bucket:
+                return out
+            i = bisect.bisect_left(bucket, (ordinal - window, -1, ""))
+            while i < len(bucket) and bucket[i][0] <= ordinal + window:
+                _, entry_id, other = bucket[i]
+                if entry_id != exclude_id and vendor_similarity(key, other) >= settings.duplicate_vendor_min_score:
+                    out.append(entry_id)
+                i += 1
+        return out
+
+    def clusters(self, window_days: Optional[int] = None) -> List[List[int]]:
+        """Group the whole history into clusters of suspected duplicates."""
+        window = settings.duplicate_window_days if window_days is None else window_days
+        result: List[List[int]] = []
+        with self._lock:
+            buckets = [list(b) for b in self._buckets.values() if len(b) > 1]
+        for bucket in buckets:
+            parent = list(range(len(bucket)))
+
+            def root(i: int) -> int:
+                while parent[i] != i:
+                    parent[i] = parent[parent[i]]
+                    i = parent[i]
+                return i
+
+            for i, (day_i, _, key_i) in enumerate(bucket):
+                j = i + 1
+                while j < len(bucket) and bucket[j][0] - day_i <= window:
+                    if vendor_similarity(key_i, bucket[j][2]) >= settings.duplicate_vendor_min_score:
+                        parent[root(j)] = root(i)
+                    j += 1
+            groups: Dict[int, List[int]] = defaultdict(list)
+            for i, item in enumerate(bucket):
+                groups[root(i)].append(item[1])
+            result.extend(sorted(g) for g in groups.values() if len(g) > 1)
+        return result
+
+
+_indexes: Dict[str, DuplicateIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _build(client_code: str) -> DuplicateIndex:
+    from .journal_events import latest_event_id
+
+    index = DuplicateIndex()
+    # Taken first: writes racing the scan are applied again by the catch-up, which is idempotent
+    index.last_event_id = latest_event_id(client_code)
+    db = get_session_for_client(client_code)
+    try:
+        rows = db.query(JournalEntry.id, JournalEntry.date, JournalEntry.amount, JournalEntry.summary).yield_per(1000)
+        for entry_id, day, amount, summary in rows:
+            if day is not None:
+                index.add(entry_id, day, amount, summary)
+    finally:
+        db.close()
+    return index
+
+
+def _catch_up(client_code: str, index: DuplicateIndex) -> bool:
+    """Apply journal writes logged since the index last looked; False when they were trimmed."""
+    from .journal_events import missed_events_trimmed
+
+    after = index.last_event_id
+    if missed_events_trimmed(client_code, after):
+        return False
+    e, j = JournalEvent.__table__, JournalEntry.__table__
+    stmt = (
+        select(e.c.id, e.c.entry_id, j.c.id, j.c.date, j.c.amount, j.c.summary)
+        .select_from(e.outerjoin(j, j.c.id == e.c.entry_id))
+        .where(e.c.id > after)
+        .order_by(e.c.id)
+    )
+    with get_engine_for_client(client_code).connect() as conn:
+        rows = conn.execute(stmt).all()
+    # Each row carries the entry's current values, so replaying an event twice is harmless
+    for _, entry_id, row_id, day, amount, summary in rows:
+        if row_id is None or day is None:
+            index.remove(entry_id)
+        else:
+            index.add(entry_id, day, amount, summary)
+    if rows:
+        index.last_event_id = max(index.last_event_id, rows[-1][0])
+    return True
+
+
+def get_duplicate_index(client_code: str) -> DuplicateIndex:
+    with _indexes_lock:
+        index = _indexes.get(client_code)
+    if index is not None and _catch_up(client_code, index):
+        return index
+    index = _build(client_code)
+    with _indexes_lock:
+        _indexes[client_code] = index
+    return index
+
+
+def invalidate_duplicate_index(client_code: str) -> None:
+    with _indexes_lock:
+        _indexes.pop(client_code, None)
@@ -0,0 +1,67 @@
+"""Local fake bank/card provider for developing and testing the sync.
+
+Serves the cursor API ``HttpConnector`` expects with deterministic
+transactions per account. ``POST /accounts/{ref}/advance`` appends new ones
+so incremental syncs can be exercised.
+
+    uvicorn backend.fake_provider:app --port 8765
+"""
+from __future__ import annotations
+
+import os
+import random
+from datetime import date as _date, timedelta
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException
+
+
+VENDORS = [
+    ("振込 ヤマダデンキ", -12800.0),
+    ("カード アマゾン", -3480.0),
+    ("口座振替 東京電力", -8200.0),
+    ("振込 カブシキガイシャサンプル", 330000.0),
+    ("ATM 出金", -20000.0),
+    ("引落 NTTドコモ", -6600.0),
+]
+
+app = FastAPI(title="Fake bank/card provider")
+_counts: Dict[str, int] = {}
+_initial = int(os.getenv("FAKE_PROVIDER_INITIAL", "50"))
+
+
+def _transaction(account_ref: str, i: int) -> Dict[str, Any]:
+    rng = random.Random(f"{account_ref}:{i}")
+    description, base = rng.choice(VENDORS)
+    return {
+        "id": f"{account_ref}-{i:06d}",
+        "date": (_date(2024, 1, 1) + timedelta(days=i // 3)).isoformat(),
+        "amount": base,
+        "description": description,
+        "balance": None,
+    }
+
+
+def reset(initial: Optional[int] = None) -> None:
+    global _initial
+    _counts.clear()
+    if initial is not None:
+        _initial = initial
+
+
+@app.get("/accounts/{account_ref}/transactions")
+def list_transactions(account_ref: str, cursor: Optional[str] = None, limit: int = 100):
+    total = _counts.setdefault(account_ref, _initial)
+    try:
+        start = int(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    end = min(start + max(limit, 1), total)
+    items: List[Dict[str, Any]] = [_transaction(account_ref, i) for i in range(start, end)]
+    return {"transactions": items, "next_cursor": str(end), "has_more": end < total}
+
+
+@app.post("/accounts/{account_ref}/advance")
+def advance(account_ref: str, n: int = 10):
+    _counts[account_ref] = _counts.get(account_ref, _initial) + n
+    return {"account_ref": account_ref, "total": _counts[account_ref]}
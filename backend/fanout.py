@@ -0,0 +1,194 @@
+"""Read-only queries fanned out across every tenant DB.
+
+A :class:`FanoutQuery` is one or more parameterized SQL statements run
+against each ``clients/<code>.db`` over a read-only connection, on a shared
+pool of ``FANOUT_WORKERS`` threads. A tenant that takes longer than
+``FANOUT_TIMEOUT_SECONDS`` is interrupted by SQLite's progress handler and
+reported as ``timeout``; tenants not started before ``FANOUT_DEADLINE_SECONDS``
+are skipped the same way, so one slow file never holds up the portfolio.
+Results stream back in completion order and the full set is cached for
+``FANOUT_CACHE_SECONDS``.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .db_manager import get_master_session
+from .models_client import Client
+from .settings import settings
+
+
+OK = "ok"
+TIMEOUT = "timeout"
+ERROR = "error"
+MISSING = "missing"
+
+
+@dataclass
+class FanoutQuery:
+    name: str
+    statements: Dict[str, str]  # result key → SQL with :named parameters
+    description: str = ""
+
+
+@dataclass
+class TenantResult:
+    client_code: str
+    status: str
+    data: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"client_code": self.client_code, "status": self.status, "data": self.data,
+                "error": self.error, "seconds": self.seconds}
+
+
+_REVENUE = (
+    "(SELECT name FROM accounts WHERE type IN ('revenue', '収益') "
+    "UNION SELECT value FROM json_each(:revenue_accounts))"
+)
+
+QUERIES: Dict[str, FanoutQuery] = {
+    q.name: q
+    for q in (
+        FanoutQuery("unreviewed", {
+            "unreviewed": "SELECT COUNT(*) AS count FROM journal_entries WHERE reviewed = 0 OR reviewed IS NULL",
+        }, "Entries waiting for review"),
+        FanoutQuery("low_confidence", {
+            "low_confidence": "SELECT COUNT(*) AS count FROM journal_entries "
+                              "WHERE (reviewed = 0 OR reviewed IS NULL) AND confidence < :threshold",
+        }, "Unreviewed AI suggestions below the auto-post threshold"),
+        FanoutQuery("monthly_revenue", {
+            "monthly_revenue": "SELECT strftime('%Y-%m', date) AS month, "
+                               f"SUM(CASE WHEN credit_account IN {_REVENUE} THEN amount ELSE 0 END) - "
+                               f"SUM(CASE WHEN debit_account IN {_REVENUE} THEN amount ELSE 0 END) AS revenue "
+                               "FROM journal_entries WHERE date >= :since "
+                               f"AND (credit_account IN {_REVENUE} OR debit_account IN {_REVENUE}) "
+                               "GROUP BY month ORDER BY month",
+        }, "Net revenue per month"),
+    )
+}
+QUERIES["dashboard"] = FanoutQuery(
+    "dashboard",
+    {k: v for name in ("unreviewed", "low_confidence", "monthly_revenue") for k, v in QUERIES[name].statements.items()},
+    "Unreviewed, low-confidence backlog and monthly revenue in one pass",
+)
+
+
+def default_params(months: int = 12, today: Optional[date] = None) -> Dict[str, Any]:
+    today = today or date.today()
+    y, m = divmod(today.year * 12 + today.month - 1 - (months - 1), 12)
+    return {
+        "threshold": settings.ai_autopost_threshold,
+        "since": date(y, m + 1, 1).isoformat(),
+        "revenue_accounts": json.dumps(settings.revenue_accounts, ensure_ascii=False),
+    }
+
+
+def run_on_tenant(client_code: str, query: FanoutQuery, params: Dict[str, Any],
+                  timeout: Optional[float] = None, deadline: Optional[float] = None) -> TenantResult:
+    t0 = time.monotonic()
+    stop = t0 + (settings.fanout_timeout_seconds if timeout is None else timeout)
+    if deadline is not None:
+        if t0 >= deadline:
+            return TenantResult(client_code, TIMEOUT, error="not started before the deadline")
+        stop = min(stop, deadline)
+    path = Path(f"clients/{client_code}.db")
+    if not path.exists():
+        return TenantResult(client_code, MISSING)
+    conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True, timeout=max(stop - t0, 0.0))
+    try:
+        conn.row_factory = sqlite3.Row
+        # A non-zero return aborts the running statement with "interrupted"
+        conn.set_progress_handler(lambda: time.monotonic() > stop, 1000)
+        data = {key: [dict(r) for r in conn.execute(sql, params)] for key, sql in query.statements.items()}
+        return TenantResult(client_code, OK, data, seconds=round(time.monotonic() - t0, 4))
+    except sqlite3.OperationalError as exc:
+        status = TIMEOUT if "interrupted" in str(exc) or time.monotonic() > stop else ERROR
+        return TenantResult(client_code, status, error=str(exc), seconds=round(time.monotonic() - t0, 4))
+    except sqlite3.DatabaseError as exc:
+        return TenantResult(client_code, ERROR, error=str(exc), seconds=round(time.monotonic() - t0, 4))
+    finally:
+        conn.close()
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max(settings.fanout_workers, 1), thread_name_prefix="fanout")
+        return _pool
+
+
+def tenant_codes() -> List[str]:
+    with get_master_session() as s:
+        return [code for (code,) in s.query(Client.code).order_by(Client.code)]
+
+
+def fanout(query: FanoutQuery, params: Dict[str, Any], tenants: Optional[Sequence[str]] = None,
+           timeout: Optional[float] = None) -> Iterator[TenantResult]:
+    """Run ``query`` on every tenant (default: all registered) and yield results as they finish."""
+    codes = list(tenants) if tenants is not None else tenant_codes()
+    deadline = time.monotonic() + settings.fanout_deadline_seconds
+    pool = _executor()
+    futures = [pool.submit(run_on_tenant, code, query, params, timeout, deadline) for code in codes]
+    for fut in as_completed(futures):
+        yield fut.result()
+
+
+# ---------------------------------------------------------------- short-lived result cache
+
+_cache: Dict[Tuple, Tuple[float, List[TenantResult]]] = {}
+_cache_lock = threading.Lock()
+
+
+def _cache_key(name: str, params: Dict[str, Any], tenants: Optional[Sequence[str]]) -> Tuple:
+    return name, tuple(sorted((k, str(v)) for k, v in params.items())), tuple(tenants) if tenants is not None else None
+
+
+def cached(name: str, params: Dict[str, Any], tenants: Optional[Sequence[str]] = None) -> Optional[List[TenantResult]]:
+    with _cache_lock:
+        hit = _cache.get(_cache_key(name, params, tenants))
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+    return None
+
+
+def stream_query(name: str, params: Dict[str, Any], tenants: Optional[Sequence[str]] = None) -> Iterator[TenantResult]:
+    """Cached results if fresh, otherwise stream a new fan-out and cache it once it completes."""
+    hit = cached(name, params, tenants)
+    if hit is not None:
+        yield from hit
+        return
+    results: List[TenantResult] = []
+    for r in fanout(QUERIES[name], params, tenants):
+        results.append(r)
+        yield r
+    if settings.fanout_cache_seconds > 0:
+        with _cache_lock:
+            now = time.monotonic()
+            for k in [k for k, (exp, _) in _cache.items() if exp <= now]:
+                del _cache[k]
+            _cache[_cache_key(name, params, tenants)] = (now + settings.fanout_cache_seconds, results)
+
+
+def run_query(name: str, params: Dict[str, Any], tenants: Optional[Sequence[str]] = None) -> List[TenantResult]:
+    return list(stream_query(name, params, tenants))
+
+
+def invalidate_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,86 @@
+"""Stored responses for requests sent with an ``Idempotency-Key``.
+
+The first request with a key claims a row in the tenant's
+``idempotency_keys`` table and runs normally; its response is then stored
+with the request fingerprint. A retry with the same key is answered from
+that row, a primary-key lookup, instead of writing journals or calling the
+LLM again. While the first request is still running, retries are told to
+wait. Rows expire after ``IDEMPOTENCY_TTL_HOURS`` and are purged by the
+maintenance job.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .db_manager import get_engine_for_client
+from .models_idempotency import IdempotencyRecord
+from .settings import settings
+
+
+CLAIMED = "claimed"
+PENDING = "pending"
+DONE = "done"
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: Optional[str]
+    status_code: int
+    content_type: Optional[str]
+    body: bytes
+
+
+def claim(client_code: str, key: str, now: Optional[datetime] = None) -> Tuple[str, Optional[StoredResponse]]:
+    """Claim ``key`` for a new request, or report the state of the request that holds it.
+
+    Expired rows and rows whose first request stalled for longer than
+    ``IDEMPOTENCY_PENDING_SECONDS`` are taken over.
+    """
+    now = now or datetime.utcnow()
+    t = IdempotencyRecord.__table__
+    stale = now - timedelta(seconds=settings.idempotency_pending_seconds)
+    fresh = {"fingerprint": None, "status_code": None, "content_type": None, "body": None, "created_at": now,
+             "completed_at": None, "expires_at": now + timedelta(hours=settings.idempotency_ttl_hours)}
+    with get_engine_for_client(client_code).begin() as conn:
+        # One upsert, so two concurrent first requests cannot both claim the key
+        claimed = conn.execute(
+            sqlite_insert(t).values(key=key, **fresh).on_conflict_do_update(
+                index_elements=["key"], set_=fresh,
+                where=or_(t.c.expires_at <= now, and_(t.c.completed_at.is_(None), t.c.created_at <= stale)),
+            )
+        ).rowcount
+        if claimed:
+            return CLAIMED, None
+        row = conn.execute(
+            select(t.c.fingerprint, t.c.status_code, t.c.content_type, t.c.body, t.c.completed_at).where(t.c.key == key)
+        ).one()
+    if row.completed_at is None:
+        return PENDING, None
+    return DONE, StoredResponse(row.fingerprint, row.status_code, row.content_type, row.body or b"")
+
+
+def complete(client_code: str, key: str, response: StoredResponse) -> None:
+    t = IdempotencyRecord.__table__
+    with get_engine_for_client(client_code).begin() as conn:
+        conn.execute(update(t).where(t.c.key == key).values(
+            fingerprint=response.fingerprint, status_code=response.status_code,
+            content_type=response.content_type, body=response.body, completed_at=datetime.utcnow(),
+        ))
+
+
+def release(client_code: str, key: str) -> None:
+    """Forget a claim whose request failed, so a retry runs it again."""
+    t = IdempotencyRecord.__table__
+    with get_engine_for_client(client_code).begin() as conn:
+        conn.execute(delete(t).where(t.c.key == key, t.c.completed_at.is_(None)))
+
+
+def purge_expired(client_code: str, now: Optional[datetime] = None) -> int:
+    t = IdempotencyRecord.__table__
+    with get_engine_for_client(client_code).begin() as conn:
+        return conn.execute(delete(t).where(t.c.expires_at <= (now or datetime.utcnow()))).rowcount
@@ -0,0 +1,251 @@
+"""Persistent, content-hashed ingestion ledger for scanned documents.
+
+The ledger is stored per tenant in the ``ingest_ledger`` table and mirrored
+in memory, so the watcher can decide from (path, size, mtime) alone whether
+a document still needs work. Content hashes detect the same receipt arriving
+under a different name.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .db_manager import get_session_for_client
+from .models_ingest import IngestRecord
+from .settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SUGGESTED = "suggested"
+POSTED = "posted"
+RETRY = "retry"
+FAILED = "failed"
+DUPLICATE = "duplicate"
+
+# States that need no further work unless the file content changes
+HANDLED_STATES = {SUGGESTED, POSTED, FAILED, DUPLICATE}
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 16) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@dataclass
+class LedgerEntry:
+    path: str
+    content_hash: Optional[str]
+    size: Optional[int]
+    mtime: Optional[float]
+    state: str
+    attempts: int = 0
+    retry_after: Optional[datetime] = None
+    entry_id: Optional[int] = None
+    duplicate_of: Optional[str] = None
+    error: Optional[str] = None
+
+
+class IngestLedger:
+    def __init__(self, client_code: str) -> None:
+        self.client_code = client_code
+        self._lock = threading.RLock()
+        self._by_path: Dict[str, LedgerEntry] = {}
+        self._by_hash: Dict[str, str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        db = get_session_for_client(self.client_code)
+        try:
+            for r in db.query(IngestRecord).all():
+                e = LedgerEntry(
+                    path=r.path,
+                    content_hash=r.content_hash,
+                    size=r.size,
+                    mtime=r.mtime,
+                    state=r.state,
+                    attempts=r.attempts or 0,
+                    retry_after=r.retry_after,
+                    entry_id=r.entry_id,
+                    duplicate_of=r.duplicate_of,
+                    error=r.error,
+                )
+                # Interrupted mid-flight: try again
+                if e.state == PENDING:
+                    e.state = RETRY
+                self._index(e)
+        finally:
+            db.close()
+
+    def _index(self, e: LedgerEntry) -> None:
+        prev = self._by_path.get(e.path)
+        if prev is not None and prev.content_hash != e.content_hash and self._by_hash.get(prev.content_hash) == e.path:
+            # The path no longer holds that content
+            del self._by_hash[prev.content_hash]
+        self._by_path[e.path] = e
+        if e.content_hash and e.state != DUPLICATE:
+            self._by_hash.setdefault(e.content_hash, e.path)
+
+    def _persist(self, e: LedgerEntry) -> None:
+        db = get_session_for_client(self.client_code)
+        try:
+            r = db.query(IngestRecord).filter(IngestRecord.path == e.path).first()
+            if r is None:
+                r = IngestRecord(path=e.path)
+                db.add(r)
+            r.content_hash = e.content_hash
+            r.size = e.size
+            r.mtime = e.mtime
+            r.state = e.state
+            r.attempts = e.attempts
+            r.retry_after = e.retry_after
+            r.entry_id = e.entry_id
+            r.duplicate_of = e.duplicate_of
+            r.error = e.error
+            r.updated_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    def get(self, path: str) -> Optional[LedgerEntry]:
+        with self._lock:
+            return self._by_path.get(path)
+
+    def find_hash(self, content_hash: str) -> Optional[LedgerEntry]:
+        with self._lock:
+            path = self._by_hash.get(content_hash)
+            return self._by_path.get(path) if path else None
+
+    def needs_processing(self, path: str, size: int, mtime: float, now: Optional[datetime] = None) -> bool:
+        """O(1) check from file metadata; no hashing for unchanged documents."""
+        with self._lock:
+            e = self._by_path.get(path)
+            if e is None or (e.size, e.mtime) != (size, mtime):
+                return True
+            if e.state == RETRY:
+                return e.retry_after is None or e.retry_after <= (now or datetime.utcnow())
+            return e.state not in HANDLED_STATES and e.state != PENDING
+
+    def begin(self, path: str, size: int, mtime: float, content_hash: str) -> Optional[LedgerEntry]:
+        """Mark a document pending, or duplicate when its content was already ingested elsewhere.
+
+        Returns None when another worker already holds the document.
+        """
+        with self._lock:
+            prev = self._by_path.get(path)
+            if prev is not None and prev.state == PENDING:
+                return None
+            original = self._by_hash.get(content_hash)
+            if prev is not None and prev.content_hash == content_hash and prev.state in HANDLED_STATES:
+                # Touched but unchanged content
+                prev.size, prev.mtime = size, mtime
+                e = prev
+            elif original is not None and original != path and self._by_path[original].state != FAILED:
+                e = LedgerEntry(path=path, content_hash=content_hash, size=size, mtime=mtime,
+                                state=DUPLICATE, duplicate_of=original)
+            else:
+                e = LedgerEntry(path=path, content_hash=content_hash, size=size, mtime=mtime, state=PENDING,
+                                attempts=prev.attempts if prev and prev.content_hash == content_hash else 0)
+            self._index(e)
+        self._persist(e)
+        return e
+
+    def finish(self, path: str, state: str, entry_id: Optional[int] = None, error: Optional[str] = None) -> LedgerEntry:
+        with self._lock:
+            e = self._by_path[path]
+            e.state = state
+            e.entry_id = entry_id if entry_id is not None else e.entry_id
+            e.error = error
+            e.retry_after = None
+        self._persist(e)
+        return e
+
+    def fail(self, path: str, error: str, now: Optional[datetime] = None) -> LedgerEntry:
+        """Record a failed attempt, backing off exponentially until ``ingest_max_attempts``."""
+        with self._lock:
+            e = self._by_path[path]
+            e.attempts += 1
+            e.error = error[:2000]
+            if e.attempts >= settings.ingest_max_attempts:
+                e.state = FAILED
+                e.retry_after = None
+            else:
+                delay = settings.ingest_retry_base_seconds * (2 ** (e.attempts - 1))
+                e.state = RETRY
+                e.retry_after = (now or datetime.utcnow()) + timedelta(seconds=delay)
+        self._persist(e)
+        return e
+
+    def due_retries(self, now: Optional[datetime] = None) -> List[str]:
+        now = now or datetime.utcnow()
+        with self._lock:
+            return [
+                e.path for e in self._by_path.values()
+                if e.state == RETRY and (e.retry_after is None or e.retry_after <= now)
+            ]
+
+    def entries(self, state: Optional[str] = None) -> List[LedgerEntry]:
+        with self._lock:
+            return [e for e in self._by_path.values() if state is None or e.state == state]
+
+
+_ledgers: Dict[str, IngestLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(client_code: str) -> IngestLedger:
+    with _ledgers_lock:
+        ledger = _ledgers.get(client_code)
+        if ledger is None:
+            ledger = IngestLedger(client_code)
+            _ledgers[client_code] = ledger
+        return ledger
+
+
+def invalidate_ledger(client_code: str) -> None:
+    with _ledgers_lock:
+        _ledgers.pop(client_code, None)
+
+
+def ingest_file(
+    client_code: str,
+    path: Path,
+    processor: Callable[[Path, str], Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    """Run ``processor`` for a document unless the ledger says it is already handled.
+
+    Returns the processor result, a duplicate marker, or None when skipped.
+    """
+    ledger = get_ledger(client_code)
+    key = str(path.resolve())
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    if not ledger.needs_processing(key, st.st_size, st.st_mtime):
+        return None
+    e = ledger.begin(key, st.st_size, st.st_mtime, file_sha256(path))
+    if e is None:
+        return None
+    if e.state == DUPLICATE:
+        return {"saved": False, "duplicate": True, "duplicate_of": e.duplicate_of}
+    if e.state != PENDING:
+        return None
+    try:
+        result = processor(path, client_code)
+    except Exception as exc:
+        logger.exception("Ingest failed for %s", key)
+        ledger.fail(key, repr(exc))
+        return None
+    entry = result.get("entry") or {}
+    ledger.finish(key, POSTED if result.get("saved") else SUGGESTED, entry_id=entry.get("id"))
+    return result
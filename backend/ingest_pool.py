@@ -0,0 +1,204 @@
+"""Worker pool for the scan ingestion pipeline with per-tenant fairness.
+
+Each tenant has a bounded FIFO queue. Workers pick tenants in weighted
+round-robin order and a tenant never holds more than
+``ingest_tenant_concurrency`` workers, so one slow or very busy client
+cannot starve the others. ``submit`` raises ``QueueFull`` (or blocks) when
+a tenant's queue is at capacity.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from .settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str, Any], Any]
+DoneCallback = Callable[[Any, Optional[BaseException]], None]
+
+
+class QueueFull(Exception):
+    """Raised when a tenant queue is at capacity."""
+
+
+@dataclass
+class _Tenant:
+    queue: Deque[Tuple[Any, Optional[DoneCallback]]] = field(default_factory=deque)
+    weight: int = 1
+    served: int = 0  # items taken in the current round-robin turn
+    in_flight: int = 0
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    completions: Deque[float] = field(default_factory=deque)
+
+
+class IngestPool:
+    RATE_WINDOW_SECONDS = 60.0
+
+    def __init__(
+        self,
+        handler: Handler,
+        workers: Optional[int] = None,
+        max_queue_per_tenant: Optional[int] = None,
+        tenant_concurrency: Optional[int] = None,
+        weights: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.handler = handler
+        self.workers = workers or settings.ingest_workers
+        self.max_queue_per_tenant = max_queue_per_tenant or settings.ingest_queue_per_tenant
+        self.tenant_concurrency = tenant_concurrency or settings.ingest_tenant_concurrency
+        self.weights = dict(weights if weights is not None else settings.ingest_tenant_weights)
+        self._tenants: Dict[str, _Tenant] = {}
+        self._ring: Deque[str] = deque()  # tenants with queued work, in service order
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._stopping = False
+
+    def start(self) -> None:
+        with self._cond:
+            if self._threads:
+                return
+            self._stopping = False
+            self._threads = [
+                threading.Thread(target=self._run, name=f"ingest-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def _tenant(self, client_code: str) -> _Tenant:
+        t = self._tenants.get(client_code)
+        if t is None:
+            t = _Tenant(weight=max(1, int(self.weights.get(client_code, 1))))
+            self._tenants[client_code] = t
+        return t
+
+    def submit(
+        self,
+        client_code: str,
+        item: Any,
+        on_done: Optional[DoneCallback] = None,
+        block: bool = False,
+        timeout: Optional[float] = None,
+    ) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            t = self._tenant(client_code)
+            while len(t.queue) >= self.max_queue_per_tenant:
+                if not block:
+                    raise QueueFull(client_code)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise QueueFull(client_code)
+                self._cond.wait(remaining)
+            t.queue.append((item, on_done))
+            if client_code not in self._ring:
+                self._ring.append(client_code)
+            self._cond.notify_all()
+
+    def _next(self) -> Optional[Tuple[str, Any, Optional[DoneCallback]]]:
+        # Called with the condition held: weighted round-robin over tenants with work
+        for _ in range(len(self._ring)):
+            if not self._ring:
+                break
+            code = self._ring[0]
+            t = self._tenants[code]
+            if not t.queue:
+                self._ring.popleft()
+                t.served = 0
+                continue
+            if t.in_flight >= self.tenant_concurrency:
+                self._ring.rotate(-1)
+                continue
+            item, on_done = t.queue.popleft()
+            t.in_flight += 1
+            t.served += 1
+            if not t.queue:
+                self._ring.popleft()
+                t.served = 0
+            elif t.served >= t.weight:
+                self._ring.rotate(-1)
+                t.served = 0
+            return code, item, on_done
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                task = self._next()
+                while task is None:
+                    if self._stopping:
+                        return
+                    self._cond.wait()
+                    task = self._next()
+                # A slot in a bounded queue opened up
+                self._cond.notify_all()
+            code, item, on_done = task
+            started = time.monotonic()
+            result: Any = None
+            error: Optional[BaseException] = None
+            try:
+                result = self.handler(code, item)
+            except Exception as exc:
+                error = exc
+                logger.exception("Ingest task failed for %s", code)
+            finished = time.monotonic()
+            with self._cond:
+                t = self._tenants[code]
+                t.in_flight -= 1
+                t.busy_seconds += finished - started
+                if error is None:
+                    t.processed += 1
+                else:
+                    t.failed += 1
+                t.completions.append(finished)
+                while finished - t.completions[0] > self.RATE_WINDOW_SECONDS:
+                    t.completions.popleft()
+                self._cond.notify_all()
+            if on_done is not None:
+                try:
+                    on_done(result, error)
+                except Exception:
+                    logger.exception("Ingest completion callback failed for %s", code)
+
+    def depth(self, client_code: str) -> int:
+        with self._cond:
+            t = self._tenants.get(client_code)
+            return len(t.queue) if t else 0
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Queue depth, in-flight count, totals and completions per minute for every tenant."""
+        now = time.monotonic()
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._cond:
+            for code, t in self._tenants.items():
+                while t.completions and now - t.completions[0] > self.RATE_WINDOW_SECONDS:
+                    t.completions.popleft()
+                done = t.processed + t.failed
+                out[code] = {
+                    "queue_depth": len(t.queue),
+                    "queue_capacity": self.max_queue_per_tenant,
+                    "in_flight": t.in_flight,
+                    "processed": t.processed,
+                    "failed": t.failed,
+                    "rate_per_minute": len(t.completions) * 60.0 / self.RATE_WINDOW_SECONDS,
+                    "avg_seconds": round(t.busy_seconds / done, 3) if done else None,
+                    "weight": t.weight,
+                }
+        return out
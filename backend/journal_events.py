@@ -0,0 +1,187 @@
+"""Push stream of journal writes per tenant.
+
+Triggers append every insert, update and delete on ``journal_entries`` and
+every ``correction_history`` row to the tenant's ``journal_events`` log (see
+:mod:`backend.models_events`), so entries posted by the ScanSnap pipeline,
+the sync jobs or another server process are seen the same way as API writes.
+
+One :class:`TenantFeed` per tenant tails the log for all of its subscribers.
+It is woken by commits made through this process's engine and
+otherwise polls every ``JOURNAL_EVENTS_POLL_SECONDS``. Each event carries
+the entry's current list row (see :mod:`backend.read_model`), so clients can
+apply it without another request. A subscriber that reconnects with the last
+event id it saw gets the events it missed. If those have been trimmed
+(``JOURNAL_EVENTS_KEEP_HOURS``), or the subscriber fell too far behind, it gets
+a reset and should reload the list.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Set, Union
+
+from sqlalchemy import delete, event, func, select
+from starlette.concurrency import run_in_threadpool
+
+from .db_manager import get_engine_for_client
+from .models_events import JournalEvent
+from .models_journal import JournalEntry
+from .read_model import JournalRow, journal_columns
+from .settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+RESET = "reset"
+KEEPALIVE = "keepalive"
+_TRIM_EVERY = 60.0
+
+
+@dataclass(slots=True)
+class JournalDelta:
+    id: int  # journal_events.id, the SSE event id
+    op: str  # insert / update / delete / correction
+    entry_id: int
+    entry: Optional[JournalRow]  # current row; None once the entry is gone
+
+
+def latest_event_id(client_code: str) -> int:
+    e = JournalEvent.__table__
+    with get_engine_for_client(client_code).connect() as conn:
+        return conn.execute(select(func.coalesce(func.max(e.c.id), 0))).scalar_one()
+
+
+def deltas_since(client_code: str, after_id: int, limit: Optional[int] = None) -> List[JournalDelta]:
+    e, j = JournalEvent.__table__, JournalEntry.__table__
+    stmt = (
+        select(e.c.id, e.c.op, e.c.entry_id, j.c.id.label("row_id"), *journal_columns(j)[1:])
+        .select_from(e.outerjoin(j, j.c.id == e.c.entry_id))
+        .where(e.c.id > after_id)
+        .order_by(e.c.id)
+        .limit(limit or settings.journal_events_batch)
+    )
+    out = []
+    with get_engine_for_client(client_code).connect() as conn:
+        for event_id, op, entry_id, row_id, *cols in conn.execute(stmt).all():
+            entry = JournalRow(row_id, *cols) if row_id is not None and op != "delete" else None
+            out.append(JournalDelta(event_id, op, entry_id, entry))
+    return out
+
+
+def missed_events_trimmed(client_code: str, after_id: int) -> bool:
+    """True when events after ``after_id`` were already trimmed from the log."""
+    e = JournalEvent.__table__
+    with get_engine_for_client(client_code).connect() as conn:
+        oldest, latest = conn.execute(select(func.min(e.c.id), func.max(e.c.id))).one()
+    if latest is None or latest <= after_id:
+        return False
+    return oldest > after_id + 1
+
+
+def trim_events(client_code: str, now: Optional[datetime] = None) -> int:
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=settings.journal_events_keep_hours)
+    e = JournalEvent.__table__
+    with get_engine_for_client(client_code).begin() as conn:
+        return conn.execute(delete(e).where(e.c.changed_at < cutoff)).rowcount
+
+
+class TenantFeed:
+    """Tails one tenant's event log on the event loop and fans deltas out to subscriber queues."""
+
+    def __init__(self, client_code: str, last_id: int) -> None:
+        self.client_code = client_code
+        self.last_id = last_id
+        self.queues: Set[asyncio.Queue] = set()
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._engine = get_engine_for_client(client_code)
+        event.listen(self._engine, "commit", self._on_commit)
+        self._task = self._loop.create_task(self._run())
+
+    def _on_commit(self, conn) -> None:
+        # Called on the committing thread, just before the DBAPI commit
+        self._loop.call_soon_threadsafe(self._wake.set)
+
+    def close(self) -> None:
+        event.remove(self._engine, "commit", self._on_commit)
+        self._task.cancel()
+
+    def _publish(self, item: Union[JournalDelta, str]) -> None:
+        for q in self.queues:
+            if q.qsize() >= settings.journal_events_queue_size:
+                # Too far behind to catch up event by event
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(RESET)
+            else:
+                q.put_nowait(item)
+
+    async def _run(self) -> None:
+        next_trim = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.journal_events_poll_seconds)
+                # Let the commit that woke us finish before reading
+                await asyncio.sleep(0.05)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                while True:
+                    deltas = await run_in_threadpool(deltas_since, self.client_code, self.last_id)
+                    for d in deltas:
+                        self._publish(d)
+                    if deltas:
+                        self.last_id = deltas[-1].id
+                    if len(deltas) < settings.journal_events_batch:
+                        break
+                if time.monotonic() >= next_trim:
+                    next_trim = time.monotonic() + _TRIM_EVERY
+                    await run_in_threadpool(trim_events, self.client_code)
+            except Exception:
+                logger.exception("Journal event feed for %s failed; retrying", self.client_code)
+
+
+_feeds: Dict[str, TenantFeed] = {}
+
+
+async def subscribe(client_code: str, last_event_id: Optional[int] = None,
+                    keepalive: Optional[float] = None) -> AsyncIterator[Union[JournalDelta, str]]:
+    """Deltas after ``last_event_id`` (or from now), :data:`RESET` or :data:`KEEPALIVE` when idle."""
+    feed = _feeds.get(client_code)
+    if feed is None:
+        last_id = await run_in_threadpool(latest_event_id, client_code)
+        feed = _feeds.get(client_code)  # another subscriber may have started it meanwhile
+        if feed is None:
+            feed = _feeds[client_code] = TenantFeed(client_code, last_id)
+    queue: asyncio.Queue = asyncio.Queue()
+    # Registered before the backlog is read: the feed delivers ids > upto, the backlog the rest
+    feed.queues.add(queue)
+    upto = feed.last_id
+    try:
+        if last_event_id is not None and last_event_id < upto:
+            if await run_in_threadpool(missed_events_trimmed, client_code, last_event_id):
+                yield RESET
+            else:
+                after = last_event_id
+                while after < upto:
+                    backlog = [d for d in await run_in_threadpool(deltas_since, client_code, after) if d.id <= upto]
+                    if not backlog:
+                        break
+                    for d in backlog:
+                        yield d
+                    after = backlog[-1].id
+        wait = keepalive or settings.journal_events_keepalive_seconds
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), wait)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE
+    finally:
+        feed.queues.discard(queue)
+        if not feed.queues and _feeds.get(client_code) is feed:
+            del _feeds[client_code]
+            feed.close()
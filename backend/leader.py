@@ -0,0 +1,147 @@
+"""Single-leader election through a lease row in the master DB.
+
+Every API process runs a ``LeaderLease``. The holder renews the lease every
+``ttl / 3`` seconds; the others poll at the same rate and take the row over
+once it has expired, so a crashed leader is replaced within about ``ttl``
+seconds. A clean shutdown expires the lease immediately. The lease compares
+wall-clock times, so processes sharing it should run on one host or on hosts
+with synchronized clocks. Writes are not fenced: a leader that was paused past
+its lease keeps running jobs until its next tick notices the takeover.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from .db_manager import get_master_engine
+from .models_lease import SchedulerLease
+from .settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def default_holder_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderLease:
+    def __init__(
+        self,
+        name: str,
+        on_acquire: Callable[[], None],
+        on_release: Callable[[], None],
+        ttl_seconds: Optional[float] = None,
+        holder: Optional[str] = None,
+    ) -> None:
+        self.name = name
+        self.holder = holder or default_holder_id()
+        self.ttl = timedelta(seconds=ttl_seconds or settings.leader_lease_seconds)
+        self.on_acquire = on_acquire
+        self.on_release = on_release
+        self._leader = False
+        self._expires_at: Optional[datetime] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader
+
+    def try_acquire(self) -> bool:
+        """Renew the lease if held, take it over if expired. Returns whether we hold it."""
+        now = datetime.utcnow()
+        expires = now + self.ttl
+        lease = SchedulerLease.__table__
+        engine = get_master_engine()
+        with engine.begin() as conn:
+            renewed = conn.execute(
+                update(lease).where(lease.c.name == self.name, lease.c.holder == self.holder).values(expires_at=expires)
+            )
+            if renewed.rowcount:
+                self._expires_at = expires
+                return True
+            taken = conn.execute(
+                update(lease)
+                .where(lease.c.name == self.name, or_(lease.c.holder.is_(None), lease.c.expires_at < now))
+                .values(holder=self.holder, acquired_at=now, expires_at=expires)
+            )
+            if taken.rowcount:
+                self._expires_at = expires
+                return True
+            if conn.execute(select(lease.c.name).where(lease.c.name == self.name)).first() is not None:
+                return False
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(lease).values(name=self.name, holder=self.holder, acquired_at=now,
+                                                  expires_at=expires))
+        except IntegrityError:
+            return False  # another process created it first
+        self._expires_at = expires
+        return True
+
+    def release(self) -> None:
+        lease = SchedulerLease.__table__
+        try:
+            with get_master_engine().begin() as conn:
+                conn.execute(
+                    update(lease)
+                    .where(lease.c.name == self.name, lease.c.holder == self.holder)
+                    .values(expires_at=datetime.utcnow())
+                )
+        except SQLAlchemyError:
+            logger.warning("Could not release lease %s", self.name, exc_info=True)
+
+    def tick(self) -> None:
+        with self._lock:
+            try:
+                held = self.try_acquire()
+            except SQLAlchemyError:
+                # e.g. master DB locked; keep leadership only while our lease is still valid
+                logger.warning("Lease %s check failed", self.name, exc_info=True)
+                held = self._leader and self._expires_at is not None and datetime.utcnow() < self._expires_at
+            if held and not self._leader:
+                logger.info("Acquired %s lease as %s", self.name, self.holder)
+                self._leader = True
+                self.on_acquire()
+            elif not held and self._leader:
+                logger.warning("Lost %s lease", self.name)
+                self._leader = False
+                self.on_release()
+
+    def _run(self) -> None:
+        interval = self.ttl.total_seconds() / 3
+        while not self._stop.wait(interval):
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Lease %s loop error", self.name)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        # First round inline so a lone process starts working right away
+        self.tick()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            if self._leader:
+                self._leader = False
+                self.on_release()
+                self.release()
@@ -0,0 +1,268 @@
+"""Streaming migration from the legacy single database into per-tenant DBs.
+
+The legacy app (``backend/models.py``, served by ``backend/api/main.py``)
+keeps every client's ``journals`` in one ``kaikei.db`` with account ids. This
+tool copies them into ``clients/<code>.db`` as ``journal_entries`` with
+account names:
+
+* legacy clients are registered in the master DB if missing, and legacy
+  accounts are copied into each tenant's ``accounts`` table;
+* rows are streamed per tenant in id order with ``yield_per`` and
+  bulk-inserted a batch at a time, tenants in parallel;
+* each batch commits together with the tenant's ``migration_checkpoints``
+  row, so an interrupted run resumes after the last committed id and
+  re-running picks up rows added to the legacy DB since;
+* at the end the row count, the amount in cents and the sum of legacy ids
+  are compared per tenant between ``journals`` and the migrated rows.
+
+Run it with the servers stopped::
+
+    python -m backend.legacy_migration --source sqlite:///kaikei.db [--unassigned A001]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, cast, create_engine, func, insert, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from . import models as legacy
+from .account_resolver import invalidate_resolver
+from .db_manager import get_engine_for_client, get_master_session
+from .duplicate_index import invalidate_duplicate_index
+from .models_account import Account
+from .models_client import Client
+from .models_journal import JournalEntry
+from .models_migration import MigrationCheckpoint
+from .settings import settings
+from .txn_classifier import invalidate_vendor_classifier
+
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "legacy_journals"
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+def open_legacy(url: Optional[str] = None):
+    url = url or settings.legacy_database_url
+    engine = create_engine(url, connect_args={"check_same_thread": False} if url.startswith("sqlite") else {})
+    with engine.connect() as conn:
+        if not engine.dialect.has_table(conn, legacy.Journal.__tablename__):
+            raise MigrationError(f"No legacy journals table in {url}")
+    return engine
+
+
+def load_accounts(engine) -> Dict[int, Dict[str, Any]]:
+    """Legacy account id → code/name/type, loaded once and shared by every tenant worker."""
+    t = legacy.Account.__table__
+    with engine.connect() as conn:
+        return {r.id: {"code": r.code, "name": r.name, "type": r.type} for r in conn.execute(select(t))}
+
+
+def register_clients(engine, only: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Ensure every legacy client exists in the master registry; returns code → legacy client id."""
+    wanted = set(only) if only else None
+    t = legacy.Client.__table__
+    with engine.connect() as conn:
+        rows = [r for r in conn.execute(select(t).order_by(t.c.id)) if wanted is None or r.code in wanted]
+    with get_master_session() as s:
+        existing = {c.code for c in s.query(Client.code)}
+        keys = {k for (k,) in s.query(Client.api_key).filter(Client.api_key.isnot(None))}
+        for r in rows:
+            if r.code not in existing:
+                api_key = r.api_key if r.api_key and r.api_key not in keys else None
+                s.add(Client(name=r.name, code=r.code, base_folder=r.base_folder, api_key=api_key))
+        s.commit()
+    return {r.code: r.id for r in rows}
+
+
+def _copy_accounts(client_code: str, accounts: Dict[int, Dict[str, Any]]) -> None:
+    if not accounts:
+        return
+    with get_engine_for_client(client_code).begin() as conn:
+        conn.execute(sqlite_insert(Account).on_conflict_do_nothing(index_elements=["code"]), list(accounts.values()))
+
+
+def _streams(legacy_client_id: Optional[int], unassigned: bool) -> List[Tuple[str, Any]]:
+    """(checkpoint key, legacy filter) per stream feeding a tenant; each resumes independently."""
+    j = legacy.Journal.__table__
+    out = [(SOURCE, j.c.client_id == legacy_client_id)] if legacy_client_id is not None else []
+    if unassigned:
+        out.append((f"{SOURCE}:unassigned", j.c.client_id.is_(None)))
+    return out
+
+
+def _cents(column):
+    return cast(func.round(column * 100), Integer)
+
+
+def _copy_stream(engine, target, source: str, where, names: Dict[int, str], client_id: Optional[int],
+                 batch_size: int) -> Dict[str, int]:
+    cp = MigrationCheckpoint.__table__
+    with target.begin() as conn:
+        conn.execute(sqlite_insert(cp).values(source=source, last_id=0, rows=0, amount_total=0.0)
+                     .on_conflict_do_nothing(index_elements=["source"]))
+        start = conn.execute(select(cp.c.last_id).where(cp.c.source == source)).scalar_one()
+
+    j = legacy.Journal.__table__
+    stmt = (
+        select(j.c.id, j.c.date, j.c.summary, j.c.amount, j.c.debit_account_id, j.c.credit_account_id, j.c.tax_type)
+        .where(where, j.c.id > start)
+        .order_by(j.c.id)
+        .execution_options(yield_per=batch_size)
+    )
+    copied = unresolved = 0
+    with engine.connect() as src:
+        for part in src.execute(stmt).partitions():
+            rows = []
+            for r in part:
+                debit, credit = names.get(r.debit_account_id), names.get(r.credit_account_id)
+                if debit is None or credit is None:
+                    unresolved += 1
+                rows.append({
+                    "date": r.date, "summary": r.summary, "amount": r.amount, "debit_account": debit,
+                    "credit_account": credit, "tax_type": r.tax_type, "client_id": client_id, "legacy_id": r.id,
+                    # Rows with an unknown account id go back to the review queue
+                    "reviewed": debit is not None and credit is not None,
+                })
+            with target.begin() as conn:
+                conn.execute(insert(JournalEntry), rows)
+                conn.execute(update(cp).where(cp.c.source == source).values(
+                    last_id=part[-1].id, rows=cp.c.rows + len(rows),
+                    amount_total=cp.c.amount_total + sum(r["amount"] or 0.0 for r in rows),
+                    updated_at=datetime.utcnow(),
+                ))
+            copied += len(rows)
+    with target.begin() as conn:
+        conn.execute(update(cp).where(cp.c.source == source).values(finished_at=datetime.utcnow()))
+    return {"copied": copied, "resumed_after_id": start, "unresolved_accounts": unresolved}
+
+
+def migrate_tenant(
+    engine,
+    client_code: str,
+    legacy_client_id: Optional[int],
+    accounts: Dict[int, Dict[str, Any]],
+    unassigned: bool = False,
+    batch_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Copy one tenant's legacy journals from its checkpoints onwards."""
+    target = get_engine_for_client(client_code)
+    _copy_accounts(client_code, accounts)
+    with get_master_session() as s:
+        client_id = s.query(Client.id).filter(Client.code == client_code).scalar()
+    names = {k: v["name"] for k, v in accounts.items()}
+    result: Dict[str, Any] = {"copied": 0, "unresolved_accounts": 0, "streams": {}}
+    for source, where in _streams(legacy_client_id, unassigned):
+        done = _copy_stream(engine, target, source, where, names, client_id,
+                            batch_size or settings.migration_batch_size)
+        result["streams"][source] = done
+        result["copied"] += done["copied"]
+        result["unresolved_accounts"] += done["unresolved_accounts"]
+    invalidate_resolver(client_code)
+    invalidate_vendor_classifier(client_code)
+    invalidate_duplicate_index(client_code)
+    return result
+
+
+def verify_tenant(engine, client_code: str, legacy_client_id: Optional[int], unassigned: bool = False) -> Dict[str, Any]:
+    """Compare row count, amount (in cents) and the sum of legacy ids on both sides."""
+    j = legacy.Journal.__table__
+    with engine.connect() as conn:
+        src = conn.execute(
+            select(func.count(), func.coalesce(func.sum(_cents(j.c.amount)), 0), func.coalesce(func.sum(j.c.id), 0))
+            .where(or_(*(where for _, where in _streams(legacy_client_id, unassigned))))
+        ).one()
+    e = JournalEntry.__table__
+    with get_engine_for_client(client_code).connect() as conn:
+        dst = conn.execute(
+            select(func.count(), func.coalesce(func.sum(_cents(e.c.amount)), 0), func.coalesce(func.sum(e.c.legacy_id), 0))
+            .where(e.c.legacy_id.isnot(None))
+        ).one()
+    keys = ("rows", "amount_cents", "id_sum")
+    return {"ok": tuple(src) == tuple(dst), "legacy": dict(zip(keys, src)), "migrated": dict(zip(keys, dst))}
+
+
+def run_migration(
+    url: Optional[str] = None,
+    clients: Optional[Sequence[str]] = None,
+    unassigned: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    verify_only: bool = False,
+) -> Dict[str, Any]:
+    """Migrate (unless ``verify_only``) and verify every legacy client, or just ``clients``.
+
+    Legacy journals without a client go to the tenant ``unassigned``; without
+    it they are left behind and reported.
+    """
+    engine = open_legacy(url)
+    try:
+        tenants: Dict[str, Optional[int]] = dict(register_clients(engine, clients))
+        if unassigned and unassigned not in tenants:
+            with get_master_session() as s:
+                if not s.query(Client.id).filter(Client.code == unassigned).first():
+                    raise MigrationError(f"Unknown client {unassigned}")
+            tenants[unassigned] = None
+        accounts = load_accounts(engine)
+
+        def one(code: str) -> Dict[str, Any]:
+            legacy_id, with_unassigned = tenants[code], code == unassigned
+            result: Dict[str, Any] = {}
+            if not verify_only:
+                result.update(migrate_tenant(engine, code, legacy_id, accounts, with_unassigned, batch_size))
+            result["verify"] = verify_tenant(engine, code, legacy_id, with_unassigned)
+            return result
+
+        report: Dict[str, Any] = {}
+        with ThreadPoolExecutor(max_workers=max(workers or settings.migration_workers, 1),
+                                thread_name_prefix="migrate") as ex:
+            futures = {code: ex.submit(one, code) for code in tenants}
+            for code, fut in futures.items():
+                try:
+                    report[code] = fut.result()
+                except Exception as exc:
+                    logger.exception("Migration of %s failed", code)
+                    report[code] = {"error": repr(exc), "verify": {"ok": False}}
+        left = 0
+        if not unassigned:
+            j = legacy.Journal.__table__
+            with engine.connect() as conn:
+                left = conn.execute(select(func.count()).where(j.c.client_id.is_(None))).scalar_one()
+        return {"ok": all(r["verify"]["ok"] for r in report.values()), "tenants": report,
+                "unassigned_left_behind": left}
+    finally:
+        engine.dispose()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.legacy_migration",
+                                     description="Move legacy kaikei.db journals into per-tenant databases")
+    parser.add_argument("--source", help="legacy database URL (default: LEGACY_DATABASE_URL)")
+    parser.add_argument("--client", action="append", metavar="CODE", help="only these legacy clients")
+    parser.add_argument("--unassigned", metavar="CODE", help="tenant for journals without a client")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--verify-only", action="store_true")
+    args = parser.parse_args(argv)
+    try:
+        report = run_migration(args.source, args.client, args.unassigned, args.batch_size, args.workers,
+                               args.verify_only)
+    except MigrationError as exc:
+        parser.exit(1, f"error: {exc}\n")
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(main())
@@ -7,6 +7,9 @@ from typing import Any, List
 from .models_journal import CorrectionHistory
 
 
+MAX_EXAMPLES = 50
+
+
 def _examples_path(client_code: str) -> Path:
     p = Path("clients")
     p.mkdir(parents=True, exist_ok=True)
@@ -33,5 +36,12 @@ def update_examples_with_correction(client_code: str, correction: CorrectionHist
         "corrected_to": [correction.new_debit, correction.new_credit],
         "reviewer_reason": correction.reason,
     })
-    path.write_text(json.dumps(examples[:50], ensure_ascii=False, indent=2), encoding="utf-8")
+    write_client_examples(client_code, examples)
+
+
+def write_client_examples(client_code: str, examples: List[dict[str, Any]]) -> None:
+    path = _examples_path(client_code)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(examples[:MAX_EXAMPLES], ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(path)
 
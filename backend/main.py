@@ -3,9 +3,21 @@ from __future__ import annotations
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .api.accounts import router as accounts_router
+from .api.admin import router as admin_router
+from .api.archive import router as archive_router
+from .api.backup import router as backup_router
 from .api.clients import router as clients_router
+from .api.compression import CompressionMiddleware
+from .api.documents import router as documents_router
+from .api.idempotency import IdempotencyMiddleware
 from .api.journal import router as journal_router
+from .api.maintenance import router as maintenance_router
+from .api.reconcile import router as reconcile_router
 from .api.scan_import import router as scan_router
+from .api.statements import router as statements_router
+from .api.sync import router as sync_router
+from .api.tax import router as tax_router
 from .scheduler import start_scheduler, shutdown_scheduler
 
 
@@ -17,10 +29,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
+# Inside compression, so stored responses are independent of the retry's Accept-Encoding
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(CompressionMiddleware)
+
+app.include_router(accounts_router)
+app.include_router(admin_router)
+app.include_router(archive_router)
+app.include_router(backup_router)
 app.include_router(clients_router)
+app.include_router(documents_router)
 app.include_router(journal_router)
+app.include_router(maintenance_router)
+app.include_router(reconcile_router)
 app.include_router(scan_router)
+app.include_router(statements_router)
+app.include_router(sync_router)
+app.include_router(tax_router)
 
 
 @app.on_event("startup")
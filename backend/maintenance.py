@@ -0,0 +1,241 @@
+"""Off-peak maintenance jobs on the leader's scheduler.
+
+Jobs run in priority order, each against the tenants active in the last
+``maintenance_active_days`` days, least recently maintained first. A job
+stops taking new tenants once its time budget is spent; the rest are picked
+up first on the next run. Every tenant run is recorded in ``maintenance_runs``
+in the master DB.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, func
+
+from . import idempotency, llm_trainer
+from .account_resolver import get_resolver, invalidate_resolver
+from .archive import archive_closed_years
+from .db_manager import get_engine_for_client, get_master_session, get_session_for_client
+from .duplicate_index import get_duplicate_index, invalidate_duplicate_index
+from .models_client import Client
+from .models_journal import CorrectionHistory, JournalEntry
+from .models_maintenance import MaintenanceRun
+from .settings import settings
+from .txn_classifier import get_vendor_classifier, invalidate_vendor_classifier
+
+
+logger = logging.getLogger(__name__)
+
+
+class Budget:
+    def __init__(self, seconds: float) -> None:
+        self.deadline = time.monotonic() + seconds
+
+    @property
+    def remaining(self) -> float:
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def exhausted(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+
+@dataclass
+class MaintenanceJob:
+    name: str
+    func: Callable[[str, Budget], Dict[str, Any]]
+    priority: int  # lower runs first
+    budget_seconds: float
+    description: str = ""
+
+
+# ---------------------------------------------------------------- jobs
+
+def warm_caches(client_code: str, budget: Budget) -> Dict[str, Any]:
+    """Rebuild the account resolver, vendor classifier and duplicate index of this process.
+
+    Maintenance only runs on the scheduler leader, so this warms the leader's
+    caches (used by its scan ingestion); other API processes build theirs on first use.
+    """
+    invalidate_resolver(client_code)
+    invalidate_vendor_classifier(client_code)
+    invalidate_duplicate_index(client_code)
+    accounts = len(get_resolver(client_code))
+    vendors = len(get_vendor_classifier(client_code))
+    get_duplicate_index(client_code)
+    return {"accounts": accounts, "vendors": vendors}
+
+
+def compact_examples(client_code: str, budget: Budget) -> Dict[str, Any]:
+    """Rewrite the few-shot examples file from correction history, newest first, one per summary."""
+    db = get_session_for_client(client_code)
+    try:
+        rows = (
+            db.query(JournalEntry.summary, CorrectionHistory.new_debit, CorrectionHistory.new_credit,
+                     CorrectionHistory.reason)
+            .join(JournalEntry, JournalEntry.id == CorrectionHistory.entry_id)
+            .order_by(CorrectionHistory.id.desc())
+            .yield_per(500)
+        )
+        examples: List[Dict[str, Any]] = []
+        seen = set()
+        for summary, debit, credit, reason in rows:
+            key = (summary or "").strip()
+            if key in seen:
+                continue
+            seen.add(key)
+            examples.append({"summary": summary or "", "corrected_to": [debit, credit], "reviewer_reason": reason})
+            if len(examples) >= llm_trainer.MAX_EXAMPLES:
+                break
+    finally:
+        db.close()
+    if not examples:
+        return {"examples": 0}
+    llm_trainer.write_client_examples(client_code, examples)
+    return {"examples": len(examples)}
+
+
+def optimize_database(client_code: str, budget: Budget) -> Dict[str, Any]:
+    """``ANALYZE`` and reclaim free pages; switches the file to incremental auto-vacuum once."""
+    engine = get_engine_for_client(client_code)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA optimize")
+        conn.exec_driver_sql("ANALYZE")
+        mode = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        free = conn.exec_driver_sql("PRAGMA freelist_count").scalar() or 0
+        pages = conn.exec_driver_sql("PRAGMA page_count").scalar() or 0
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar() or 4096
+        result: Dict[str, Any] = {"free_pages": free, "pages": pages}
+        if mode == 2:
+            if free:
+                conn.exec_driver_sql(f"PRAGMA incremental_vacuum({int(settings.maintenance_vacuum_pages)})")
+            result["vacuumed"] = "incremental"
+        elif pages * page_size <= settings.maintenance_full_vacuum_max_mb * (1 << 20) and budget.remaining > 60:
+            # auto_vacuum only changes on a full VACUUM; small files are converted once
+            conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+            result["vacuumed"] = "full"
+        conn.commit()
+    return result
+
+
+def archive_years(client_code: str, budget: Budget) -> Dict[str, Any]:
+    return {"archived": archive_closed_years(client_code)}
+
+
+def purge_idempotency_keys(client_code: str, budget: Budget) -> Dict[str, Any]:
+    return {"purged": idempotency.purge_expired(client_code)}
+
+
+JOBS: Dict[str, MaintenanceJob] = {
+    j.name: j
+    for j in (
+        MaintenanceJob("warm_caches", warm_caches, 10, 120, "Account resolver, vendor classifier and duplicate index"),
+        MaintenanceJob("compact_examples", compact_examples, 30, 60, "Few-shot examples from correction history"),
+        MaintenanceJob("purge_idempotency", purge_idempotency_keys, 32, 30, "Expired Idempotency-Key responses"),
+        MaintenanceJob("archive_years", archive_years, 35, 600, "Move closed fiscal years to read-only files"),
+        MaintenanceJob("optimize_db", optimize_database, 40, 600, "ANALYZE and incremental VACUUM"),
+    )
+}
+
+
+# ---------------------------------------------------------------- runner
+
+_run_lock = threading.Lock()
+
+
+def _db_mtime(client_code: str) -> Optional[float]:
+    base = Path(f"clients/{client_code}.db")
+    mtimes = [p.stat().st_mtime for p in (base, base.with_name(base.name + "-wal")) if p.exists()]
+    return max(mtimes) if mtimes else None
+
+
+def active_tenants(days: Optional[int] = None) -> List[str]:
+    """Tenants whose DB was written in the last ``days`` days, not counting maintenance's own writes."""
+    days = settings.maintenance_active_days if days is None else days
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    active: List[str] = []
+    with get_master_session() as s:
+        for c in s.query(Client).order_by(Client.code).all():
+            mtime = _db_mtime(c.code)
+            if mtime is None:
+                continue
+            if c.maintained_mtime is None or mtime > c.maintained_mtime:
+                c.last_activity_at = datetime.utcfromtimestamp(mtime)
+            if c.last_activity_at and c.last_activity_at >= cutoff:
+                active.append(c.code)
+        s.commit()
+    return active
+
+
+def _mark_maintained(tenants: List[str]) -> None:
+    with get_master_session() as s:
+        for c in s.query(Client).filter(Client.code.in_(tenants)).all():
+            c.maintained_mtime = _db_mtime(c.code)
+        s.commit()
+
+
+def _last_runs(job: str) -> Dict[str, datetime]:
+    with get_master_session() as s:
+        rows = (
+            s.query(MaintenanceRun.client_code, func.max(MaintenanceRun.started_at))
+            .filter(MaintenanceRun.job == job, MaintenanceRun.status == "ok")
+            .group_by(MaintenanceRun.client_code)
+        )
+        return {code: started for code, started in rows}
+
+
+def _record(job: str, client_code: Optional[str], started: datetime, duration: float, status: str, detail: Any) -> None:
+    with get_master_session() as s:
+        s.add(MaintenanceRun(job=job, client_code=client_code, started_at=started, duration=round(duration, 3),
+                             status=status, detail=json.dumps(detail, ensure_ascii=False, default=str)))
+        s.commit()
+
+
+def run_job(job: MaintenanceJob, tenants: List[str]) -> Dict[str, Any]:
+    budget = Budget(job.budget_seconds)
+    last = _last_runs(job.name)
+    ordered = sorted(tenants, key=lambda c: (c in last, last.get(c) or datetime.min))
+    done = failed = 0
+    for i, code in enumerate(ordered):
+        if budget.exhausted():
+            _record(job.name, None, datetime.utcnow(), 0.0, "skipped",
+                    {"reason": "budget exhausted", "remaining_tenants": len(ordered) - i})
+            break
+        started, t0 = datetime.utcnow(), time.monotonic()
+        try:
+            detail = job.func(code, budget)
+            status = "ok"
+            done += 1
+        except Exception as exc:
+            logger.exception("Maintenance job %s failed for %s", job.name, code)
+            detail, status = {"error": repr(exc)}, "error"
+            failed += 1
+        _record(job.name, code, started, time.monotonic() - t0, status, detail)
+    return {"job": job.name, "tenants": len(ordered), "ok": done, "failed": failed,
+            "skipped": len(ordered) - done - failed}
+
+
+def run_maintenance(job_names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Run the named jobs (default: all) in priority order. Overlapping runs are skipped."""
+    if not _run_lock.acquire(blocking=False):
+        logger.info("Maintenance already running; skipped")
+        return []
+    try:
+        jobs = sorted((JOBS[n] for n in (job_names or JOBS)), key=lambda j: j.priority)
+        tenants = active_tenants()
+        summary = [run_job(job, tenants) for job in jobs]
+        _mark_maintained(tenants)
+        with get_master_session() as s:
+            cutoff = datetime.utcnow() - timedelta(days=settings.maintenance_history_days)
+            s.execute(delete(MaintenanceRun).where(MaintenanceRun.started_at < cutoff))
+            s.commit()
+        return summary
+    finally:
+        _run_lock.release()
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, Integer, String
+
+from .models_base import Base
+
+
+class Account(Base):
+    __tablename__ = "accounts"
+
+    id = Column(Integer, primary_key=True)
+    code = Column(String, unique=True, nullable=False)
+    name = Column(String, nullable=False)
+    type = Column(String)
+    aliases = Column(String)  # comma separated synonyms used by the account resolver
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, Date, DateTime, Integer, String
+
+from .models_base import Base
+
+
+class ArchivePartition(Base):
+    """A closed fiscal year moved out of the tenant DB into a read-only file."""
+
+    __tablename__ = "archive_partitions"
+
+    id = Column(Integer, primary_key=True)
+    fiscal_year = Column(Integer, unique=True, nullable=False)  # calendar year the fiscal year starts in
+    path = Column(String, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)  # exclusive
+    entry_count = Column(Integer, default=0)
+    correction_count = Column(Integer, default=0)
+    max_entry_id = Column(Integer)
+    created_at = Column(DateTime)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, Date, DateTime, Float, Integer, String, Text, UniqueConstraint
+
+from .models_base import Base
+
+
+class SyncAccount(Base):
+    """A bank/card account synced from a provider, with its sync watermark."""
+
+    __tablename__ = "sync_accounts"
+    __table_args__ = (UniqueConstraint("provider", "account_ref"),)
+
+    id = Column(Integer, primary_key=True)
+    provider = Column(String, nullable=False)
+    account_ref = Column(String, nullable=False)
+    kind = Column(String, default="bank")  # bank / card
+    cursor = Column(String)  # provider cursor of the last committed page
+    last_synced_at = Column(DateTime)
+    last_error = Column(Text)
+
+
+class BankTransaction(Base):
+    __tablename__ = "bank_transactions"
+    __table_args__ = (UniqueConstraint("provider", "provider_txn_id"),)
+
+    id = Column(Integer, primary_key=True)
+    provider = Column(String, nullable=False)
+    account_ref = Column(String, nullable=False, index=True)
+    provider_txn_id = Column(String, nullable=False)
+    date = Column(Date, index=True)
+    amount = Column(Float)  # positive = deposit, negative = withdrawal
+    description = Column(String)
+    balance = Column(Float)
+    debit_account = Column(String)
+    credit_account = Column(String)
+    imported_at = Column(DateTime)
+
+
+class StatementImport(Base):
+    """One uploaded statement file (全銀 / CSV / OFX)."""
+
+    __tablename__ = "statement_imports"
+
+    id = Column(Integer, primary_key=True)
+    filename = Column(String)
+    format = Column(String)  # zengin / csv / ofx
+    sha256 = Column(String, index=True)
+    row_count = Column(Integer, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime)
+
+
+class StagedTransaction(Base):
+    """A statement line awaiting review before it is posted to the journal."""
+
+    __tablename__ = "staged_transactions"
+
+    id = Column(Integer, primary_key=True)
+    import_id = Column(Integer, index=True, nullable=False)
+    line_no = Column(Integer)
+    date = Column(Date)
+    amount = Column(Float)  # positive = deposit, negative = withdrawal
+    description = Column(String)
+    balance = Column(Float)
+    debit_account = Column(String)
+    credit_account = Column(String)
+    status = Column(String, default="pending", index=True)  # pending / posted / rejected
+    journal_entry_id = Column(Integer)
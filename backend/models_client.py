@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, DateTime, Float, Integer, String
 from sqlalchemy.orm import relationship
 
 from .models_base import Base
@@ -14,6 +14,13 @@ class Client(Base):
     code = Column(String, unique=True, nullable=False)
     base_folder = Column(String, nullable=True)  # ScanSnap folder
     api_key = Column(String, unique=True, nullable=True)
+    # Adaptive scan interval bounds; NULL falls back to settings
+    scan_min_seconds = Column(Integer, nullable=True)
+    scan_max_seconds = Column(Integer, nullable=True)
+    fiscal_year_start_month = Column(Integer, nullable=True)  # 1-12; NULL falls back to settings
+    # Last write to the tenant DB not made by maintenance, and the file mtime maintenance left behind
+    last_activity_at = Column(DateTime, nullable=True)
+    maintained_mtime = Column(Float, nullable=True)
 
     # For parity with earlier spec; target models live per-client DB, so this is registry only
     # journal_entries = relationship("JournalEntry", back_populates="client")
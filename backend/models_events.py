@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, Integer, String, text
+
+from .models_base import Base
+
+
+class JournalEvent(Base):
+    """Append-only log of journal writes, filled by triggers and tailed by the push stream."""
+
+    __tablename__ = "journal_events"
+    __table_args__ = {"sqlite_autoincrement": True}  # ids are never reused after trimming
+
+    id = Column(Integer, primary_key=True)
+    entry_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # insert / update / delete / correction
+    changed_at = Column(DateTime, nullable=False, index=True)
+
+
+def _log(entry_id: str, op: str) -> str:
+    return (
+        f"INSERT INTO journal_events (entry_id, op, changed_at) "
+        f"VALUES ({entry_id}, '{op}', strftime('%Y-%m-%d %H:%M:%f', 'now'));"
+    )
+
+
+_TRIGGERS = {
+    "journal_events_ai": f"AFTER INSERT ON journal_entries BEGIN {_log('NEW.id', 'insert')} END",
+    "journal_events_au": f"AFTER UPDATE ON journal_entries BEGIN {_log('NEW.id', 'update')} END",
+    "journal_events_ad": f"AFTER DELETE ON journal_entries BEGIN {_log('OLD.id', 'delete')} END",
+    "journal_events_ci": (
+        "AFTER INSERT ON correction_history WHEN NEW.entry_id IS NOT NULL "
+        f"BEGIN {_log('NEW.entry_id', 'correction')} END"
+    ),
+}
+
+
+def install_event_triggers(conn) -> None:
+    for name, body in _TRIGGERS.items():
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(f"CREATE TRIGGER {name} {body}"))
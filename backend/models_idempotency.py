@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+
+from .models_base import Base
+
+
+class IdempotencyRecord(Base):
+    """Response stored for an ``Idempotency-Key`` so a retried write is answered without running it again."""
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)  # "<METHOD> <path> <Idempotency-Key>"
+    fingerprint = Column(String)  # sha256 of the query string and body; NULL while the first request runs
+    status_code = Column(Integer)
+    content_type = Column(String)
+    body = Column(LargeBinary)
+    created_at = Column(DateTime, nullable=False)
+    completed_at = Column(DateTime)  # NULL while the first request runs
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, Float, Integer, String, Text
+
+from .models_base import Base
+
+
+class IngestRecord(Base):
+    """Durable per-tenant ledger of scanned documents and their ingest state."""
+
+    __tablename__ = "ingest_ledger"
+
+    id = Column(Integer, primary_key=True)
+    path = Column(String, unique=True, nullable=False)
+    content_hash = Column(String, index=True)
+    size = Column(Integer)
+    mtime = Column(Float)
+    state = Column(String, nullable=False)  # pending / suggested / posted / retry / failed / duplicate
+    attempts = Column(Integer, default=0)
+    retry_after = Column(DateTime)
+    entry_id = Column(Integer)
+    duplicate_of = Column(String)  # path of the first document with the same content
+    error = Column(Text)
+    updated_at = Column(DateTime)
@@ -20,6 +20,9 @@ class JournalEntry(Base):
     reviewed = Column(Boolean, default=False)
     client_id = Column(Integer)
     pdf_path = Column(String)  # ScanSnap OCR source path
+    document_sha256 = Column(String, index=True)  # key in the tenant document store
+    tax_type = Column(String)  # 課税区分
+    legacy_id = Column(Integer, index=True)  # journals.id in the legacy single database
 
     corrections = relationship("CorrectionHistory", back_populates="entry")
 
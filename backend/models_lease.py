@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, String
+
+from .models_base import Base
+
+
+class SchedulerLease(Base):
+    """Leader lease in the master DB; one row per named role."""
+
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String)
+    acquired_at = Column(DateTime)
+    expires_at = Column(DateTime)
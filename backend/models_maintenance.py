@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, Float, Integer, String, Text
+
+from .models_base import Base
+
+
+class MaintenanceRun(Base):
+    """Run history of background maintenance jobs (master DB)."""
+
+    __tablename__ = "maintenance_runs"
+
+    id = Column(Integer, primary_key=True)
+    job = Column(String, nullable=False, index=True)
+    client_code = Column(String, index=True)
+    started_at = Column(DateTime, index=True)
+    duration = Column(Float)
+    status = Column(String)  # ok / error / skipped
+    detail = Column(Text)
+
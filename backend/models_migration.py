@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, Float, Integer, String
+
+from .models_base import Base
+
+
+class MigrationCheckpoint(Base):
+    """Progress of a one-off data migration into this tenant DB, committed with each batch."""
+
+    __tablename__ = "migration_checkpoints"
+
+    source = Column(String, primary_key=True)  # e.g. "legacy_journals"
+    last_id = Column(Integer, nullable=False, default=0)  # highest source id copied
+    rows = Column(Integer, nullable=False, default=0)
+    amount_total = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime)
+    finished_at = Column(DateTime)
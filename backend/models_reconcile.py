@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+
+from .models_base import Base
+
+
+class ReconcileMatch(Base):
+    """A proposed or decided 消込 match between bank-side lines and journal entries."""
+
+    __tablename__ = "reconcile_matches"
+
+    id = Column(Integer, primary_key=True)
+    method = Column(String, nullable=False)  # exact / split
+    score = Column(Float)
+    status = Column(String, default="proposed", index=True)  # proposed / confirmed / rejected
+    created_at = Column(DateTime)
+    decided_at = Column(DateTime)
+
+
+class ReconcileLink(Base):
+    __tablename__ = "reconcile_links"
+
+    id = Column(Integer, primary_key=True)
+    match_id = Column(Integer, ForeignKey("reconcile_matches.id", ondelete="CASCADE"), index=True, nullable=False)
+    kind = Column(String, nullable=False)  # bank / statement / journal
+    ref_id = Column(Integer, nullable=False)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, Integer, String, UniqueConstraint, text
+
+from .models_base import Base
+from .settings import settings
+
+
+class TaxPeriodTotal(Base):
+    """Tax-included yen per month and 税区分 category, kept current by triggers on journal_entries."""
+
+    __tablename__ = "tax_period_totals"
+    __table_args__ = (UniqueConstraint("period", "category"),)
+
+    id = Column(Integer, primary_key=True)
+    period = Column(String, nullable=False)  # YYYY-MM
+    category = Column(String, nullable=False)  # see TAX_CATEGORIES
+    gross = Column(Integer, nullable=False, default=0)  # 税込, integer yen
+    entries = Column(Integer, nullable=False, default=0)
+
+
+TAX_CATEGORIES = (
+    "sales_10", "sales_8", "sales_exempt", "sales_nontaxable",
+    "purchase_10_invoice", "purchase_8_invoice", "purchase_10_noinvoice", "purchase_8_noinvoice",
+    "purchase_nontaxable",
+)
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def category_sql(alias: str) -> str:
+    """SQL expression mapping a journal row's free-text tax_type to a TAX_CATEGORIES value (NULL = out of scope)."""
+    t = f"REPLACE(REPLACE(REPLACE(REPLACE(COALESCE({alias}.tax_type, ''), '％', '%'), '８', '8'), '１', '1'), '０', '0')"
+    revenue = ", ".join(_quote(n) for n in settings.revenue_accounts) or "NULL"
+    revenue_accounts = "(SELECT name FROM accounts WHERE type IN ('revenue', '収益'))"
+    is_sales = (
+        f"({t} LIKE '%売上%' OR ({t} NOT LIKE '%仕入%' AND ({alias}.credit_account IN ({revenue}) "
+        f"OR {alias}.credit_account IN {revenue_accounts} OR {alias}.debit_account IN ({revenue}) "
+        f"OR {alias}.debit_account IN {revenue_accounts})))"
+    )
+    rate = f"(CASE WHEN {t} LIKE '%軽%' OR {t} LIKE '%8!%%' ESCAPE '!' THEN '8' ELSE '10' END)"
+    no_invoice = f"({t} LIKE '%非適格%' OR {t} LIKE '%適格外%' OR {t} LIKE '%区分記載%' OR {t} LIKE '%経過措置%')"
+    return (
+        f"(CASE WHEN {t} = '' OR {t} LIKE '%不課税%' OR {t} LIKE '%対象外%' THEN NULL "
+        f"WHEN {t} LIKE '%非課税%' THEN CASE WHEN {is_sales} THEN 'sales_nontaxable' ELSE 'purchase_nontaxable' END "
+        f"WHEN {t} LIKE '%免税%' OR {t} LIKE '%輸出%' THEN CASE WHEN {is_sales} THEN 'sales_exempt' END "
+        f"WHEN {is_sales} THEN 'sales_' || {rate} "
+        f"ELSE 'purchase_' || {rate} || CASE WHEN {no_invoice} THEN '_noinvoice' ELSE '_invoice' END END)"
+    )
+
+
+def signed_yen_sql(alias: str) -> str:
+    """Rounded yen, negative for returns and discounts (返品・値引・返還, or a debit to a revenue account)."""
+    t = f"COALESCE({alias}.tax_type, '')"
+    revenue = ", ".join(_quote(n) for n in settings.revenue_accounts) or "NULL"
+    negative = (
+        f"({t} LIKE '%返品%' OR {t} LIKE '%値引%' OR {t} LIKE '%返還%' OR {alias}.debit_account IN ({revenue}) "
+        f"OR {alias}.debit_account IN (SELECT name FROM accounts WHERE type IN ('revenue', '収益')))"
+    )
+    return f"(CASE WHEN {negative} THEN -1 ELSE 1 END * CAST(ROUND(ABS({alias}.amount)) AS INTEGER))"
+
+
+def _apply(row: str, sign: str) -> str:
+    return (
+        f"INSERT INTO tax_period_totals (period, category, gross, entries) "
+        f"SELECT strftime('%Y-%m', {row}.date), {category_sql(row)}, {sign}{signed_yen_sql(row)}, {sign}1 "
+        f"WHERE {row}.date IS NOT NULL AND {category_sql(row)} IS NOT NULL "
+        # Rows leaving through fiscal-year archiving keep counting towards their period
+        f"AND NOT EXISTS (SELECT 1 FROM archive_partitions a WHERE a.start_date <= {row}.date AND a.end_date > {row}.date) "
+        f"ON CONFLICT (period, category) DO UPDATE SET gross = gross + excluded.gross, entries = entries + excluded.entries;"
+    )
+
+
+_TRIGGERS = {
+    "tax_totals_ai": lambda: f"AFTER INSERT ON journal_entries BEGIN {_apply('NEW', '')} END",
+    "tax_totals_ad": lambda: f"AFTER DELETE ON journal_entries BEGIN {_apply('OLD', '-')} END",
+    "tax_totals_au": lambda: (
+        "AFTER UPDATE OF date, amount, tax_type, debit_account, credit_account ON journal_entries "
+        f"BEGIN {_apply('OLD', '-')} {_apply('NEW', '')} END"
+    ),
+}
+
+
+def install_tax_triggers(conn) -> bool:
+    """(Re)create the triggers so they follow REVENUE_ACCOUNTS; returns True when first installed."""
+    existed = conn.execute(
+        text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'tax_totals_ai'")
+    ).scalar()
+    for name, body in _TRIGGERS.items():
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(f"CREATE TRIGGER {name} {body()}"))
+    return not existed
+
+
+def backfill_tax_totals(conn) -> None:
+    """Recompute the totals from the rows currently in journal_entries."""
+    conn.execute(text("DELETE FROM tax_period_totals"))
+    conn.execute(text(
+        "INSERT INTO tax_period_totals (period, category, gross, entries) "
+        f"SELECT strftime('%Y-%m', j.date), {category_sql('j')} AS cat, SUM({signed_yen_sql('j')}), COUNT(*) "
+        "FROM journal_entries j WHERE j.date IS NOT NULL AND cat IS NOT NULL GROUP BY 1, 2"
+    ))
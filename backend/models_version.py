@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, Integer, String, text
+
+from .models_base import Base
+
+
+class ChangeVersion(Base):
+    """Per-table write counter of a tenant DB, bumped by triggers; list endpoints derive their ETags from it."""
+
+    __tablename__ = "change_versions"
+
+    scope = Column(String, primary_key=True)  # table name
+    version = Column(Integer, nullable=False, default=0)
+
+
+VERSIONED_TABLES = ("accounts", "journal_entries", "correction_history")
+
+# Never below the current time in ms, so a DB restored from an older backup does not reissue versions
+_NEXT = "MAX(change_versions.version + 1, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER))"
+
+
+def _bump(table: str) -> str:
+    return (
+        f"INSERT INTO change_versions (scope, version) VALUES ('{table}', "
+        "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)) "
+        f"ON CONFLICT (scope) DO UPDATE SET version = {_NEXT};"
+    )
+
+
+def install_version_triggers(conn) -> None:
+    for table in VERSIONED_TABLES:
+        for suffix, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE")):
+            name = f"{table}_version_{suffix}"
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            conn.execute(text(f"CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN {_bump(table)} END"))
+
+
+def bump_versions(conn) -> None:
+    """Advance every scope, e.g. after the DB file was replaced underneath the running servers."""
+    for table in VERSIONED_TABLES:
+        conn.execute(text(_bump(table)))
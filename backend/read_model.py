@@ -0,0 +1,169 @@
+"""Column-only read path for list endpoints.
+
+List endpoints select just the columns they return, as plain tuples through
+SQLAlchemy Core, and wrap them in slotted records that serialize straight to
+JSON bytes. orjson is used when installed (it encodes slotted dataclasses
+natively); otherwise the stdlib encoder produces the same document. Dates
+are read as the ISO strings SQLite stores, so they are never parsed only to be
+formatted again.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, fields
+from datetime import date as _date
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Boolean, String, func, select, type_coerce
+
+from . import models as legacy
+from .archive import query_entries
+from .db_manager import get_engine_for_client
+from .models_account import Account
+from .models_journal import JournalEntry
+from .models_version import ChangeVersion
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+@dataclass(slots=True)
+class JournalRow:
+    id: int
+    date: Optional[str]
+    summary: Optional[str]
+    amount: Optional[float]
+    debit_account: Optional[str]
+    credit_account: Optional[str]
+    confidence: Optional[float]
+    ai_reason: Optional[str]
+    reviewed: bool
+    pdf_path: Optional[str]
+    document_sha256: Optional[str]
+    tax_type: Optional[str]
+    duplicate_of: Sequence[int] = ()
+
+
+JOURNAL_FIELDS: Tuple[str, ...] = tuple(f.name for f in fields(JournalRow) if f.name != "duplicate_of")
+
+
+def journal_columns(table) -> list:
+    cols = []
+    for name in JOURNAL_FIELDS:
+        col = table.c[name]
+        if name == "date":
+            col = type_coerce(col, String)
+        elif name == "reviewed":
+            col = type_coerce(func.coalesce(col, False), Boolean)
+        cols.append(col)
+    return cols
+
+
+def journal_rows(client_code: str, date_from: Optional[_date] = None, date_to: Optional[_date] = None) -> List[JournalRow]:
+    """Journal list rows, newest id first; a date range reaches into archived fiscal years like ``query_entries``."""
+    if date_from or date_to:
+        return [
+            JournalRow(r.id, r.date.isoformat() if r.date else None, r.summary, r.amount, r.debit_account,
+                       r.credit_account, r.confidence, r.ai_reason, bool(r.reviewed), r.pdf_path,
+                       r.document_sha256, r.tax_type)
+            for r in query_entries(client_code, date_from, date_to)
+        ]
+    t = JournalEntry.__table__
+    stmt = select(*journal_columns(t)).order_by(t.c.id.desc())
+    with get_engine_for_client(client_code).connect() as conn:
+        return [JournalRow(*r) for r in conn.execute(stmt)]
+
+
+@dataclass(slots=True)
+class AccountRow:
+    id: int
+    code: str
+    name: str
+    type: Optional[str]
+    aliases: Optional[str]
+
+
+def account_rows(client_code: str) -> List[AccountRow]:
+    t = Account.__table__
+    stmt = select(t.c.id, t.c.code, t.c.name, t.c.type, t.c.aliases).order_by(t.c.code)
+    with get_engine_for_client(client_code).connect() as conn:
+        return [AccountRow(*r) for r in conn.execute(stmt)]
+
+
+def change_versions(client_code: str, tables: Sequence[str]) -> Tuple[int, ...]:
+    """Current write counters of ``tables`` (0 if never written); reads only ``change_versions``."""
+    t = ChangeVersion.__table__
+    with get_engine_for_client(client_code).connect() as conn:
+        found = dict(conn.execute(select(t.c.scope, t.c.version).where(t.c.scope.in_(tables))).all())
+    return tuple(found.get(name, 0) for name in tables)
+
+
+@dataclass(slots=True)
+class LegacyJournalRow:
+    id: int
+    date: Optional[str]
+    debit_account_id: int
+    credit_account_id: int
+    amount: float
+    summary: Optional[str]
+    tax_type: Optional[str]
+
+
+@dataclass(slots=True)
+class LegacyAccountRow:
+    id: int
+    code: str
+    name: str
+    type: str
+
+
+def legacy_journal_rows(db, client_id: int) -> List[LegacyJournalRow]:
+    """``journals`` of one client in the legacy single database, newest date first."""
+    t = legacy.Journal.__table__
+    stmt = (
+        select(t.c.id, type_coerce(t.c.date, String), t.c.debit_account_id, t.c.credit_account_id, t.c.amount,
+               t.c.summary, t.c.tax_type)
+        .where(t.c.client_id == client_id)
+        .order_by(t.c.date.desc())
+    )
+    return [LegacyJournalRow(*r) for r in db.execute(stmt)]
+
+
+def legacy_account_rows(db) -> List[LegacyAccountRow]:
+    t = legacy.Account.__table__
+    stmt = select(t.c.id, t.c.code, t.c.name, t.c.type).order_by(t.c.code)
+    return [LegacyAccountRow(*r) for r in db.execute(stmt)]
+
+
+# ---------------------------------------------------------------- encoding
+
+def _default(obj: Any) -> Any:
+    if hasattr(obj, "__slots__"):
+        return {name: getattr(obj, name) for name in obj.__slots__}
+    if isinstance(obj, _date):
+        return obj.isoformat()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_ndjson(rows: Sequence[Any]) -> bytes:
+    """One JSON document per line, newline terminated."""
+    return b"".join(dumps(r) + b"\n" for r in rows)
+
+
+def dumps_msgpack(obj: Any) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
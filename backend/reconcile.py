@@ -0,0 +1,288 @@
+"""Bank reconciliation (消込): match bank/card lines against journal entries.
+
+Journal entries are bucketed by integer-yen amount and sorted by date, so
+each bank line finds its same-amount candidates within the date tolerance by
+bisection. Pairs are scored on vendor similarity and date distance and
+assigned greedily, best first. Lines left over are tried as split payments:
+one bank line against several journal entries (or the reverse) whose amounts
+add up, searched among the unmatched items inside the date window.
+"""
+from __future__ import annotations
+
+import bisect
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, select
+
+from .db_manager import get_session_for_client
+from .duplicate_index import amount_key, vendor_similarity
+from .models_bank import BankTransaction, StagedTransaction
+from .models_journal import JournalEntry
+from .models_reconcile import ReconcileLink, ReconcileMatch
+from .settings import settings
+from .txn_classifier import description_key
+
+
+Ref = Tuple[str, int]
+
+# Most candidates considered per split search, and most combinations tried
+SPLIT_CANDIDATES = 40
+SPLIT_SEARCH_NODES = 5000
+
+
+@dataclass(frozen=True)
+class Item:
+    kind: str  # bank / statement / journal
+    id: int
+    day: int  # date ordinal
+    amount: int  # absolute integer yen
+    vendor: str
+
+    @property
+    def ref(self) -> Ref:
+        return (self.kind, self.id)
+
+
+@dataclass
+class Proposal:
+    bank: List[Item]
+    journal: List[Item]
+    score: float
+    method: str  # exact / split
+
+    @property
+    def refs(self) -> FrozenSet[Ref]:
+        return frozenset(i.ref for i in self.bank + self.journal)
+
+
+def make_item(kind: str, item_id: int, day, amount: Optional[float], text: Optional[str]) -> Item:
+    return Item(kind, item_id, day.toordinal(), amount_key(amount), description_key(text))
+
+
+def pair_score(a: Item, b: Item, tolerance: int) -> float:
+    date_score = 1.0 - abs(a.day - b.day) / (tolerance + 1)
+    return 0.5 * vendor_similarity(a.vendor, b.vendor) + 0.5 * date_score
+
+
+class _DateIndex:
+    """Items sorted by date for window slicing."""
+
+    def __init__(self, items: Iterable[Item]) -> None:
+        self.items = sorted(items, key=lambda i: (i.day, i.id))
+        self.days = [i.day for i in self.items]
+
+    def window(self, day: int, tolerance: int) -> List[Item]:
+        lo = bisect.bisect_left(self.days, day - tolerance)
+        hi = bisect.bisect_right(self.days, day + tolerance)
+        return self.items[lo:hi]
+
+
+def _exact(bank: List[Item], journal: List[Item], tolerance: int, min_score: float,
+           rejected: Set[FrozenSet[Ref]]) -> List[Proposal]:
+    buckets: Dict[int, _DateIndex] = {}
+    grouped: Dict[int, List[Item]] = defaultdict(list)
+    for j in journal:
+        grouped[j.amount].append(j)
+    for amount, items in grouped.items():
+        buckets[amount] = _DateIndex(items)
+
+    candidates: List[Tuple[float, Item, Item]] = []
+    for b in bank:
+        index = buckets.get(b.amount)
+        if index is None:
+            continue
+        for j in index.window(b.day, tolerance):
+            score = pair_score(b, j, tolerance)
+            if score >= min_score and frozenset((b.ref, j.ref)) not in rejected:
+                candidates.append((score, b, j))
+    candidates.sort(key=lambda c: (-c[0], c[1].day, c[1].id, c[2].id))
+
+    used: Set[Ref] = set()
+    out: List[Proposal] = []
+    for score, b, j in candidates:
+        if b.ref in used or j.ref in used:
+            continue
+        used.add(b.ref)
+        used.add(j.ref)
+        out.append(Proposal([b], [j], round(score, 4), "exact"))
+    return out
+
+
+def _best_split(target: Item, candidates: List[Item], max_parts: int, tolerance: int) -> Optional[Tuple[float, List[Item]]]:
+    candidates = sorted(candidates, key=lambda c: -c.amount)
+    best: Optional[Tuple[float, List[Item]]] = None
+    visited = 0
+    chosen: List[Item] = []
+
+    def search(start: int, remaining: int) -> None:
+        nonlocal best, visited
+        for i in range(start, len(candidates)):
+            visited += 1
+            if visited > SPLIT_SEARCH_NODES:
+                return
+            c = candidates[i]
+            if c.amount > remaining:
+                continue
+            chosen.append(c)
+            if c.amount == remaining and len(chosen) > 1:
+                score = sum(pair_score(target, p, tolerance) for p in chosen) / len(chosen)
+                if best is None or score > best[0]:
+                    best = (score, list(chosen))
+            elif c.amount < remaining and len(chosen) < max_parts:
+                search(i + 1, remaining - c.amount)
+            chosen.pop()
+
+    search(0, target.amount)
+    return best
+
+
+def _splits(targets: List[Item], parts: List[Item], tolerance: int, min_score: float, max_parts: int,
+            used: Set[Ref], rejected: Set[FrozenSet[Ref]], target_is_bank: bool) -> List[Proposal]:
+    index = _DateIndex(p for p in parts if p.ref not in used)
+    out: List[Proposal] = []
+    for target in sorted(targets, key=lambda t: (-t.amount, t.day, t.id)):
+        if target.ref in used or target.amount <= 0:
+            continue
+        window = [p for p in index.window(target.day, tolerance)
+                  if p.ref not in used and 0 < p.amount < target.amount]
+        if len(window) < 2:
+            continue
+        if len(window) > SPLIT_CANDIDATES:
+            window.sort(key=lambda p: -pair_score(target, p, tolerance))
+            window = window[:SPLIT_CANDIDATES]
+        found = _best_split(target, window, max_parts, tolerance)
+        if found is None:
+            continue
+        # Splits are less certain than a single exact amount
+        score = round(found[0] * 0.9, 4)
+        bank, journal = ([target], found[1]) if target_is_bank else (found[1], [target])
+        proposal = Proposal(bank, journal, score, "split")
+        if score < min_score or proposal.refs in rejected:
+            continue
+        used.update(proposal.refs)
+        out.append(proposal)
+    return out
+
+
+def match_items(
+    bank: List[Item],
+    journal: List[Item],
+    tolerance: Optional[int] = None,
+    min_score: Optional[float] = None,
+    max_parts: Optional[int] = None,
+    rejected: Optional[Set[FrozenSet[Ref]]] = None,
+) -> List[Proposal]:
+    tolerance = settings.reconcile_date_tolerance_days if tolerance is None else tolerance
+    min_score = settings.reconcile_min_score if min_score is None else min_score
+    max_parts = settings.reconcile_split_max_parts if max_parts is None else max_parts
+    rejected = rejected or set()
+
+    proposals = _exact(bank, journal, tolerance, min_score, rejected)
+    used: Set[Ref] = set()
+    for p in proposals:
+        used.update(p.refs)
+    if max_parts > 1:
+        proposals += _splits(bank, journal, tolerance, min_score, max_parts, used, rejected, target_is_bank=True)
+        proposals += _splits(journal, bank, tolerance, min_score, max_parts, used, rejected, target_is_bank=False)
+    return proposals
+
+
+def _load_items(db, excluded: Set[Ref]) -> Tuple[List[Item], List[Item]]:
+    bank: List[Item] = []
+    for tid, day, amount, text in db.query(BankTransaction.id, BankTransaction.date, BankTransaction.amount,
+                                           BankTransaction.description).yield_per(1000):
+        if day is not None and ("bank", tid) not in excluded:
+            bank.append(make_item("bank", tid, day, amount, text))
+    staged = db.query(StagedTransaction.id, StagedTransaction.date, StagedTransaction.amount,
+                      StagedTransaction.description).filter(StagedTransaction.status == "pending")
+    for sid, day, amount, text in staged.yield_per(1000):
+        if day is not None and ("statement", sid) not in excluded:
+            bank.append(make_item("statement", sid, day, amount, text))
+    journal: List[Item] = []
+    for eid, day, amount, text in db.query(JournalEntry.id, JournalEntry.date, JournalEntry.amount,
+                                           JournalEntry.summary).yield_per(1000):
+        if day is not None and ("journal", eid) not in excluded:
+            journal.append(make_item("journal", eid, day, amount, text))
+    return bank, journal
+
+
+def _delete_proposed(db, match_ids=None) -> None:
+    proposed = select(ReconcileMatch.id).where(ReconcileMatch.status == "proposed")
+    if match_ids is not None:
+        proposed = proposed.where(ReconcileMatch.id.in_(match_ids))
+    ids = [row[0] for row in db.execute(proposed)]
+    if ids:
+        db.execute(delete(ReconcileLink).where(ReconcileLink.match_id.in_(ids)))
+        db.execute(delete(ReconcileMatch).where(ReconcileMatch.id.in_(ids)))
+
+
+def run_reconciliation(client_code: str) -> Dict[str, int]:
+    """Recompute proposals for everything not yet confirmed. Rejected combinations are not proposed again."""
+    db = get_session_for_client(client_code)
+    try:
+        links: Dict[int, Set[Ref]] = defaultdict(set)
+        status: Dict[int, str] = {}
+        rows = db.query(ReconcileLink.match_id, ReconcileLink.kind, ReconcileLink.ref_id, ReconcileMatch.status).join(
+            ReconcileMatch, ReconcileMatch.id == ReconcileLink.match_id
+        ).filter(ReconcileMatch.status != "proposed")
+        for match_id, kind, ref_id, match_status in rows:
+            links[match_id].add((kind, ref_id))
+            status[match_id] = match_status
+        confirmed = {ref for mid, refs in links.items() if status[mid] == "confirmed" for ref in refs}
+        rejected = {frozenset(refs) for mid, refs in links.items() if status[mid] == "rejected"}
+
+        _delete_proposed(db)
+        bank, journal = _load_items(db, confirmed)
+        proposals = match_items(bank, journal, rejected=rejected)
+
+        now = datetime.utcnow()
+        matches = [ReconcileMatch(method=p.method, score=p.score, status="proposed", created_at=now) for p in proposals]
+        db.add_all(matches)
+        db.flush()
+        db.bulk_insert_mappings(ReconcileLink, [
+            {"match_id": m.id, "kind": item.kind, "ref_id": item.id}
+            for m, p in zip(matches, proposals) for item in p.bank + p.journal
+        ])
+        db.commit()
+        return {
+            "proposed": len(proposals),
+            "exact": sum(1 for p in proposals if p.method == "exact"),
+            "split": sum(1 for p in proposals if p.method == "split"),
+            "unmatched_bank": len(bank) - sum(len(p.bank) for p in proposals),
+            "unmatched_journal": len(journal) - sum(len(p.journal) for p in proposals),
+        }
+    finally:
+        db.close()
+
+
+def decide_match(client_code: str, match_id: int, confirm: bool) -> Optional[ReconcileMatch]:
+    """Confirm or reject a proposal. Confirming drops other proposals that share any of its lines."""
+    db = get_session_for_client(client_code)
+    try:
+        match = db.get(ReconcileMatch, match_id)
+        if match is None:
+            return None
+        if match.status != "proposed":
+            raise ValueError(f"Match already {match.status}")
+        match.status = "confirmed" if confirm else "rejected"
+        match.decided_at = datetime.utcnow()
+        if confirm:
+            refs = [(l.kind, l.ref_id) for l in db.query(ReconcileLink).filter(ReconcileLink.match_id == match_id)]
+            overlapping = set()
+            for kind, ref_id in refs:
+                overlapping.update(
+                    row[0] for row in db.query(ReconcileLink.match_id).filter(
+                        ReconcileLink.kind == kind, ReconcileLink.ref_id == ref_id, ReconcileLink.match_id != match_id
+                    )
+                )
+            if overlapping:
+                _delete_proposed(db, list(overlapping))
+        db.commit()
+        db.refresh(match)
+        db.expunge(match)
+        return match
+    finally:
+        db.close()
@@ -0,0 +1,120 @@
+"""Background scan upload jobs.
+
+An upload creates a ``ScanJob`` holding one item per document; items are
+processed by the ingest worker pool and their results are recorded here for
+the status API. Jobs are kept in memory for ``scan_job_retention_minutes``.
+"""
+from __future__ import annotations
+
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .settings import settings
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class JobItem:
+    name: str
+    path: Optional[str] = None
+    status: str = QUEUED
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "status": self.status, "result": self.result, "error": self.error}
+
+
+@dataclass
+class ScanJob:
+    id: str
+    client_code: str
+    created_at: datetime
+    items: List[JobItem] = field(default_factory=list)
+    finished_at: Optional[datetime] = None
+    sealed: bool = False  # all items have been added
+
+    @property
+    def status(self) -> str:
+        if not self.items:
+            return DONE
+        states = {i.status for i in self.items}
+        if states <= {DONE, FAILED}:
+            return FAILED if states == {FAILED} else DONE
+        if states == {QUEUED}:
+            return QUEUED
+        return RUNNING
+
+    def to_dict(self, with_items: bool = True) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for i in self.items:
+            counts[i.status] = counts.get(i.status, 0) + 1
+        data: Dict[str, Any] = {
+            "job_id": self.id,
+            "client": self.client_code,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "counts": counts,
+            "saved": sum(1 for i in self.items if i.result and i.result.get("saved")),
+        }
+        if with_items:
+            data["items"] = [i.to_dict() for i in self.items]
+        return data
+
+
+class ScanJobRegistry:
+    def __init__(self) -> None:
+        self._jobs: Dict[str, ScanJob] = {}
+        self._lock = threading.Lock()
+
+    def create(self, client_code: str) -> ScanJob:
+        job = ScanJob(id=uuid.uuid4().hex, client_code=client_code, created_at=datetime.utcnow())
+        with self._lock:
+            self._expire()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str, client_code: str) -> Optional[ScanJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        # Jobs are only visible to the tenant that created them
+        return job if job and job.client_code == client_code else None
+
+    def list(self, client_code: str) -> List[ScanJob]:
+        with self._lock:
+            self._expire()
+            jobs = [j for j in self._jobs.values() if j.client_code == client_code]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def finish_item(self, job: ScanJob, item: JobItem, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        with self._lock:
+            item.result = result
+            item.error = error
+            item.status = FAILED if error else DONE
+            self._check_finished(job)
+
+    def seal(self, job: ScanJob) -> None:
+        with self._lock:
+            job.sealed = True
+            self._check_finished(job)
+
+    def _check_finished(self, job: ScanJob) -> None:
+        if job.sealed and job.finished_at is None and all(i.status in {DONE, FAILED} for i in job.items):
+            job.finished_at = datetime.utcnow()
+
+    def _expire(self) -> None:
+        cutoff = datetime.utcnow() - timedelta(minutes=settings.scan_job_retention_minutes)
+        for job_id in [k for k, j in self._jobs.items() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+jobs = ScanJobRegistry()
@@ -0,0 +1,138 @@
+"""Per-tenant adaptive ScanSnap folder scan schedule.
+
+Each tenant has its own interval between folder scans. A scan that finds new
+documents resets it to the tenant's minimum; an idle scan multiplies it by
+``scansnap_backoff`` up to the maximum. Due times carry ±``scansnap_jitter``
+and new tenants start at a random offset, so thousands of folders do not all
+get listed in the same tick. Due tenants are kept in a heap, so a scheduler
+tick only touches the folders that are actually due.
+"""
+from __future__ import annotations
+
+import heapq
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .settings import settings
+
+
+# client code -> (folder, min seconds, max seconds)
+TenantConfig = Tuple[str, float, float]
+
+
+@dataclass
+class TenantSchedule:
+    client_code: str
+    folder: str
+    min_seconds: float
+    max_seconds: float
+    interval: float
+    next_due: float
+    idle_scans: int = 0
+    last_found_at: Optional[float] = None
+    generation: int = 0
+
+
+class AdaptiveScanSchedule:
+    def __init__(
+        self,
+        backoff: Optional[float] = None,
+        jitter: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.backoff = settings.scansnap_backoff if backoff is None else backoff
+        self.jitter = settings.scansnap_jitter if jitter is None else jitter
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._tenants: Dict[str, TenantSchedule] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._lock = threading.Lock()
+
+    def _push(self, t: TenantSchedule, delay: float, now: float) -> None:
+        spread = 1.0 + self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 1.0
+        t.generation += 1
+        t.next_due = now + delay * spread
+        heapq.heappush(self._heap, (t.next_due, t.generation, t.client_code))
+
+    def configure(self, tenants: Dict[str, TenantConfig], now: Optional[float] = None) -> None:
+        """Add, update or drop tenants; existing tenants keep their learned interval."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            for code in list(self._tenants):
+                if code not in tenants:
+                    del self._tenants[code]  # its heap entries are skipped as stale
+            for code, (folder, lo, hi) in tenants.items():
+                lo, hi = float(lo), float(max(hi, lo))
+                t = self._tenants.get(code)
+                if t is None:
+                    interval = min(max(settings.scansnap_poll_minutes * 60.0, lo), hi)
+                    t = TenantSchedule(code, folder, lo, hi, interval, now)
+                    self._tenants[code] = t
+                    # Stagger first scans across one interval
+                    t.generation += 1
+                    t.next_due = now + self.rng.uniform(0, interval)
+                    heapq.heappush(self._heap, (t.next_due, t.generation, code))
+                    continue
+                t.folder, t.min_seconds, t.max_seconds = folder, lo, hi
+                clamped = min(max(t.interval, lo), hi)
+                if clamped != t.interval:
+                    t.interval = clamped
+                    self._push(t, clamped, now)
+
+    def due(self, now: Optional[float] = None) -> List[TenantSchedule]:
+        """Pop the tenants whose scan is due. Each must be reported back with ``record``."""
+        now = self.clock() if now is None else now
+        out: List[TenantSchedule] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, generation, code = heapq.heappop(self._heap)
+                t = self._tenants.get(code)
+                if t is not None and t.generation == generation:
+                    out.append(t)
+        return out
+
+    def record(self, client_code: str, found: int, now: Optional[float] = None) -> Optional[float]:
+        """Reschedule after a scan that found ``found`` new documents; returns the new interval."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            t = self._tenants.get(client_code)
+            if t is None:
+                return None
+            if found:
+                t.interval = t.min_seconds
+                t.idle_scans = 0
+                t.last_found_at = now
+            else:
+                t.idle_scans += 1
+                t.interval = min(t.interval * self.backoff, t.max_seconds)
+            self._push(t, t.interval, now)
+            return t.interval
+
+    def activity(self, client_code: str, now: Optional[float] = None) -> None:
+        """Documents arrived by other means (events, uploads): scan this tenant soon."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            t = self._tenants.get(client_code)
+            if t is None or t.interval == t.min_seconds:
+                return
+            t.interval = t.min_seconds
+            self._push(t, t.interval, now)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        now = self.clock() if now is None else now
+        with self._lock:
+            return {
+                code: {
+                    "folder": t.folder,
+                    "interval_seconds": round(t.interval, 1),
+                    "next_scan_in_seconds": round(max(t.next_due - now, 0.0), 1),
+                    "idle_scans": t.idle_scans,
+                    "min_seconds": t.min_seconds,
+                    "max_seconds": t.max_seconds,
+                }
+                for code, t in self._tenants.items()
+            }
@@ -0,0 +1,244 @@
+"""Event-driven ScanSnap folder watching with a polling fallback.
+
+File close/move events (inotify on Linux via ``watchdog``) and periodic
+rescans both feed ``notify``. Paths are debounced until their size and
+mtime stop changing, then handed to a queue whose worker forwards them to
+``handler`` (normally ``IngestPool.submit``). ``on_activity`` is told about
+each tenant with a new file, so its scan schedule can tighten.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from .ingest_pool import QueueFull
+from .settings import settings
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # pragma: no cover - optional dependency
+    FileSystemEventHandler = object  # type: ignore[misc,assignment]
+    Observer = None
+
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str, Path], None]
+_Key = Tuple[str, str]
+
+
+class _FolderEvents(FileSystemEventHandler):  # type: ignore[misc]
+    def __init__(self, watcher: "ScanWatcher", client_code: str) -> None:
+        super().__init__()
+        self.watcher = watcher
+        self.client_code = client_code
+
+    def _notify(self, path: str) -> None:
+        if path.lower().endswith(".xml"):
+            self.watcher.notify(self.client_code, Path(path))
+
+    # IN_CLOSE_WRITE; not emitted on every platform, so creation/modification
+    # is tracked too and left to the debounce to settle.
+    def on_closed(self, event) -> None:
+        if not event.is_directory:
+            self._notify(event.src_path)
+
+    def on_created(self, event) -> None:
+        if not event.is_directory:
+            self._notify(event.src_path)
+
+    def on_modified(self, event) -> None:
+        if not event.is_directory:
+            self._notify(event.src_path)
+
+    def on_moved(self, event) -> None:
+        if not event.is_directory:
+            self._notify(event.dest_path)
+
+
+class ScanWatcher:
+    def __init__(
+        self,
+        handler: Handler,
+        mode: Optional[str] = None,
+        debounce_seconds: Optional[float] = None,
+        on_activity: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.handler = handler
+        self.on_activity = on_activity
+        self.mode = (mode or settings.scansnap_watch_mode).lower()
+        self.debounce_seconds = settings.scansnap_debounce_seconds if debounce_seconds is None else debounce_seconds
+        self.queue: "queue.Queue[Optional[_Key]]" = queue.Queue()
+        self._pending: Dict[_Key, Tuple[int, float, float]] = {}
+        self._seen: Dict[_Key, Tuple[int, float]] = {}
+        self._dir_mtimes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._observer = None
+
+    @property
+    def events_active(self) -> bool:
+        return self._observer is not None
+
+    def start(self, folders: Dict[str, str]) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        self._drain_sentinels()
+        self._threads = [
+            threading.Thread(target=self._debounce_loop, name="scansnap-debounce", daemon=True),
+            threading.Thread(target=self._worker_loop, name="scansnap-worker", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        if self.mode in {"auto", "events"}:
+            self._start_observer(folders)
+        # Catch up on files that arrived while we were not running
+        self.poll(folders)
+
+    def _start_observer(self, folders: Dict[str, str]) -> None:
+        if Observer is None:
+            if self.mode == "events":
+                logger.warning("watchdog is not installed; falling back to polling")
+            return
+        observer = Observer()
+        scheduled = 0
+        for client_code, folder in folders.items():
+            p = Path(folder).expanduser()
+            if not p.is_dir():
+                continue
+            observer.schedule(_FolderEvents(self, client_code), str(p), recursive=False)
+            scheduled += 1
+        if not scheduled:
+            return
+        try:
+            observer.start()
+        except Exception:
+            logger.exception("Could not start folder observer; falling back to polling")
+            return
+        self._observer = observer
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        if any(t.is_alive() for t in self._threads):
+            self.queue.put(None)
+        for t in self._threads:
+            t.join(timeout=5)
+        self._threads = []
+
+    def _drain_sentinels(self) -> None:
+        # A stop sentinel the old worker never read would end the new one at once; keep queued files
+        keys = []
+        while True:
+            try:
+                key = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if key is not None:
+                keys.append(key)
+        for key in keys:
+            self.queue.put(key)
+
+    def notify(self, client_code: str, path: Path) -> bool:
+        """Register a possibly changed file; it is queued once it stops changing.
+
+        Returns True when the file is new or changed since it was last seen.
+        """
+        try:
+            st = path.stat()
+        except OSError:
+            return False
+        key = (client_code, str(path.resolve()))
+        with self._lock:
+            if self._seen.get(key) == (st.st_size, st.st_mtime):
+                return False
+            prev = self._pending.get(key)
+            if prev is not None and prev[:2] == (st.st_size, st.st_mtime):
+                return False
+            self._pending[key] = (st.st_size, st.st_mtime, time.monotonic())
+        if self.on_activity is not None:
+            self.on_activity(client_code)
+        return True
+
+    def poll(self, folders: Dict[str, str]) -> int:
+        """Rescan folders whose directory mtime changed since the last poll; returns new files found."""
+        found = 0
+        for client_code, folder in folders.items():
+            if not folder:
+                continue
+            p = Path(folder).expanduser()
+            try:
+                dir_mtime = p.stat().st_mtime
+            except OSError:
+                continue
+            if self._dir_mtimes.get(str(p)) == dir_mtime:
+                continue
+            try:
+                with os.scandir(p) as it:
+                    for entry in it:
+                        if entry.is_file() and entry.name.lower().endswith(".xml"):
+                            found += self.notify(client_code, Path(entry.path))
+            except OSError as exc:
+                # e.g. a disconnected share; listed again on the next poll
+                logger.warning("Cannot list %s for %s: %s", p, client_code, exc)
+                continue
+            self._dir_mtimes[str(p)] = dir_mtime
+        return found
+
+    def _debounce_loop(self) -> None:
+        interval = max(self.debounce_seconds / 2.0, 0.05)
+        while not self._stop.wait(interval):
+            self.flush_ready()
+
+    def flush_ready(self, now: Optional[float] = None) -> int:
+        """Queue pending files that have been stable for the debounce period."""
+        now = time.monotonic() if now is None else now
+        ready: list[_Key] = []
+        with self._lock:
+            for key, (size, mtime, since) in list(self._pending.items()):
+                try:
+                    st = os.stat(key[1])
+                except OSError:
+                    del self._pending[key]
+                    continue
+                if (st.st_size, st.st_mtime) != (size, mtime):
+                    self._pending[key] = (st.st_size, st.st_mtime, now)
+                    continue
+                if now - since >= self.debounce_seconds:
+                    del self._pending[key]
+                    self._seen[key] = (size, mtime)
+                    ready.append(key)
+        for key in ready:
+            self.queue.put(key)
+        return len(ready)
+
+    def _worker_loop(self) -> None:
+        while True:
+            key = self.queue.get()
+            if key is None or self._stop.is_set():
+                break
+            client_code, path = key
+            try:
+                self.handler(client_code, Path(path))
+            except QueueFull:
+                # Backpressure: keep the file pending and offer it again after the debounce
+                with self._lock:
+                    self._seen.pop(key, None)
+                self.notify(client_code, Path(path))
+            except Exception:
+                logger.exception("Failed to process %s", path)
+                # Let the next rescan pick the file up again
+                with self._lock:
+                    self._seen.pop(key, None)
+                self._dir_mtimes.clear()
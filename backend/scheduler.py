@@ -1,18 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 from pathlib import Path
-from typing import Dict, Set
+from typing import Any, Dict, Optional, Tuple
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
 from .auto_journal_scan import process_scansnap_xml
+from .backup import run_backup, verify_backups
+from .connectors import sync_all
 from .db_manager import get_master_session
+from .ingest_ledger import get_ledger, ingest_file
+from .ingest_pool import IngestPool, QueueFull
+from .leader import LeaderLease
+from .maintenance import run_maintenance
 from .models_client import Client
+from .scan_schedule import AdaptiveScanSchedule, TenantConfig
+from .scan_watcher import ScanWatcher
 from .settings import settings
 
 
-scheduler = BackgroundScheduler()
-_processed: Set[str] = set()
+logger = logging.getLogger(__name__)
+
+scheduler = BackgroundScheduler(timezone=settings.scheduler_timezone)
 
 
 def _iter_client_folders() -> Dict[str, str]:
@@ -28,30 +39,108 @@ def _iter_client_folders() -> Dict[str, str]:
     return folders
 
 
+def _scan_configs() -> Dict[str, TenantConfig]:
+    """Folder and interval bounds per tenant; per-client bounds come from the Client registry."""
+    folders = _iter_client_folders()
+    if watcher.events_active:
+        # Events deliver new files; scans are only the safety net
+        lo = hi = settings.scansnap_rescan_minutes * 60.0
+    else:
+        lo, hi = settings.scansnap_min_seconds, settings.scansnap_max_seconds
+    bounds: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+    with get_master_session() as s:
+        for c in s.query(Client).filter(Client.code.in_(list(folders))).all():
+            bounds[c.code] = (c.scan_min_seconds, c.scan_max_seconds)
+    configs: Dict[str, TenantConfig] = {}
+    for code, folder in folders.items():
+        cmin, cmax = bounds.get(code, (None, None))
+        configs[code] = (folder, cmin or lo, cmax or hi)
+    return configs
+
+
+def _process_file(client_code: str, xml_file: Path) -> Optional[Dict[str, Any]]:
+    return ingest_file(client_code, xml_file, lambda p, code: process_scansnap_xml(p, client_code=code))
+
+
+pool = IngestPool(handler=_process_file)
+scan_schedule = AdaptiveScanSchedule()
+watcher = ScanWatcher(handler=pool.submit, on_activity=scan_schedule.activity)
+
+
+def refresh_scan_schedule() -> None:
+    scan_schedule.configure(_scan_configs())
+
+
 def watch_scansnap_folders() -> None:
-    for client_code, folder in _iter_client_folders().items():
-        p = Path(folder)
-        if not p.exists():
-            continue
-        for xml_file in p.glob("*.xml"):
-            key = f"{client_code}|{xml_file.resolve()}"
-            if key in _processed:
-                continue
+    # Polling fallback / safety rescan of the tenants that are due; new files are debounced and queued by the watcher
+    for t in scan_schedule.due():
+        # due() took the tenant off the schedule; record() must put it back even when the scan fails
+        found = 0
+        try:
+            found = watcher.poll({t.client_code: t.folder})
+        except Exception:
+            logger.exception("Scan of %s (%s) failed", t.client_code, t.folder)
+        finally:
+            scan_schedule.record(t.client_code, found)
+
+
+def retry_failed_scans() -> None:
+    for client_code in _iter_client_folders():
+        for path in get_ledger(client_code).due_retries():
             try:
-                result = process_scansnap_xml(xml_file, client_code=client_code)
-                if result.get("saved"):
-                    _processed.add(key)
-            except Exception:
-                pass
+                pool.submit(client_code, Path(path))
+            except QueueFull:
+                break
 
 
-def start_scheduler() -> None:
-    if not scheduler.running:
-        scheduler.add_job(watch_scansnap_folders, "interval", minutes=settings.scansnap_poll_minutes, id="watch_scansnap")
+def sync_bank_accounts() -> None:
+    with get_master_session() as s:
+        codes = [c.code for c in s.query(Client).all()]
+    asyncio.run(sync_all(codes))
+
+
+def _start_ingestion() -> None:
+    pool.start()
+    watcher.start(_iter_client_folders())
+    refresh_scan_schedule()
+    scheduler.add_job(watch_scansnap_folders, "interval", seconds=settings.scansnap_tick_seconds, id="watch_scansnap",
+                      replace_existing=True)
+    scheduler.add_job(refresh_scan_schedule, "interval", minutes=1, id="refresh_scan_schedule", replace_existing=True)
+    scheduler.add_job(retry_failed_scans, "interval", minutes=1, id="retry_scansnap", replace_existing=True)
+    if settings.sync_interval_minutes > 0 and settings.sync_providers:
+        scheduler.add_job(sync_bank_accounts, "interval", minutes=settings.sync_interval_minutes, id="sync_bank",
+                          replace_existing=True)
+    if settings.backup_hour >= 0:
+        scheduler.add_job(run_backup, "cron", hour=settings.backup_hour, minute=0, id="backup",
+                          replace_existing=True, coalesce=True, misfire_grace_time=3600)
+        scheduler.add_job(verify_backups, "cron", day_of_week="sun", hour=settings.backup_hour, minute=30,
+                          id="verify_backups", replace_existing=True, coalesce=True, misfire_grace_time=3600)
+    if settings.maintenance_hour >= 0:
+        scheduler.add_job(run_maintenance, "cron", hour=settings.maintenance_hour, minute=0, id="maintenance",
+                          replace_existing=True, coalesce=True, misfire_grace_time=3600)
+    if scheduler.running:
+        scheduler.resume()
+    else:
         scheduler.start()
 
 
+def _stop_ingestion() -> None:
+    # Standby: stop discovering work; files already queued still finish on the pool
+    if scheduler.running:
+        scheduler.pause()
+    watcher.stop()
+
+
+lease = LeaderLease("ingest", on_acquire=_start_ingestion, on_release=_stop_ingestion)
+
+
+def start_scheduler() -> None:
+    lease.start()
+
+
 def shutdown_scheduler() -> None:
+    lease.stop()
     if scheduler.running:
         scheduler.shutdown()
-
+    watcher.stop()
+    pool.stop()
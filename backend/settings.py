@@ -26,14 +26,138 @@ class Settings:
     # Confidence threshold
     ai_autopost_threshold: float = float(os.getenv("AI_AUTOPOST_THRESHOLD", "0.7"))
 
-    # Scheduler
+    # Minimum fuzzy score for mapping LLM account names onto the chart of accounts
+    account_match_min_score: float = float(os.getenv("ACCOUNT_MATCH_MIN_SCORE", "0.6"))
+
+    # Scheduler; cron jobs (backups, maintenance) run at their hour in this time zone
+    scheduler_timezone: str = os.getenv("SCHEDULER_TIMEZONE", "Asia/Tokyo")
     scansnap_poll_minutes: int = int(os.getenv("SCANSNAP_POLL_MINUTES", "3"))
+    # "auto" uses file system events when available, "events" requires them, "poll" disables them
+    scansnap_watch_mode: str = os.getenv("SCANSNAP_WATCH_MODE", "auto")
+    scansnap_debounce_seconds: float = float(os.getenv("SCANSNAP_DEBOUNCE_SECONDS", "2.0"))
+    # Safety rescan interval while event watching is active
+    scansnap_rescan_minutes: int = int(os.getenv("SCANSNAP_RESCAN_MINUTES", "60"))
+    # Adaptive per-tenant polling: SCANSNAP_POLL_MINUTES is the starting interval; it drops to
+    # the minimum when new documents appear and grows by the backoff factor while idle.
+    # Per-client overrides live in Client.scan_min_seconds / scan_max_seconds.
+    scansnap_min_seconds: int = int(os.getenv("SCANSNAP_MIN_SECONDS", "30"))
+    scansnap_max_seconds: int = int(os.getenv("SCANSNAP_MAX_SECONDS", "1800"))
+    scansnap_backoff: float = float(os.getenv("SCANSNAP_BACKOFF", "2.0"))
+    scansnap_jitter: float = float(os.getenv("SCANSNAP_JITTER", "0.1"))
+    scansnap_tick_seconds: int = int(os.getenv("SCANSNAP_TICK_SECONDS", "5"))
+
+    # Only the process holding this master-DB lease runs the ingestion jobs; standbys take over after it expires
+    leader_lease_seconds: float = float(os.getenv("LEADER_LEASE_SECONDS", "10"))
+
+    # Ingest ledger retry policy for documents whose processing raised
+    ingest_max_attempts: int = int(os.getenv("INGEST_MAX_ATTEMPTS", "5"))
+    ingest_retry_base_seconds: int = int(os.getenv("INGEST_RETRY_BASE_SECONDS", "60"))
+
+    # Ingest worker pool
+    ingest_workers: int = int(os.getenv("INGEST_WORKERS", "4"))
+    ingest_queue_per_tenant: int = int(os.getenv("INGEST_QUEUE_PER_TENANT", "500"))
+    ingest_tenant_concurrency: int = int(os.getenv("INGEST_TENANT_CONCURRENCY", "2"))
+    ingest_tenant_weights: Dict[str, int]
+
+    # Scan uploads
+    scan_upload_dir: str = os.getenv("SCAN_UPLOAD_DIR", "tmp")
+    scan_upload_chunk_bytes: int = int(os.getenv("SCAN_UPLOAD_CHUNK_BYTES", str(1 << 20)))
+    scan_job_retention_minutes: int = int(os.getenv("SCAN_JOB_RETENTION_MINUTES", "1440"))
+    # Zip uploads beyond these limits are rejected before anything is extracted
+    scan_zip_max_members: int = int(os.getenv("SCAN_ZIP_MAX_MEMBERS", "5000"))
+    scan_zip_max_bytes: int = int(os.getenv("SCAN_ZIP_MAX_BYTES", str(512 << 20)))  # uncompressed XML total
+    scan_zip_max_ratio: float = float(os.getenv("SCAN_ZIP_MAX_RATIO", "100"))  # per member
+    # Records per transaction when posting multi-receipt XML batches
+    scan_batch_size: int = int(os.getenv("SCAN_BATCH_SIZE", "50"))
+
+    # Content-addressed document store; "link" hardlinks sources when possible, "copy" always copies
+    document_store_dir: str = os.getenv("DOCUMENT_STORE_DIR", "documents")
+    document_store_mode: str = os.getenv("DOCUMENT_STORE_MODE", "link")
+
+    # Duplicate detection: same amount within ±N days and a similar vendor
+    duplicate_window_days: int = int(os.getenv("DUPLICATE_WINDOW_DAYS", "3"))
+    duplicate_vendor_min_score: float = float(os.getenv("DUPLICATE_VENDOR_MIN_SCORE", "0.5"))
+
+    # Bank/card sync
+    sync_interval_minutes: int = int(os.getenv("SYNC_INTERVAL_MINUTES", "0"))  # 0 disables the scheduled sync
+    sync_concurrency: int = int(os.getenv("SYNC_CONCURRENCY", "8"))
+    sync_page_size: int = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+    sync_timeout_seconds: float = float(os.getenv("SYNC_TIMEOUT_SECONDS", "30"))
+    sync_providers: Dict[str, str]
+    sync_provider_keys: Dict[str, str]
+
+    # Statement file import (全銀 / CSV / OFX); rows per classify + insert batch
+    statement_batch_size: int = int(os.getenv("STATEMENT_BATCH_SIZE", "2000"))
+    # 全銀 dates are 和暦 by spec; "western" for banks that emit YYMMDD in 西暦
+    zengin_date_era: str = os.getenv("ZENGIN_DATE_ERA", "wareki")
+
+    # Reconciliation (消込) matching
+    reconcile_date_tolerance_days: int = int(os.getenv("RECONCILE_DATE_TOLERANCE_DAYS", "5"))
+    reconcile_min_score: float = float(os.getenv("RECONCILE_MIN_SCORE", "0.3"))
+    reconcile_split_max_parts: int = int(os.getenv("RECONCILE_SPLIT_MAX_PARTS", "3"))
+
+    # Off-peak maintenance jobs (cache warming, aggregates, ANALYZE/VACUUM); hour < 0 disables the daily run
+    maintenance_hour: int = int(os.getenv("MAINTENANCE_HOUR", "4"))
+    maintenance_active_days: int = int(os.getenv("MAINTENANCE_ACTIVE_DAYS", "14"))
+    maintenance_history_days: int = int(os.getenv("MAINTENANCE_HISTORY_DAYS", "30"))
+    maintenance_vacuum_pages: int = int(os.getenv("MAINTENANCE_VACUUM_PAGES", "2000"))
+    maintenance_full_vacuum_max_mb: int = int(os.getenv("MAINTENANCE_FULL_VACUUM_MAX_MB", "200"))
+
+    # Fiscal years and archiving of closed years into read-only per-year files.
+    # ARCHIVE_KEEP_YEARS=2 keeps the current and previous fiscal year active; 0 disables automatic archiving.
+    fiscal_year_start_month: int = int(os.getenv("FISCAL_YEAR_START_MONTH", "4"))
+    archive_keep_years: int = int(os.getenv("ARCHIVE_KEEP_YEARS", "0"))
+    archive_mmap_bytes: int = int(os.getenv("ARCHIVE_MMAP_BYTES", str(256 << 20)))
+
+    # Online backups of clients/*.db and the master DB; hour < 0 disables the daily snapshot.
+    # BACKUP_IO_BYTES_PER_SEC is shared by all workers (0 = unthrottled).
+    backup_dir: str = os.getenv("BACKUP_DIR", "backups")
+    backup_hour: int = int(os.getenv("BACKUP_HOUR", "3"))
+    backup_keep: int = int(os.getenv("BACKUP_KEEP", "7"))
+    backup_workers: int = int(os.getenv("BACKUP_WORKERS", "2"))
+    backup_step_pages: int = int(os.getenv("BACKUP_STEP_PAGES", "256"))
+    backup_io_bytes_per_sec: int = int(os.getenv("BACKUP_IO_BYTES_PER_SEC", str(32 << 20)))
+    backup_compress_level: int = int(os.getenv("BACKUP_COMPRESS_LEVEL", "6"))
+
+    # One-off migration from the legacy single database (backend/models.py, kaikei.db)
+    legacy_database_url: str = os.getenv("LEGACY_DATABASE_URL", f"sqlite:///{(BASE_DIR / 'kaikei.db')}")
+    migration_batch_size: int = int(os.getenv("MIGRATION_BATCH_SIZE", "5000"))
+    migration_workers: int = int(os.getenv("MIGRATION_WORKERS", "4"))
+
+    # Key for /api/admin, /api/backups and /api/maintenance (X-Admin-Key); unset allows localhost only
+    admin_api_key: Optional[str] = os.getenv("ADMIN_API_KEY")
+
+    # Cross-tenant read-only queries for the admin dashboard
+    fanout_workers: int = int(os.getenv("FANOUT_WORKERS", "16"))
+    fanout_timeout_seconds: float = float(os.getenv("FANOUT_TIMEOUT_SECONDS", "1.0"))  # per tenant
+    fanout_deadline_seconds: float = float(os.getenv("FANOUT_DEADLINE_SECONDS", "3.0"))  # whole fan-out
+    fanout_cache_seconds: float = float(os.getenv("FANOUT_CACHE_SECONDS", "30"))
+    revenue_accounts: List[str]
+
+    # HTTP response compression (gzip, or brotli when installed); < 0 disables
+    compression_min_bytes: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+    compression_gzip_level: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    compression_brotli_quality: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    # Idempotency-Key on POST/PATCH: how long a stored response is replayed, and after how long
+    # an unfinished first request (e.g. a crashed worker) no longer blocks retries
+    idempotency_ttl_hours: float = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+    idempotency_pending_seconds: float = float(os.getenv("IDEMPOTENCY_PENDING_SECONDS", "300"))
+
+    # Server-sent journal events (GET /api/journal/events)
+    journal_events_poll_seconds: float = float(os.getenv("JOURNAL_EVENTS_POLL_SECONDS", "1.0"))
+    journal_events_keepalive_seconds: float = float(os.getenv("JOURNAL_EVENTS_KEEPALIVE_SECONDS", "15"))
+    journal_events_keep_hours: float = float(os.getenv("JOURNAL_EVENTS_KEEP_HOURS", "24"))
+    journal_events_batch: int = int(os.getenv("JOURNAL_EVENTS_BATCH", "500"))
+    journal_events_queue_size: int = int(os.getenv("JOURNAL_EVENTS_QUEUE_SIZE", "2000"))  # per subscriber
 
     # Clients
     clients: List[str]
     scansnap_folders: Dict[str, str]
 
     def __init__(self) -> None:
+        # Account names counted as revenue besides accounts typed "revenue"/"収益"
+        self.revenue_accounts = [a.strip() for a in os.getenv("REVENUE_ACCOUNTS", "売上高").split(",") if a.strip()]
         raw = os.getenv("CLIENTS", "").strip()
         self.clients = [c.strip() for c in raw.split(",") if c.strip()] if raw else []
         folders: Dict[str, str] = {}
@@ -45,6 +169,23 @@ class Settings:
         if single and not folders:
             folders["default"] = single
         self.scansnap_folders = folders
+        # INGEST_TENANT_WEIGHTS=A001:3,B002:1
+        weights: Dict[str, int] = {}
+        for pair in os.getenv("INGEST_TENANT_WEIGHTS", "").split(","):
+            code, _, weight = pair.partition(":")
+            if code.strip() and weight.strip().isdigit():
+                weights[code.strip()] = int(weight)
+        self.ingest_tenant_weights = weights
+        # SYNC_PROVIDERS=mizuho=https://...,card=https://... ; key per provider in SYNC_API_KEY_<NAME>
+        providers: Dict[str, str] = {}
+        for pair in os.getenv("SYNC_PROVIDERS", "").split(","):
+            name, _, url = pair.partition("=")
+            if name.strip() and url.strip():
+                providers[name.strip()] = url.strip()
+        self.sync_providers = providers
+        self.sync_provider_keys = {
+            name: key for name in providers if (key := os.getenv(f"SYNC_API_KEY_{name.upper()}"))
+        }
 
 
 settings = Settings()
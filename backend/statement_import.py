@@ -0,0 +1,382 @@
+"""Streaming import of downloaded bank statement files into the review staging table.
+
+Supported formats:
+
+* ``zengin`` – 全銀協 入出金取引明細, 200-byte fixed-width Shift_JIS records
+* ``csv``    – common Japanese bank CSV layouts, located by their header row
+* ``ofx``    – OFX 1.x (SGML) and 2.x (XML)
+
+Files are read record by record and staged in batches of
+``statement_batch_size`` rows, each batch classified in one pass through the
+tenant's vendor classifier and written with a single executemany insert.
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import itertools
+import re
+from datetime import date as _date, datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy import insert
+
+from .archive import archived_year_for
+from .db_manager import get_session_for_client
+from .duplicate_index import get_duplicate_index, invalidate_duplicate_index
+from .ingest_ledger import file_sha256
+from .models_bank import StagedTransaction, StatementImport
+from .models_journal import JournalEntry
+from .settings import settings
+from .txn_classifier import get_vendor_classifier, invalidate_vendor_classifier
+
+
+CHUNK_SIZE = 1 << 16
+FORMATS = ("zengin", "csv", "ofx")
+
+Row = Dict[str, Any]
+
+
+class StatementFormatError(ValueError):
+    pass
+
+
+class ArchivedPeriodError(ValueError):
+    """Staged rows fall into an archived (read-only) fiscal year."""
+
+
+# ---------------------------------------------------------------- helpers
+
+_DATE_RE = re.compile(r"(\d{4})\s*[/\-.年]\s*(\d{1,2})\s*[/\-.月]\s*(\d{1,2})")
+_ERA_DATE_RE = re.compile(r"(R|H|令和|平成)\s*(\d{1,2})\s*[/\-.年]\s*(\d{1,2})\s*[/\-.月]\s*(\d{1,2})")
+_ERA_BASE = {"R": 2018, "令和": 2018, "H": 1988, "平成": 1988}
+
+
+def parse_date(text: str | None) -> Optional[_date]:
+    s = (text or "").strip()
+    if not s:
+        return None
+    m = _DATE_RE.search(s)
+    if m:
+        return _date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    m = _ERA_DATE_RE.search(s)
+    if m:
+        return _date(_ERA_BASE[m.group(1)] + int(m.group(2)), int(m.group(3)), int(m.group(4)))
+    if len(s) >= 8 and s[:8].isdigit():
+        return _date(int(s[:4]), int(s[4:6]), int(s[6:8]))
+    raise ValueError(f"Unrecognized date: {text!r}")
+
+
+def parse_amount(text: str | None) -> float:
+    s = (text or "").strip()
+    for ch in (",", "円", "¥", "￥", "\\", " ", "　", '"'):
+        s = s.replace(ch, "")
+    if not s or s in {"-", "*"}:
+        return 0.0
+    negative = s[0] in "-△▲" or (s.startswith("(") and s.endswith(")"))
+    s = s.strip("-△▲()+")
+    value = float(s) if s else 0.0
+    return -value if negative else value
+
+
+def _sniff_encoding(head: bytes) -> str:
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp932"
+
+
+def detect_format(head: bytes) -> str:
+    stripped = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if stripped.upper().startswith(b"OFXHEADER") or b"<OFX>" in head.upper():
+        return "ofx"
+    first = head.split(b"\n", 1)[0].rstrip(b"\r")
+    if head[:1] == b"1" and (len(first) == 200 or (b"\n" not in head and len(head) >= 200)):
+        return "zengin"
+    return "csv"
+
+
+def _text(f: BinaryIO, head: bytes) -> TextIO:
+    f.seek(0)
+    return io.TextIOWrapper(f, encoding=_sniff_encoding(head), errors="replace", newline="")
+
+
+# ---------------------------------------------------------------- 全銀
+
+# 入出金取引明細 data record (データ区分 "2"), 0-based byte slices
+_ZENGIN_FIELDS = {
+    "date": (9, 15),        # 勘定日 YYMMDD
+    "io": (21, 22),         # 入払区分 1=入金 2=出金
+    "amount": (24, 36),     # 取引金額
+    "payer": (81, 129),     # 振込依頼人名又は契約者番号
+    "memo": (159, 179),     # 摘要内容
+}
+
+
+def _zengin_records(f: BinaryIO) -> Iterator[bytes]:
+    buf = b""
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        buf = (buf + chunk).lstrip(b"\r\n")
+        while len(buf) >= 200:
+            yield buf[:200]
+            buf = buf[200:].lstrip(b"\r\n")
+        if not chunk:
+            if buf.strip(b"\r\n\x1a "):
+                raise StatementFormatError("Truncated 全銀 record")
+            return
+
+
+def _zengin_date(yymmdd: str) -> _date:
+    yy, mm, dd = int(yymmdd[:2]), int(yymmdd[2:4]), int(yymmdd[4:6])
+    if settings.zengin_date_era == "western":
+        return _date(2000 + yy, mm, dd)
+    # The 全銀 format dates are 和暦; files from before 令和 carry 平成 years > 30
+    return _date((1988 if yy > 30 else 2018) + yy, mm, dd)
+
+
+def iter_zengin(f: BinaryIO) -> Iterator[Row]:
+    for line_no, rec in enumerate(_zengin_records(f), start=1):
+        if rec[:1] != b"2":
+            continue  # header / trailer / end records
+        field = {k: rec[a:b].decode("cp932", errors="replace").strip() for k, (a, b) in _ZENGIN_FIELDS.items()}
+        amount = parse_amount(field["amount"])
+        yield {
+            "line_no": line_no,
+            "date": _zengin_date(field["date"]),
+            "amount": -amount if field["io"] == "2" else amount,
+            "description": field["payer"] or field["memo"],
+            "balance": None,
+        }
+
+
+# ---------------------------------------------------------------- CSV
+
+_CSV_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "date": ("取引日", "お取引日", "勘定日", "年月日", "日付", "お取扱日", "利用日", "ご利用日"),
+    "description": ("摘要", "お取引内容", "取引内容", "お取り扱い内容", "内容", "ご利用先", "利用店名", "備考"),
+    "withdrawal": ("お引出し", "お引出金額", "出金金額", "出金", "お支払金額", "支払金額", "引出額", "お支払"),
+    "deposit": ("お預入れ", "お預入金額", "入金金額", "入金", "お預り金額", "預入額", "お預入"),
+    "amount": ("取引金額", "ご利用金額", "利用金額", "金額"),
+    "balance": ("差引残高", "残高"),
+}
+_HEADER_SCAN_ROWS = 30
+_HEADER_NOISE_RE = re.compile(r"[\s()（）円\[\]「」]")
+
+
+def _csv_header(row: List[str]) -> Optional[Dict[str, int]]:
+    cells = [_HEADER_NOISE_RE.sub("", c) for c in row]
+    found: Dict[str, int] = {}
+    for key, aliases in _CSV_COLUMNS.items():
+        for alias in aliases:
+            idx = next((i for i, c in enumerate(cells) if alias in c and i not in found.values()), None)
+            if idx is not None:
+                found[key] = idx
+                break
+    if "date" in found and ("amount" in found or "withdrawal" in found or "deposit" in found):
+        return found
+    return None
+
+
+def iter_csv(f: TextIO) -> Iterator[Row]:
+    reader = csv.reader(f)
+    columns: Optional[Dict[str, int]] = None
+    for row in itertools.islice(reader, _HEADER_SCAN_ROWS):
+        columns = _csv_header(row)
+        if columns:
+            break
+    if not columns:
+        raise StatementFormatError("No recognizable header row in CSV")
+
+    def cell(row: List[str], key: str) -> str:
+        idx = columns.get(key)
+        return row[idx] if idx is not None and idx < len(row) else ""
+
+    for row in reader:
+        if not any(c.strip() for c in row):
+            continue
+        try:
+            day = parse_date(cell(row, "date"))
+        except ValueError:
+            continue  # subtotal / footer lines
+        if day is None:
+            continue
+        if "amount" in columns:
+            amount = parse_amount(cell(row, "amount"))
+        else:
+            amount = parse_amount(cell(row, "deposit")) - parse_amount(cell(row, "withdrawal"))
+        balance = cell(row, "balance")
+        yield {
+            "line_no": reader.line_num,
+            "date": day,
+            "amount": amount,
+            "description": cell(row, "description").strip(),
+            "balance": parse_amount(balance) if balance.strip() else None,
+        }
+
+
+# ---------------------------------------------------------------- OFX
+
+_OFX_TAG_RE = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def _ofx_tokens(f: TextIO) -> Iterator[Tuple[bool, str, str]]:
+    buf = ""
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        buf += chunk
+        # Only consume up to the last '<' so a tag split across chunks is kept whole
+        cut = buf.rfind("<") if chunk else len(buf)
+        if cut > 0:
+            for m in _OFX_TAG_RE.finditer(buf, 0, cut):
+                yield m.group(1) == "/", m.group(2).upper(), m.group(3).strip()
+            buf = buf[cut:]
+        if not chunk:
+            return
+
+
+def iter_ofx(f: TextIO) -> Iterator[Row]:
+    current: Optional[Dict[str, str]] = None
+    line_no = 0
+
+    def emit(t: Dict[str, str]) -> Row:
+        name, memo = t.get("NAME", ""), t.get("MEMO", "")
+        return {
+            "line_no": line_no,
+            "date": parse_date(t.get("DTPOSTED", "")[:8]),
+            "amount": parse_amount(t.get("TRNAMT")),
+            "description": name if not memo or memo in name else (f"{name} {memo}".strip()),
+            "balance": None,
+        }
+
+    for closing, tag, value in _ofx_tokens(f):
+        if tag == "STMTTRN":
+            # OFX 1.x may omit closing tags, so a new opening also ends the previous one
+            if current is not None:
+                yield emit(current)
+            current = None if closing else {}
+            if not closing:
+                line_no += 1
+        elif current is not None:
+            if closing and tag == "BANKTRANLIST":
+                yield emit(current)
+                current = None
+            elif not closing and value:
+                current[tag] = value
+    if current is not None:
+        yield emit(current)
+
+
+# ---------------------------------------------------------------- import
+
+def iter_statement(f: BinaryIO, fmt: Optional[str] = None) -> Iterator[Row]:
+    head = f.read(CHUNK_SIZE)
+    fmt = fmt or detect_format(head)
+    if fmt == "zengin":
+        f.seek(0)
+        return iter_zengin(f)
+    if fmt == "ofx":
+        return iter_ofx(_text(f, head))
+    if fmt == "csv":
+        return iter_csv(_text(f, head))
+    raise StatementFormatError(f"Unknown statement format: {fmt}")
+
+
+def import_statement(client_code: str, path: Path, filename: Optional[str] = None, fmt: Optional[str] = None) -> Dict[str, Any]:
+    """Stage every row of a statement file. Re-importing the same file is a no-op."""
+    sha256 = file_sha256(path)
+    db = get_session_for_client(client_code)
+    try:
+        existing = db.query(StatementImport).filter(StatementImport.sha256 == sha256).first()
+        if existing is not None:
+            return {"import_id": existing.id, "format": existing.format, "rows": existing.row_count, "duplicate": True}
+        with open(path, "rb") as f:
+            fmt = fmt or detect_format(f.read(CHUNK_SIZE))
+            f.seek(0)
+            record = StatementImport(filename=filename or path.name, format=fmt, sha256=sha256,
+                                     row_count=0, created_at=datetime.utcnow())
+            db.add(record)
+            db.flush()
+            classifier = get_vendor_classifier(client_code)
+            rows = iter_statement(f, fmt)
+            count = 0
+            while True:
+                batch = list(itertools.islice(rows, settings.statement_batch_size))
+                if not batch:
+                    break
+                pairs = classifier.classify_many(r["description"] for r in batch)
+                db.execute(insert(StagedTransaction), [
+                    {**r, "import_id": record.id, "status": "pending",
+                     "debit_account": p[0] if p else None, "credit_account": p[1] if p else None}
+                    for r, p in zip(batch, pairs)
+                ])
+                count += len(batch)
+            record.row_count = count
+        db.commit()
+        return {"import_id": record.id, "format": fmt, "rows": count, "duplicate": False}
+    except (UnicodeDecodeError, ValueError) as exc:
+        db.rollback()
+        if isinstance(exc, StatementFormatError):
+            raise
+        raise StatementFormatError(str(exc)) from exc
+    finally:
+        db.close()
+
+
+def post_staged(client_code: str, import_id: int, allow_duplicates: bool = False) -> Dict[str, Any]:
+    """Post pending rows that have both accounts to the journal.
+
+    Rows matching an existing entry in the duplicate index (e.g. a scanned
+    receipt for the same payment) stay pending and are reported with
+    ``duplicate_of`` unless ``allow_duplicates`` is set. Nothing is posted when
+    a row falls into an archived fiscal year.
+    """
+    index = get_duplicate_index(client_code)
+    db = get_session_for_client(client_code)
+    posted = skipped = 0
+    duplicates: List[Dict[str, Any]] = []
+    try:
+        rows = (
+            db.query(StagedTransaction)
+            .filter(StagedTransaction.import_id == import_id, StagedTransaction.status == "pending")
+            .order_by(StagedTransaction.id)
+            .all()
+        )
+        ready = [r for r in rows if r.debit_account and r.credit_account and r.date]
+        skipped = len(rows) - len(ready)
+        archived = {y for y in (archived_year_for(client_code, d) for d in {r.date for r in ready}) if y is not None}
+        if archived:
+            years = ", ".join(str(y) for y in sorted(archived))
+            raise ArchivedPeriodError(f"Fiscal year {years} is archived and read-only")
+        for row in ready:
+            amount = abs(row.amount or 0.0)
+            dup = index.find(row.date, amount, row.description)
+            if dup and not allow_duplicates:
+                duplicates.append({"row_id": row.id, "duplicate_of": dup})
+                continue
+            entry = JournalEntry(date=row.date, summary=row.description, amount=amount,
+                                 debit_account=row.debit_account, credit_account=row.credit_account,
+                                 confidence=1.0, reviewed=True, client_id=None)
+            db.add(entry)
+            db.flush()
+            # Visible to the rest of the import so repeated lines are caught too
+            index.add(entry.id, entry.date, entry.amount, entry.summary)
+            row.status = "posted"
+            row.journal_entry_id = entry.id
+            posted += 1
+        db.commit()
+    except ArchivedPeriodError:
+        raise
+    except Exception:
+        invalidate_duplicate_index(client_code)
+        raise
+    finally:
+        db.close()
+    if posted:
+        invalidate_vendor_classifier(client_code)
+    return {"posted": posted, "skipped": skipped, "duplicates": duplicates}
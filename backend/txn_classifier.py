@@ -0,0 +1,88 @@
+"""History-based account suggestions for bank/card/statement lines.
+
+For each tenant the posted journal is folded into a map from normalized
+vendor to its most frequent (debit, credit) pair. Classifying a line is then
+a few dict lookups, with no per-row query and no LLM call.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .db_manager import get_session_for_client
+from .duplicate_index import vendor_key
+from .models_journal import JournalEntry
+
+
+# Prefixes banks put in front of the counterparty name
+_BANK_PREFIX_RE = re.compile(r"^(振込|振替|口座振替|カード|デビット|visa|atm|ib|フリコミ|入金|出金|引落)+")
+
+Pair = Tuple[str, str]
+
+
+def description_key(text: str | None) -> str:
+    return _BANK_PREFIX_RE.sub("", vendor_key(text))
+
+
+class VendorClassifier:
+    MAX_PREFIX = 40
+
+    def __init__(self, history: Iterable[Tuple[Optional[str], Optional[str], Optional[str]]]) -> None:
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        for summary, debit, credit in history:
+            key = description_key(summary)
+            if key and debit and credit:
+                counts[key][(debit, credit)] += 1
+        self._map: Dict[str, Pair] = {k: c.most_common(1)[0][0] for k, c in counts.items()}
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def classify(self, description: str | None) -> Optional[Pair]:
+        key = description_key(description)
+        if not key:
+            return None
+        pair = self._map.get(key)
+        if pair is not None:
+            return pair
+        # Longest known vendor that prefixes the description ("ヤマダデンキ新宿店" -> "ヤマダデンキ")
+        for n in range(min(len(key) - 1, self.MAX_PREFIX), 1, -1):
+            pair = self._map.get(key[:n])
+            if pair is not None:
+                return pair
+        return None
+
+    def classify_many(self, descriptions: Iterable[str | None]) -> List[Optional[Pair]]:
+        memo: Dict[Optional[str], Optional[Pair]] = {}
+        out: List[Optional[Pair]] = []
+        for d in descriptions:
+            if d not in memo:
+                memo[d] = self.classify(d)
+            out.append(memo[d])
+        return out
+
+
+_classifiers: Dict[str, VendorClassifier] = {}
+_lock = threading.Lock()
+
+
+def get_vendor_classifier(client_code: str) -> VendorClassifier:
+    with _lock:
+        classifier = _classifiers.get(client_code)
+    if classifier is not None:
+        return classifier
+    db = get_session_for_client(client_code)
+    try:
+        rows = db.query(JournalEntry.summary, JournalEntry.debit_account, JournalEntry.credit_account).yield_per(1000)
+        classifier = VendorClassifier(rows)
+    finally:
+        db.close()
+    with _lock:
+        return _classifiers.setdefault(client_code, classifier)
+
+
+def invalidate_vendor_classifier(client_code: str) -> None:
+    with _lock:
+        _classifiers.pop(client_code, None)
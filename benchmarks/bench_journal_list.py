@@ -0,0 +1,106 @@
+"""Compare the ORM + pydantic journal list path with the read-model path.
+
+Builds a throwaway tenant with ``--rows`` entries and, for each path, runs
+the full list request through FastAPI's test client ``--requests`` times,
+reporting requests/sec and the peak memory traced during one request::
+
+    python -m benchmarks.bench_journal_list --rows 10000 --requests 20
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import List
+
+from fastapi import Header
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+
+
+def _seed(rows: int) -> None:
+    from backend import db_manager
+    from backend.models_base import Base
+    from backend.models_client import Client
+    from backend.models_journal import JournalEntry
+
+    master = create_engine("sqlite:///master.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    db_manager._master_engine = master
+    with db_manager.get_master_session() as s:
+        s.add(Client(name="Bench", code="BENCH", api_key="bench"))
+        s.commit()
+    start = date(2025, 4, 1)
+    with db_manager.get_engine_for_client("BENCH").begin() as conn:
+        conn.execute(insert(JournalEntry), [
+            {"date": start + timedelta(days=i % 365), "summary": f"アマゾン 注文 {i}", "amount": 1000 + i % 997,
+             "debit_account": "消耗品費", "credit_account": "未払金", "confidence": 0.8, "ai_reason": "過去の仕訳と一致",
+             "reviewed": i % 3 == 0, "tax_type": "課税仕入10%"}
+            for i in range(rows)
+        ])
+
+
+def _orm_route(app) -> None:
+    """The list endpoint as it was: full ORM objects, one pydantic model per row."""
+    from backend.api.journal import JournalRead
+    from backend.db_manager import get_client_by_key, get_session_for_client
+    from backend.models_journal import JournalEntry
+
+    @app.get("/bench/orm", response_model=List[JournalRead])
+    def orm_list(x_client_key: str = Header(...)):
+        client = get_client_by_key(x_client_key)
+        db = get_session_for_client(client.code)
+        try:
+            return [
+                JournalRead(id=r.id, date=r.date, summary=r.summary, amount=r.amount, debit_account=r.debit_account,
+                            credit_account=r.credit_account, confidence=r.confidence, ai_reason=r.ai_reason,
+                            reviewed=bool(r.reviewed), pdf_path=r.pdf_path, document_sha256=r.document_sha256,
+                            tax_type=r.tax_type)
+                for r in db.query(JournalEntry).order_by(JournalEntry.id.desc()).all()
+            ]
+        finally:
+            db.close()
+
+
+def _measure(client: TestClient, url: str, requests: int):
+    headers = {"X-Client-Key": "bench"}
+    size = len(client.get(url, headers=headers).content)  # warm-up
+    tracemalloc.start()
+    client.get(url, headers=headers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    t0 = time.perf_counter()
+    for _ in range(requests):
+        client.get(url, headers=headers)
+    return requests / (time.perf_counter() - t0), peak, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        _seed(args.rows)
+        from backend.main import app
+
+        _orm_route(app)
+        client = TestClient(app)
+        print(f"{args.rows} rows, {args.requests} requests per path")
+        print(f"{'path':<12}{'req/s':>10}{'peak MiB':>12}{'bytes':>12}")
+        results = {}
+        for name, url in (("orm", "/bench/orm"), ("read-model", "/api/journal/")):
+            rps, peak, size = results[name] = _measure(client, url, args.requests)
+            print(f"{name:<12}{rps:>10.1f}{peak / (1 << 20):>12.1f}{size:>12}")
+        speedup = results["read-model"][0] / results["orm"][0]
+        memory = results["orm"][1] / max(results["read-model"][1], 1)
+        print(f"read-model: {speedup:.1f}x requests/sec, {memory:.1f}x less peak memory")
+
+
+if __name__ == "__main__":
+    main()
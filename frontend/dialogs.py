@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import time
+import uuid
+
 import requests
-from PyQt6.QtWidgets import QDialog, QLabel, QPushButton, QVBoxLayout, QLineEdit, QTextEdit
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt6.QtWidgets import QDialog, QLabel, QMessageBox, QPushButton, QVBoxLayout, QLineEdit, QTextEdit
 from PyQt6.QtPdf import QPdfDocument
 from PyQt6.QtPdfWidgets import QPdfView
 
@@ -12,15 +16,19 @@ class CorrectionDialog(QDialog):
         self.api_base_url = api_base_url.rstrip("/")
         self.client_key = client_key
         self.entry = entry
+        # One key per dialog: pressing save again after a lost response does not record the correction twice
+        self.idempotency_key = uuid.uuid4().hex
         self.setWindowTitle("仕訳修正")
         layout = QVBoxLayout(self)
 
         # PDFビュー
         self.pdf_doc = QPdfDocument()
         self.pdf_view = QPdfView()
-        pdf_path = entry.get("pdf_path") or ""
-        if pdf_path:
-            self.pdf_doc.load(pdf_path)
+        self._pdf_buffer: QBuffer | None = None
+        if entry.get("document_sha256"):
+            self._load_remote_document(entry["document_sha256"])
+        elif entry.get("pdf_path"):
+            self.pdf_doc.load(entry["pdf_path"])
         self.pdf_view.setDocument(self.pdf_doc)
         layout.addWidget(self.pdf_view)
 
@@ -40,6 +48,21 @@ class CorrectionDialog(QDialog):
 
         self.save_btn.clicked.connect(self.on_save)
 
+    def _load_remote_document(self, sha256: str) -> None:
+        headers = {"X-Client-Key": self.client_key} if self.client_key else {}
+        try:
+            r = requests.get(f"{self.api_base_url}/api/documents/{sha256}", headers=headers, timeout=30)
+            r.raise_for_status()
+        except requests.RequestException:
+            return
+        if not r.headers.get("Content-Type", "").startswith("application/pdf"):
+            return
+        # QPdfDocument reads lazily from the device, so the buffer must outlive this call
+        self._pdf_buffer = QBuffer()
+        self._pdf_buffer.setData(QByteArray(r.content))
+        self._pdf_buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        self.pdf_doc.load(self._pdf_buffer)
+
     def on_save(self):
         payload = {
             "entry_id": self.entry.get("id"),
@@ -48,6 +71,22 @@ class CorrectionDialog(QDialog):
             "reason": self.reason_box.toPlainText(),
         }
         headers = {"X-Client-Key": self.client_key} if self.client_key else {}
-        requests.post(f"{self.api_base_url}/api/journal/correct", json=payload, headers=headers, timeout=10)
-        self.accept()
+        headers["Idempotency-Key"] = self.idempotency_key
+        for attempt in range(3):
+            try:
+                r = requests.post(f"{self.api_base_url}/api/journal/correct", json=payload, headers=headers, timeout=10)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                error = str(exc)
+                time.sleep(0.5 * (attempt + 1))
+                continue
+            if r.status_code == 409 and "Retry-After" in r.headers:
+                error = "前回の保存を処理中です"
+                time.sleep(float(r.headers["Retry-After"]))
+                continue
+            if r.ok:
+                self.accept()
+                return
+            error = f"HTTP {r.status_code}: {r.text[:200]}"
+            break
+        QMessageBox.critical(self, "エラー", f"修正の保存に失敗しました: {error}")
 
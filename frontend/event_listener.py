@@ -0,0 +1,57 @@
+"""Subscription to ``GET /api/journal/events`` for the desktop window, run on its async worker."""
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Callable
+
+import httpx
+
+from utils.sse import EventParser
+
+CONNECTED = "connected"
+DELTA = "delta"
+RESET = "reset"
+
+
+class JournalEventListener:
+    """Reports ``(kind, payload)`` for each event; reconnects with ``Last-Event-ID`` so nothing is missed.
+
+    Runs until its task is cancelled, sharing the window's pooled HTTP client.
+    """
+
+    def __init__(self, http: httpx.AsyncClient, api_base_url: str, client_key: str) -> None:
+        self.http = http
+        self.url = f"{api_base_url.rstrip('/')}/api/journal/events"
+        self.client_key = client_key
+        self.last_event_id: str | None = None
+        self.retry_seconds = 3.0
+
+    async def run(self, report: Callable[[Any], None]) -> None:
+        # The server sends a keep-alive comment every 15 s, so a silent minute means a dead connection
+        timeout = httpx.Timeout(10.0, read=60.0)
+        while True:
+            headers = {"X-Client-Key": self.client_key, "Accept": "text/event-stream"}
+            if self.last_event_id:
+                headers["Last-Event-ID"] = self.last_event_id
+            try:
+                async with self.http.stream("GET", self.url, headers=headers, timeout=timeout) as r:
+                    r.raise_for_status()
+                    report((CONNECTED, None))
+                    parser = EventParser()
+                    async for line in r.aiter_lines():
+                        ev = parser.feed(line)
+                        if ev is None:
+                            continue
+                        if ev.retry is not None:
+                            self.retry_seconds = ev.retry / 1000
+                        if ev.event == "reset":
+                            self.last_event_id = None
+                            report((RESET, None))
+                        elif ev.event == "journal":
+                            report((DELTA, json.loads(ev.data)))
+                        if ev.id:
+                            self.last_event_id = ev.id
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(self.retry_seconds)
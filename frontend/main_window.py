@@ -12,6 +12,10 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from utils import wire_format
+from utils.async_worker import AsyncTask, AsyncWorker
+
+from .event_listener import CONNECTED, DELTA, RESET, JournalEventListener
 from .widgets.journal_table import JournalTable
 
 
@@ -23,6 +27,13 @@ class MainWindow(QMainWindow):
         self.resize(1200, 800)
 
         self.client_key: str | None = None
+        self.journal_cache = wire_format.ETagCache()
+        # One background loop and one pooled HTTP client for the reloads and the event stream
+        self.worker = AsyncWorker(self)
+        self._http: httpx.AsyncClient | None = None
+        self.listener: JournalEventListener | None = None
+        self._listen_task: AsyncTask | None = None
+        self._reload_task: AsyncTask | None = None
 
         self.table = JournalTable()
         self.stacked = QStackedWidget()
@@ -44,24 +55,76 @@ class MainWindow(QMainWindow):
         self.key_edit = QLineEdit()
         self.key_edit.setPlaceholderText("X-Client-Key")
         self.key_edit.textChanged.connect(self._on_key)
+        self.key_edit.editingFinished.connect(self._subscribe)
         tb.addWidget(self.key_edit)
 
     def _create_statusbar(self) -> None:
-        self.statusBar().addWidget(QLabel("Ready"))
+        self.status_label = QLabel("Ready")
+        self.statusBar().addWidget(self.status_label)
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        # Only used from coroutines on the worker loop
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=10.0, limits=httpx.Limits(max_connections=4))
+        return self._http
+
+    async def _close_http(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
     def _on_key(self, text: str) -> None:
         self.client_key = text.strip() or None
 
+    def _subscribe(self) -> None:
+        """Follow the tenant's journal events; each (re)connect revalidates the list first."""
+        if self.listener is not None and self.listener.client_key == self.client_key:
+            return
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            self._listen_task = self.listener = None
+        if not self.client_key:
+            return
+        listener = self.listener = JournalEventListener(self.http, self.api_base_url, self.client_key)
+        self._listen_task = self.worker.run(listener.run, on_progress=self._on_event)
+
+    def _on_event(self, event) -> None:
+        kind, payload = event
+        if kind == DELTA:
+            self.table.apply_delta(payload)
+        elif kind in (CONNECTED, RESET):
+            self.reload_journals()
+
     def reload_journals(self) -> None:
-        headers = {"X-Client-Key": self.client_key} if self.client_key else {}
-        try:
-            with httpx.Client() as cli:
-                r = cli.get(f"{self.api_base_url}/api/journal/", headers=headers, timeout=10)
-                r.raise_for_status()
-                rows = r.json()
-                self.table.load_rows(rows)
-        except Exception:
-            pass
+        # A newer reload supersedes one still in flight
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+        url = f"{self.api_base_url}/api/journal/"
+        client_key = self.client_key
+        headers = {"X-Client-Key": client_key} if client_key else {}
+        headers["Accept"] = wire_format.ACCEPT
+
+        async def fetch(report):
+            r = await self.http.get(url, headers={**headers, **self.journal_cache.headers(url, client_key)})
+            return self.journal_cache.resolve(url, client_key, r)
+
+        self.status_label.setText("読込中…")
+        self._reload_task = self.worker.run(fetch, on_done=self._on_reloaded, on_error=self._on_reload_failed)
+
+    def _on_reloaded(self, rows) -> None:
+        self._reload_task = None
+        self.table.load_rows(rows)
+        self.status_label.setText(f"{len(rows)}件")
+
+    def _on_reload_failed(self, exc: BaseException) -> None:
+        self._reload_task = None
+        self.status_label.setText(f"読込失敗: {exc}")
+
+    def closeEvent(self, event) -> None:
+        # Cancels the event stream and any reload, closes the HTTP client and stops the loop
+        self.worker.shutdown(cleanup=self._close_http)
+        super().closeEvent(event)
 
 
 def create_main_window(api_base_url: str = "http://127.0.0.1:8000") -> QWidget:
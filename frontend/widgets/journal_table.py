@@ -12,17 +12,41 @@ class JournalTable(QTableWidget):
         super().__init__(0, len(self.HEADERS))
         self.setHorizontalHeaderLabels(self.HEADERS)
         self.verticalHeader().setVisible(False)
+        # entry id → first-column item; item.row() follows inserts and removals
+        self._items: Dict[int, QTableWidgetItem] = {}
+
+    def _fill(self, i: int, r: Dict[str, Any]) -> None:
+        first = QTableWidgetItem(str(r.get("date", "")))
+        self.setItem(i, 0, first)
+        self.setItem(i, 1, QTableWidgetItem(str(r.get("summary", ""))))
+        self.setItem(i, 2, QTableWidgetItem(str(r.get("amount", ""))))
+        self.setItem(i, 3, QTableWidgetItem(str(r.get("debit_account", ""))))
+        self.setItem(i, 4, QTableWidgetItem(str(r.get("credit_account", ""))))
+        self.setItem(i, 5, QTableWidgetItem(str(r.get("confidence", ""))))
+        self.setItem(i, 6, QTableWidgetItem("済" if r.get("reviewed") else "要確認"))
+        if r.get("id") is not None:
+            self._items[r["id"]] = first
 
     def load_rows(self, rows: List[Dict[str, Any]]) -> None:
         self.setRowCount(0)
+        self._items.clear()
         for r in rows:
             i = self.rowCount()
             self.insertRow(i)
-            self.setItem(i, 0, QTableWidgetItem(str(r.get("date", ""))))
-            self.setItem(i, 1, QTableWidgetItem(str(r.get("summary", ""))))
-            self.setItem(i, 2, QTableWidgetItem(str(r.get("amount", ""))))
-            self.setItem(i, 3, QTableWidgetItem(str(r.get("debit_account", ""))))
-            self.setItem(i, 4, QTableWidgetItem(str(r.get("credit_account", ""))))
-            self.setItem(i, 5, QTableWidgetItem(str(r.get("confidence", ""))))
-            self.setItem(i, 6, QTableWidgetItem("済" if r.get("reviewed") else "要確認"))
+            self._fill(i, r)
 
+    def apply_delta(self, delta: Dict[str, Any]) -> None:
+        """Apply one event from ``/api/journal/events`` without reloading the table."""
+        entry_id, entry = delta.get("entry_id"), delta.get("entry")
+        item = self._items.get(entry_id)
+        if entry is None:
+            if item is not None:
+                self.removeRow(item.row())
+                del self._items[entry_id]
+            return
+        if item is not None:
+            self._fill(item.row(), entry)
+        else:
+            # Newest first, as listed by the API
+            self.insertRow(0)
+            self._fill(0, entry)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from backend import account_resolver
+from backend.account_resolver import AccountResolver, get_resolver, invalidate_resolver, normalize_name
+
+
+ROWS = [
+    (1, "101", "現金", None),
+    (2, "131", "普通預金", None),
+    (3, "601", "旅費交通費", None),
+    (4, "602", "接待交際費", None),
+    (5, "603", "消耗品費", "文房具"),
+]
+
+
+def test_exact_and_normalized():
+    r = AccountResolver(ROWS)
+    assert r.resolve("現金").method == "exact"
+    m = r.resolve("旅費交通費 ")
+    assert m.account_id == 3 and m.method == "normalized"
+    assert normalize_name("（旅費交通費）") == "旅費交通費"
+
+
+def test_code_alias_and_ngram():
+    r = AccountResolver(ROWS)
+    assert r.resolve("601").account_id == 3
+    assert r.resolve("601 旅費交通費").account_id == 3
+    m = r.resolve("交通費")
+    assert m.account_id == 3 and m.method == "alias"
+    assert r.resolve("文房具").account_id == 5
+    m = r.resolve("旅費交通")
+    assert m.account_id == 3 and m.method == "ngram" and 0.6 <= m.score < 1.0
+
+
+def test_unknown_name_is_rejected():
+    r = AccountResolver(ROWS)
+    assert r.resolve("減価償却費") is None
+    assert r.resolve("") is None
+    assert AccountResolver([]).resolve("現金") is None
+
+
+def test_build_racing_an_invalidation_is_not_cached(monkeypatch):
+    monkeypatch.setattr(account_resolver, "_resolvers", {})
+    rows = list(ROWS)
+
+    def stale_loader():
+        # The chart changes while this build is still reading the old rows
+        snapshot = list(rows)
+        rows.append((6, "604", "通信費", None))
+        invalidate_resolver("R001")
+        return snapshot
+
+    assert get_resolver("R001", stale_loader).resolve("通信費") is None
+    fresh = get_resolver("R001", lambda: rows)
+    assert fresh.resolve("通信費").account_id == 6
+    assert get_resolver("R001", lambda: []) is fresh
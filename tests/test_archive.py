@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from backend import db_manager, duplicate_index
+from backend.archive import ArchiveError, archive_closed_years, archive_fiscal_year, query_entries
+from backend.main import app
+from backend.models_base import Base
+from backend.models_client import Client
+from backend.models_journal import CorrectionHistory, JournalEntry
+
+
+@pytest.fixture(autouse=True)
+def tenant(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    master = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    monkeypatch.setattr(db_manager, "_master_engine", master)
+    with db_manager.get_master_session() as s:
+        s.add(Client(name="Archive", code="F001", api_key="fkey", fiscal_year_start_month=4))
+        s.commit()
+    db = db_manager.get_session_for_client("F001")
+    days = [date(2021, 5, 1), date(2022, 3, 31), date(2022, 4, 1), date(2023, 1, 10), date(2023, 6, 1), date(2024, 5, 1)]
+    for i, day in enumerate(days):
+        db.add(JournalEntry(date=day, summary=f"取引{i}", amount=1000 + i, debit_account="消耗品費", credit_account="現金"))
+    db.flush()
+    first = db.query(JournalEntry).order_by(JournalEntry.id).first()
+    db.add(CorrectionHistory(entry_id=first.id, new_debit="備品", new_credit="現金", reason="fix"))
+    db.commit()
+    db.close()
+    yield tmp_path
+    for p in tmp_path.glob("clients/*.fy*.db"):
+        os.chmod(p, 0o644)
+
+
+def _active_dates():
+    db = db_manager.get_session_for_client("F001")
+    try:
+        return sorted(d for (d,) in db.query(JournalEntry.date))
+    finally:
+        db.close()
+
+
+def test_archive_moves_year_and_queries_span(tenant):
+    result = archive_fiscal_year("F001", 2021, today=date(2024, 6, 1))
+    assert (result["entries"], result["corrections"]) == (2, 1)
+    assert date(2021, 5, 1) not in _active_dates()
+    path = tenant / "clients" / "F001.fy2021.db"
+    assert path.exists() and not path.stat().st_mode & 0o222
+
+    with pytest.raises(ArchiveError):
+        archive_fiscal_year("F001", 2021, today=date(2024, 6, 1))
+    with pytest.raises(ArchiveError):
+        archive_fiscal_year("F001", 2024, today=date(2024, 6, 1))
+
+    # Range inside the active years never attaches the archive; a wider one spans both
+    assert [r.date for r in query_entries("F001", date(2022, 4, 1), date(2023, 3, 31))] == [date(2023, 1, 10), date(2022, 4, 1)]
+    spanning = query_entries("F001", date(2022, 1, 1), date(2022, 12, 31))
+    assert [r.date for r in spanning] == [date(2022, 4, 1), date(2022, 3, 31)]
+    assert len(query_entries("F001", date_from=None, date_to=date(2030, 1, 1))) == 6
+
+
+def test_archive_closed_years_and_api(tenant):
+    results = archive_closed_years("F001", keep_years=2, today=date(2024, 6, 1))
+    assert [r["fiscal_year"] for r in results] == [2021, 2022]
+    assert _active_dates() == [date(2023, 6, 1), date(2024, 5, 1)]
+
+    client = TestClient(app)
+    headers = {"X-Client-Key": "fkey"}
+    assert [p["fiscal_year"] for p in client.get("/api/archive/", headers=headers).json()] == [2021, 2022]
+    assert len(client.get("/api/journal/", headers=headers).json()) == 2
+    wide = client.get("/api/journal/", params={"date_from": "2021-01-01"}, headers=headers).json()
+    assert len(wide) == 6
+    posted = client.post("/api/journal/", headers=headers, json={
+        "date": "2022-05-01", "summary": "late", "amount": 1, "debit_account": "a", "credit_account": "b"})
+    assert posted.status_code == 409
+
+
+def test_refuses_when_newest_ids_would_be_reused(tenant):
+    db = db_manager.get_session_for_client("F001")
+    db.query(JournalEntry).filter(JournalEntry.date >= date(2023, 4, 1)).delete()
+    db.commit()
+    db.close()
+    with pytest.raises(ArchiveError):
+        archive_fiscal_year("F001", 2022, today=date(2024, 6, 1))
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QCoreApplication  # noqa: E402
+
+from frontend.event_listener import CONNECTED, DELTA, RESET, JournalEventListener  # noqa: E402
+from ui.journal_entry import JournalAPIClient  # noqa: E402
+from utils.async_worker import AsyncWorker  # noqa: E402
+
+
+@pytest.fixture
+def worker():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    w = AsyncWorker()
+    yield w
+    w.shutdown()
+    app.processEvents()
+
+
+def _wait_for(predicate, timeout: float = 3.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        QCoreApplication.processEvents()
+        time.sleep(0.01)
+
+
+def test_result_and_progress_are_delivered_in_order(worker):
+    async def job(report):
+        for i in range(3):
+            report(i)
+            await asyncio.sleep(0)
+        return "ok"
+
+    # Short jobs often finish before run() returns, which must not let the result overtake progress
+    for _ in range(20):
+        events = []
+        task = worker.run(job, on_done=lambda r: events.append(("done", r)), on_progress=events.append)
+        _wait_for(lambda: ("done", "ok") in events)
+        assert events == [0, 1, 2, ("done", "ok")]
+        assert not task.is_running()
+
+
+def test_progress_after_cancel_is_dropped(worker):
+    events = []
+    started = threading.Event()
+
+    async def job(report):
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        finally:
+            report("late")
+
+    task = worker.run(job, on_progress=events.append, on_cancel=lambda: events.append("cancelled"))
+    started.wait(2)
+    task.cancel()
+    _wait_for(lambda: events)
+    for _ in range(10):
+        QCoreApplication.processEvents()
+        time.sleep(0.01)
+    assert events == ["cancelled"]
+
+
+def test_errors_and_cancellation(worker):
+    errors, cancelled = [], []
+
+    async def boom(report):
+        raise ValueError("nope")
+
+    async def forever(report):
+        await asyncio.sleep(60)
+
+    worker.run(boom, on_error=errors.append)
+    task = worker.run(forever, on_cancel=lambda: cancelled.append(True))
+    _wait_for(lambda: errors)
+    assert isinstance(errors[0], ValueError)
+    assert task.is_running()
+    assert task.cancel()
+    _wait_for(lambda: cancelled)
+
+
+def test_shutdown_cancels_tasks_and_runs_cleanup(worker):
+    cleaned = []
+
+    async def forever(report):
+        await asyncio.sleep(60)
+
+    async def cleanup():
+        cleaned.append(True)
+
+    task = worker.run(forever)
+    worker.shutdown(cleanup=cleanup, timeout=2.0)
+    assert cleaned == [True]
+    assert not task.is_running()
+    assert not worker._thread.is_alive()
+    worker.shutdown()  # a second call is a no-op
+
+
+def test_api_client_reuses_one_pooled_connection_client(worker):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.headers.get("X-Client-Key"))
+        return httpx.Response(200, json=[{"id": 1, "code": "100", "name": "現金"}])
+
+    api = JournalAPIClient("http://test", "k")
+    api._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    first = api.http
+
+    for _ in range(2):
+        assert worker.call(api.list_accounts())[0]["name"] == "現金"
+    assert api.http is first
+    assert calls == ["k", "k"]
+    worker.call(api.aclose())
+    assert first.is_closed and api._http is None
+
+
+def test_event_listener_reports_deltas_and_resumes_after_last_id(worker):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.headers.get("Last-Event-ID"))
+        if len(requests) == 1:
+            body = 'retry: 10\n\nid: 7\nevent: journal\ndata: {"id": 7, "op": "insert"}\n\n'
+        else:
+            body = "event: reset\ndata: {}\n\n"
+        return httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    listener = JournalEventListener(http, "http://test", "k")
+    seen = []
+    task = worker.run(listener.run, on_progress=seen.append)
+    _wait_for(lambda: (RESET, None) in seen)
+    task.cancel()
+
+    assert seen[:3] == [(CONNECTED, None), (DELTA, {"id": 7, "op": "insert"}), (CONNECTED, None)]
+    assert requests[:2] == [None, "7"]
+    assert listener.retry_seconds == 0.01
+    worker.call(http.aclose())
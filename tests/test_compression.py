@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import gzip
+import json
+from datetime import date
+
+import httpx
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from backend import db_manager, duplicate_index
+from backend.api.compression import choose_encoding
+from backend.api.responses import preferred_format
+from backend.main import app
+from backend.models_base import Base
+from backend.models_client import Client
+from backend.models_journal import JournalEntry
+from utils import wire_format
+
+HEADERS = {"X-Client-Key": "z-key"}
+
+
+@pytest.fixture(autouse=True)
+def tenant(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    master = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    monkeypatch.setattr(db_manager, "_master_engine", master)
+    with db_manager.get_master_session() as s:
+        s.add(Client(name="Zip", code="Z001", api_key="z-key"))
+        s.commit()
+    db = db_manager.get_session_for_client("Z001")
+    db.add_all([
+        JournalEntry(date=date(2026, 9, 1 + i % 28), summary=f"消耗品 {i}", amount=1000 + i, debit_account="消耗品費",
+                     credit_account="現金", reviewed=True, tax_type="課税仕入10%")
+        for i in range(300)
+    ])
+    db.commit()
+    db.close()
+    yield tmp_path
+
+
+def _raw(client: TestClient, url: str, headers: dict) -> httpx.Response:
+    # Leave the body encoded so the test sees what went over the wire
+    with client.stream("GET", url, headers=headers) as r:
+        r.raw = b"".join(r.iter_raw())
+    return r
+
+
+def test_gzip_above_threshold():
+    client = TestClient(app)
+    r = _raw(client, "/api/journal/", {**HEADERS, "Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    body = json.loads(gzip.decompress(r.raw))
+    assert len(body) == 300
+    assert len(r.raw) * 4 < len(json.dumps(body, ensure_ascii=False).encode())
+
+
+def test_brotli_preferred_when_offered():
+    brotli = pytest.importorskip("brotli")
+    client = TestClient(app)
+    r = _raw(client, "/api/journal/", {**HEADERS, "Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "br"
+    assert len(json.loads(brotli.decompress(r.raw))) == 300
+
+
+def test_small_and_unaccepted_bodies_pass_through():
+    client = TestClient(app)
+    r = _raw(client, "/api/accounts/", {**HEADERS, "Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert json.loads(r.raw) == []
+    r = _raw(client, "/api/journal/", {**HEADERS, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert choose_encoding("gzip;q=0, br;q=0") is None
+
+
+def test_accept_negotiates_msgpack_and_ndjson():
+    client = TestClient(app)
+    default = client.get("/api/journal/", headers=HEADERS)
+    assert default.headers["content-type"].startswith("application/json")
+    rows = default.json()
+
+    packed = client.get("/api/journal/", headers={**HEADERS, "Accept": "application/msgpack"})
+    assert packed.headers["content-type"] == "application/msgpack"
+    assert "Accept" in packed.headers["vary"]
+    assert msgpack.unpackb(packed.content) == rows
+
+    lines = client.get("/api/journal/", headers={**HEADERS, "Accept": "application/x-ndjson"})
+    assert lines.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in lines.text.splitlines()] == rows
+
+    # The desktop client's Accept header and decoder round-trip to the same rows
+    r = client.get("/api/journal/", headers={**HEADERS, "Accept": wire_format.ACCEPT})
+    assert r.headers["content-type"] == "application/msgpack"
+    assert wire_format.decode(r) == rows
+
+
+def test_preferred_format_q_values():
+    assert preferred_format(None) == "application/json"
+    assert preferred_format("text/html, */*") == "application/json"
+    assert preferred_format("application/json, application/msgpack;q=0.5") == "application/json"
+    assert preferred_format("application/json;q=0.1, application/x-ndjson") == "application/x-ndjson"
+    assert preferred_format("application/x-msgpack") == "application/msgpack"
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+
+import httpx
+import pytest
+
+from backend import db_manager, fake_provider, txn_classifier
+from backend.connectors import HttpConnector, sync_all
+from backend.models_bank import BankTransaction, SyncAccount
+from backend.models_journal import JournalEntry
+from backend.txn_classifier import VendorClassifier, description_key
+
+
+@pytest.fixture(autouse=True)
+def tenant_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(txn_classifier, "_classifiers", {})
+    fake_provider.reset(initial=25)
+    yield tmp_path
+
+
+def _sync(codes):
+    async def run():
+        transport = httpx.ASGITransport(app=fake_provider.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://fake") as http:
+            return await sync_all(codes, http=http, connectors={"fake": HttpConnector("fake", "http://fake")})
+    return asyncio.run(run())
+
+
+def test_vendor_classifier_prefix_match():
+    classifier = VendorClassifier([
+        ("ヤマダデンキ", "消耗品費", "普通預金"),
+        ("ヤマダデンキ", "消耗品費", "普通預金"),
+        ("ヤマダデンキ", "備品", "普通預金"),
+    ])
+    assert description_key("振込 ﾔﾏﾀﾞﾃﾞﾝｷ") == "ヤマダデンキ"
+    assert classifier.classify("カード ヤマダデンキ新宿店") == ("消耗品費", "普通預金")
+    assert classifier.classify("ローソン") is None
+
+
+def test_incremental_idempotent_sync(monkeypatch):
+    from backend import connectors
+    monkeypatch.setattr(connectors.settings, "sync_page_size", 10)
+    for code in ("S001", "S002"):
+        db = db_manager.get_session_for_client(code)
+        db.add(SyncAccount(provider="fake", account_ref=f"{code}-main"))
+        db.add(JournalEntry(date=date(2023, 12, 1), summary="アマゾン", amount=1000,
+                            debit_account="消耗品費", credit_account="未払金"))
+        db.commit()
+        db.close()
+
+    first = _sync(["S001", "S002"])
+    assert [r["inserted"] for r in first] == [25, 25]
+    assert all(r["pages"] == 3 and r["error"] is None for r in first)
+
+    # Nothing new: one empty page, no inserts
+    assert [r["inserted"] for r in _sync(["S001", "S002"])] == [0, 0]
+
+    fake_provider.advance("S001-main", n=7)
+    again = _sync(["S001", "S002"])
+    assert [r["inserted"] for r in again] == [7, 0]
+
+    db = db_manager.get_session_for_client("S001")
+    try:
+        assert db.query(BankTransaction).count() == 32
+        assert db.query(SyncAccount).one().cursor == "32"
+        amazon = db.query(BankTransaction).filter(BankTransaction.description == "カード アマゾン").first()
+        assert (amazon.debit_account, amazon.credit_account) == ("消耗品費", "未払金")
+    finally:
+        db.close()
+
+    # Replaying from an old cursor does not duplicate rows
+    db = db_manager.get_session_for_client("S001")
+    db.query(SyncAccount).one().cursor = None
+    db.commit()
+    db.close()
+    assert _sync(["S001"])[0]["inserted"] == 0
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+
+from backend import consumption_tax, db_manager, duplicate_index
+from backend.archive import archive_fiscal_year
+from backend.main import app
+from backend.models_base import Base
+from backend.models_client import Client
+from backend.models_journal import JournalEntry
+from backend.models_tax import TaxPeriodTotal
+
+
+@pytest.fixture(autouse=True)
+def tenant(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    master = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    monkeypatch.setattr(db_manager, "_master_engine", master)
+    with db_manager.get_master_session() as s:
+        s.add(Client(name="Tax", code="X001", api_key="x-key"))
+        s.commit()
+    yield tmp_path
+
+
+def _entry(day, amount, debit, credit, tax_type):
+    return JournalEntry(date=day, summary="t", amount=amount, debit_account=debit, credit_account=credit,
+                        tax_type=tax_type)
+
+
+def _totals():
+    db = db_manager.get_session_for_client("X001")
+    try:
+        return {(t.period, t.category): (t.gross, t.entries) for t in db.query(TaxPeriodTotal) if t.entries}
+    finally:
+        db.close()
+
+
+def test_incremental_totals_and_worksheet():
+    db = db_manager.get_session_for_client("X001")
+    db.add(_entry(date(2024, 5, 1), 220000, "売掛金", "売上高", "課税売上10%"))
+    db.commit()
+    noinvoice = _entry(date(2026, 9, 30), 110000, "外注費", "普通預金", "課税仕入10%(非適格)")
+    db.add_all([
+        _entry(date(2026, 4, 10), 1100000, "売掛金", "売上高", "課税売上10%"),
+        _entry(date(2026, 5, 10), 540000, "売掛金", "売上高", "課税売上8%(軽)"),
+        _entry(date(2026, 5, 20), 110000, "売上高", "売掛金", "課税売上10%"),  # return
+        _entry(date(2026, 6, 1), 330000, "仕入高", "買掛金", "課税仕入10%"),
+        _entry(date(2026, 6, 2), 50000, "租税公課", "現金", "不課税"),
+        noinvoice,
+        _entry(date(2026, 10, 1), 110000, "外注費", "普通預金", "課税仕入１０％ 区分記載"),
+    ])
+    db.commit()
+    noinvoice_id = noinvoice.id
+    db.close()
+    # Core bulk inserts (as used by the legacy migration) are counted too
+    with db_manager.get_engine_for_client("X001").begin() as conn:
+        conn.execute(insert(JournalEntry), [{"date": date(2026, 7, 1), "amount": 1000.4, "debit_account": "仕入高",
+                                             "credit_account": "現金", "tax_type": "課税仕入8%(軽)"}])
+
+    totals = _totals()
+    assert totals[("2026-05", "sales_10")] == (-110000, 1) and totals[("2026-05", "sales_8")] == (540000, 1)
+    assert totals[("2026-07", "purchase_8_invoice")] == (1000, 1)
+    assert {k for k in totals if k[0] == "2026-06"} == {("2026-06", "purchase_10_invoice")}  # 不課税 is out of scope
+
+    sheet = consumption_tax.worksheet("X001", "2026-04", "2027-03")
+    assert sheet["taxable_sales"] == {"10": 900000, "8": 500000} and sheet["tax_base"] == {"10": 900000, "8": 500000}
+    assert sheet["output_tax"] == {"10": 70200, "8": 31200}
+    # 330,000 + 80% of 110,000 (Sept 2026) + 50% of 110,000 (Oct 2026) at 7.8/110, plus 1,000 at 6.24/108
+    assert sheet["input_tax_before_ratio"] == {"10": 33540, "8": 57}
+    assert sheet["deduction_method"] == "full" and sheet["input_tax"] == 33597
+    assert sheet["national_tax_due"] == 67800 and sheet["local_tax_due"] == 19100 and sheet["total_due"] == 86900
+
+    # Edits move amounts between categories without a rescan
+    db = db_manager.get_session_for_client("X001")
+    db.get(JournalEntry, noinvoice_id).tax_type = "課税仕入10%"
+    db.commit()
+    db.close()
+    assert ("2026-09", "purchase_10_noinvoice") not in _totals()
+    assert _totals()[("2026-09", "purchase_10_invoice")] == (110000, 1)
+
+    # Archiving a closed year keeps its totals; a full rebuild agrees with the incremental state
+    archive_fiscal_year("X001", 2024, today=date(2026, 10, 19))
+    before = _totals()
+    assert before[("2024-05", "sales_10")] == (220000, 1)
+    assert consumption_tax.rebuild_tax_totals("X001")["archived_years"] == 1
+    assert _totals() == before
+
+    db = db_manager.get_session_for_client("X001")
+    db.query(JournalEntry).filter(JournalEntry.date == date(2026, 7, 1)).delete()
+    db.commit()
+    db.close()
+    assert ("2026-07", "purchase_8_invoice") not in _totals()
+
+
+def test_proportional_deduction_and_api():
+    db = db_manager.get_session_for_client("X001")
+    db.add_all([
+        _entry(date(2026, 4, 1), 1100000, "売掛金", "売上高", "課税売上10%"),
+        _entry(date(2026, 4, 2), 1000000, "普通預金", "受取家賃", "非課税売上"),
+        _entry(date(2026, 4, 3), 550000, "仕入高", "買掛金", "課税仕入10%"),
+    ])
+    db.commit()
+    db.close()
+    client = TestClient(app)
+    headers = {"X-Client-Key": "x-key"}
+    sheet = client.get("/api/tax/worksheet", params={"fiscal_year": 2026}, headers=headers).json()
+    assert sheet["from"] == "2026-04" and sheet["to"] == "2027-03"
+    assert sheet["deduction_method"] == "proportional" and sheet["taxable_sales_ratio"] == 0.5
+    assert sheet["input_tax"] == 39000 // 2 and sheet["national_tax_due"] == 78000 - 19500 - 0
+    totals = client.get("/api/tax/totals", params={"from": "2026-04", "to": "2026-04"}, headers=headers).json()
+    assert totals["2026-04"]["sales_nontaxable"] == {"gross": 1000000, "entries": 1}
+    assert client.get("/api/tax/worksheet", params={"from": "2026-4", "to": "2027-03"}, headers=headers).status_code == 400
+
+
+def test_first_install_counts_years_archived_before_the_upgrade(monkeypatch):
+    db = db_manager.get_session_for_client("X001")
+    db.add_all([_entry(date(2024, 5, 1), 220000, "売掛金", "売上高", "課税売上10%"),
+                _entry(date(2026, 5, 1), 110000, "売掛金", "売上高", "課税売上10%")])
+    db.commit()
+    db.close()
+    archive_fiscal_year("X001", 2024, today=date(2026, 10, 19))
+    # Simulate a tenant DB from before the tax totals existed
+    with db_manager.get_engine_for_client("X001").begin() as conn:
+        for name in ("tax_totals_ai", "tax_totals_au", "tax_totals_ad"):
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        conn.exec_driver_sql("DELETE FROM tax_period_totals")
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+
+    totals = _totals()
+    assert totals[("2024-05", "sales_10")] == (220000, 1)
+    assert totals[("2026-05", "sales_10")] == (110000, 1)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from backend import db_manager
+from backend.document_store import DocumentStore
+from backend.main import app
+from backend.models_base import Base
+from backend.models_client import Client
+
+
+@pytest.fixture(autouse=True)
+def tenant_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    master = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    monkeypatch.setattr(db_manager, "_master_engine", master)
+    with db_manager.get_master_session() as s:
+        s.add(Client(name="Docs", code="D001", api_key="dkey"))
+        s.commit()
+    yield tmp_path
+
+
+def test_put_file_dedups_and_fans_out(tenant_env):
+    src = tenant_env / "receipt.pdf"
+    src.write_bytes(b"%PDF-1.4 receipt")
+    store = DocumentStore("D001")
+    sha = store.put_file(src)
+    assert sha == hashlib.sha256(b"%PDF-1.4 receipt").hexdigest()
+    assert store.path_for(sha) == tenant_env / "documents" / "D001" / sha[:2] / sha[2:4] / sha
+    assert src.exists() and store.exists(sha)
+
+    copy = tenant_env / "copy.pdf"
+    copy.write_bytes(src.read_bytes())
+    assert store.put_file(copy, move=True) == sha
+    assert not copy.exists()
+    assert store.media_type(sha) == "application/pdf"
+    assert not store.exists("../../etc/passwd")
+
+
+def test_download_supports_ranges(tenant_env):
+    body = b"%PDF-" + bytes(range(256)) * 10
+    sha = DocumentStore("D001").put_file(_write(tenant_env / "doc.pdf", body))
+    client = TestClient(app)
+    headers = {"X-Client-Key": "dkey"}
+
+    full = client.get(f"/api/documents/{sha}", headers=headers)
+    assert full.status_code == 200 and full.content == body
+    assert full.headers["accept-ranges"] == "bytes"
+
+    part = client.get(f"/api/documents/{sha}", headers={**headers, "Range": "bytes=5-14"})
+    assert part.status_code == 206
+    assert part.content == body[5:15]
+    assert part.headers["content-range"] == f"bytes 5-14/{len(body)}"
+
+    tail = client.get(f"/api/documents/{sha}", headers={**headers, "Range": "bytes=-4"})
+    assert tail.content == body[-4:]
+    assert client.get(f"/api/documents/{sha}", headers={**headers, "Range": "bytes=99999-"}).status_code == 416
+    assert client.get("/api/documents/" + "0" * 64, headers=headers).status_code == 404
+
+
+def _write(path, data):
+    path.write_bytes(data)
+    return path
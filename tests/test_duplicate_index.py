@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from backend import auto_journal_scan, db_manager, duplicate_index
+from backend.auto_journal_scan import process_scansnap_xml
+from backend.duplicate_index import DuplicateIndex, vendor_key
+
+
+@pytest.fixture(autouse=True)
+def tenant_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    yield tmp_path
+
+
+def test_window_amount_and_vendor():
+    index = DuplicateIndex()
+    index.add(1, date(2024, 6, 10), 1280, "セブン-イレブン 新宿店 1,280円")
+    index.add(2, date(2024, 6, 20), 1280, "セブンイレブン")
+    index.add(3, date(2024, 6, 10), 990, "セブンイレブン")
+
+    assert vendor_key("セブン-イレブン 1,280円") == "セブンイレブン"
+    assert index.find(date(2024, 6, 12), 1280, "ｾﾌﾞﾝｲﾚﾌﾞﾝ") == [1]
+    assert index.find(date(2024, 6, 12), 1280, "ローソン") == []
+    assert index.find(date(2024, 6, 12), 1281, "セブンイレブン") == []
+    assert index.find(date(2024, 6, 16), 1280, "セブンイレブン", window_days=5) == [2]
+    assert index.clusters() == []
+    index.add(4, date(2024, 6, 21), 1280, "セブンイレブン")
+    assert index.clusters() == [[2, 4]]
+
+
+def test_rescanned_receipt_is_flagged_not_posted(tenant_dir, monkeypatch):
+    monkeypatch.setattr(
+        auto_journal_scan,
+        "classify_with_llm",
+        lambda **kw: {"debit_account": "会議費", "credit_account": "現金", "confidence": 0.95, "reason": ""},
+    )
+    first = tenant_dir / "first.xml"
+    first.write_text("<Root><Date>2024-06-10</Date><Vendor>スターバックス</Vendor><Amount>650</Amount></Root>", encoding="utf-8")
+    again = tenant_dir / "again.xml"
+    again.write_text("<Root><Date>2024-06-11</Date><Vendor>スターバックス コーヒー</Vendor><Amount>650</Amount></Root>", encoding="utf-8")
+
+    saved = process_scansnap_xml(first, client_code="U001")
+    assert saved["saved"] is True
+    flagged = process_scansnap_xml(again, client_code="U001")
+    assert flagged["saved"] is False
+    assert flagged["duplicate_of"] == [saved["entry"]["id"]]
+
+    # A fresh index rebuilt from the tenant DB sees the same history
+    duplicate_index.invalidate_duplicate_index("U001")
+    assert duplicate_index.get_duplicate_index("U001").find(date(2024, 6, 12), 650, "スターバックス") == [saved["entry"]["id"]]
+
+
+def test_cached_index_follows_updates_and_deletes(tenant_dir):
+    from backend.models_journal import JournalEntry
+
+    db = db_manager.get_session_for_client("U002")
+    kept = JournalEntry(date=date(2024, 6, 10), summary="スターバックス", amount=650)
+    moved = JournalEntry(date=date(2024, 6, 10), summary="ローソン", amount=300)
+    db.add_all([kept, moved])
+    db.commit()
+    index = duplicate_index.get_duplicate_index("U002")
+    assert index.find(date(2024, 6, 11), 650, "スターバックス") == [kept.id]
+
+    # Written behind the cached index, as another worker process would
+    moved.amount = 650
+    moved.summary = "スターバックス コーヒー"
+    db.delete(kept)
+    db.commit()
+    index = duplicate_index.get_duplicate_index("U002")
+    assert index.find(date(2024, 6, 11), 650, "スターバックス") == [moved.id]
+    assert index.find(date(2024, 6, 11), 300, "ローソン") == []
+    db.close()
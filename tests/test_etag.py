@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from backend import db_manager, duplicate_index, read_model
+from backend.main import app
+from backend.models_base import Base
+from backend.models_client import Client
+from backend.models_journal import CorrectionHistory, JournalEntry
+from utils import wire_format
+
+HEADERS = {"X-Client-Key": "e-key"}
+
+
+@pytest.fixture(autouse=True)
+def tenant(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    master = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    monkeypatch.setattr(db_manager, "_master_engine", master)
+    with db_manager.get_master_session() as s:
+        s.add(Client(name="ETag", code="E001", api_key="e-key"))
+        s.commit()
+    db = db_manager.get_session_for_client("E001")
+    db.add(JournalEntry(date=date(2026, 10, 1), summary="切手", amount=840, debit_account="通信費",
+                        credit_account="現金", reviewed=True))
+    db.commit()
+    db.close()
+    yield tmp_path
+
+
+def test_not_modified_until_a_write(monkeypatch):
+    client = TestClient(app)
+    first = client.get("/api/journal/", headers=HEADERS)
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"E001-')
+
+    calls = []
+    with monkeypatch.context() as m:
+        m.setattr("backend.api.journal.journal_rows", lambda *a: calls.append(a) or [])
+        again = client.get("/api/journal/", headers={**HEADERS, "If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+    assert calls == []  # answered from change_versions alone
+
+    # Each format and query string has its own tag
+    packed = client.get("/api/journal/", headers={**HEADERS, "Accept": "application/msgpack", "If-None-Match": etag})
+    assert packed.status_code == 200 and packed.headers["etag"] != etag
+    ranged = client.get("/api/journal/?date_from=2026-01-01", headers={**HEADERS, "If-None-Match": etag})
+    assert ranged.status_code == 200 and ranged.headers["etag"] != etag
+
+    db = db_manager.get_session_for_client("E001")
+    db.add(CorrectionHistory(entry_id=1, old_debit="通信費", new_debit="消耗品費"))
+    db.commit()
+    db.close()
+    after_correction = client.get("/api/journal/", headers={**HEADERS, "If-None-Match": etag})
+    assert after_correction.status_code == 200
+    etag = after_correction.headers["etag"]
+
+    with db_manager.get_engine_for_client("E001").begin() as conn:
+        conn.exec_driver_sql("UPDATE journal_entries SET summary = '郵便切手' WHERE id = 1")
+    changed = client.get("/api/journal/", headers={**HEADERS, "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()[0]["summary"] == "郵便切手"
+
+
+def test_accounts_version_is_separate_from_journals():
+    client = TestClient(app)
+    etag = client.get("/api/accounts/", headers=HEADERS).headers["etag"]
+    client.post("/api/journal/", headers=HEADERS, json={"date": "2026-10-02", "summary": "封筒", "amount": 300,
+                                                        "debit_account": "消耗品費", "credit_account": "現金"})
+    assert client.get("/api/accounts/", headers={**HEADERS, "If-None-Match": etag}).status_code == 304
+
+    client.post("/api/accounts/", headers=HEADERS, json={"code": "610", "name": "消耗品費"})
+    r = client.get("/api/accounts/", headers={**HEADERS, "If-None-Match": f"{etag}, \"other\""})
+    assert r.status_code == 200 and [a["name"] for a in r.json()] == ["消耗品費"]
+
+
+def test_versions_never_go_backwards_after_a_restore():
+    before = read_model.change_versions("E001", ("journal_entries",))[0]
+    db_manager.refresh_client_schema("E001")
+    assert read_model.change_versions("E001", ("journal_entries",))[0] > before
+    assert read_model.change_versions("E001", ("no_such_table",)) == (0,)
+
+
+def test_client_cache_revalidates():
+    client = TestClient(app)
+    cache = wire_format.ETagCache()
+    url = "http://testserver/api/journal/"
+    first = client.get(url, headers={**HEADERS, "Accept": wire_format.ACCEPT})
+    rows = cache.resolve(url, "e-key", first)
+    second = client.get(url, headers={**HEADERS, "Accept": wire_format.ACCEPT, **cache.headers(url, "e-key")})
+    assert second.status_code == 304
+    assert cache.resolve(url, "e-key", second) is rows
+    assert cache.headers(url, "other-key") == {}
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from backend import db_manager, fanout
+from backend.main import app
+from backend.models_account import Account
+from backend.models_base import Base
+from backend.models_client import Client
+from backend.models_journal import JournalEntry
+from backend.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def tenants(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(fanout, "_cache", {})
+    monkeypatch.setattr(settings, "admin_api_key", "admin")
+    master = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    monkeypatch.setattr(db_manager, "_master_engine", master)
+    with db_manager.get_master_session() as s:
+        s.add_all([Client(name=f"Client {i}", code=f"P{i:03d}") for i in range(12)] + [Client(name="New", code="Z999")])
+        s.commit()
+    for i in range(12):
+        db = db_manager.get_session_for_client(f"P{i:03d}")
+        db.add(Account(code="4100", name="受取手数料", type="revenue"))
+        db.add_all([
+            JournalEntry(date=date(2026, 9, 10), summary="売上", amount=1000 * (i + 1), debit_account="売掛金",
+                         credit_account="売上高", reviewed=True),
+            JournalEntry(date=date(2026, 10, 1), summary="手数料", amount=500, debit_account="普通預金",
+                         credit_account="受取手数料", reviewed=False, confidence=0.9),
+            JournalEntry(date=date(2026, 10, 5), summary="返品", amount=100, debit_account="売上高",
+                         credit_account="売掛金", reviewed=False, confidence=0.2),
+        ])
+        db.commit()
+        db.close()
+    yield tmp_path
+
+
+def test_dashboard_across_tenants_is_cached():
+    client = TestClient(app, headers={"X-Admin-Key": "admin"})
+    body = client.get("/api/admin/dashboard", params={"months": 3}).json()
+    assert body["cached"] is False and body["totals"] == {"clients": 13, "unreviewed": 24, "low_confidence": 12}
+    assert body["incomplete"] == ["Z999"]
+    p1 = next(c for c in body["clients"] if c["client_code"] == "P001")
+    assert p1["name"] == "Client 1" and p1["unreviewed"] == 2 and p1["low_confidence"] == 1
+    assert "monthly_revenue" in p1
+
+    # New data is not visible until the TTL expires
+    db = db_manager.get_session_for_client("P001")
+    db.add(JournalEntry(date=date(2026, 10, 9), amount=1, reviewed=False))
+    db.commit()
+    db.close()
+    again = client.get("/api/admin/dashboard", params={"months": 3}).json()
+    assert again["cached"] is True and again["totals"]["unreviewed"] == 24
+
+    lines = client.get("/api/admin/fanout/unreviewed").text.splitlines()
+    assert len(lines) == 13 and {json.loads(l)["status"] for l in lines} == {"ok", "missing"}
+    assert client.get("/api/admin/fanout/nope").status_code == 404
+    assert client.get("/api/admin/dashboard", params={"months": 100000}).status_code == 422
+    assert client.get("/api/admin/fanout/unreviewed", params={"months": 0}).status_code == 422
+
+
+def test_monthly_revenue_nets_returns():
+    params = fanout.default_params(months=2, today=date(2026, 10, 19))
+    assert params["since"] == "2026-09-01"
+    (r,) = fanout.run_query("monthly_revenue", params, ["P001"])
+    # 売上高 by name, 受取手数料 by account type; the 売上高 debit is a return
+    assert r.data["monthly_revenue"] == [{"month": "2026-09", "revenue": 2000.0}, {"month": "2026-10", "revenue": 400.0}]
+    assert fanout.run_query("monthly_revenue", fanout.default_params(months=1, today=date(2026, 10, 19)),
+                            ["P001"])[0].data["monthly_revenue"] == [{"month": "2026-10", "revenue": 400.0}]
+
+
+def test_slow_tenant_times_out_without_blocking_others(monkeypatch):
+    slow = fanout.FanoutQuery("slow", {"n": "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+                                             "SELECT COUNT(*) AS n FROM c"})
+    r = fanout.run_on_tenant("P000", slow, {}, timeout=0.05)
+    assert r.status == fanout.TIMEOUT and r.seconds < 1
+
+    monkeypatch.setattr(settings, "fanout_deadline_seconds", 0.0)
+    results = list(fanout.fanout(fanout.QUERIES["unreviewed"], {}, ["P000", "P001"]))
+    assert {r.status for r in results} == {fanout.TIMEOUT}
+
+
+def test_admin_endpoints_need_the_admin_key():
+    client = TestClient(app)
+    for method, path in (("get", "/api/admin/dashboard"), ("post", "/api/backups/run"), ("post", "/api/maintenance/run")):
+        assert getattr(client, method)(path).status_code == 401
+        assert getattr(client, method)(path, headers={"X-Admin-Key": "wrong"}).status_code == 401
+
+
+def test_without_an_admin_key_only_localhost_is_allowed(monkeypatch):
+    from types import SimpleNamespace
+
+    from fastapi import HTTPException
+
+    from backend.api.admin_auth import require_admin
+
+    monkeypatch.setattr(settings, "admin_api_key", None)
+    require_admin(SimpleNamespace(client=SimpleNamespace(host="127.0.0.1")), None)
+    with pytest.raises(HTTPException) as exc:
+        require_admin(SimpleNamespace(client=SimpleNamespace(host="192.168.1.20")), None)
+    assert exc.value.status_code == 403
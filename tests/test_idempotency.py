@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from backend import db_manager, duplicate_index, idempotency
+from backend.main import app
+from backend.models_base import Base
+from backend.models_client import Client
+from backend.models_journal import CorrectionHistory, JournalEntry
+from backend.scan_jobs import jobs
+
+HEADERS = {"X-Client-Key": "i-key"}
+ENTRY = {"date": "2026-10-05", "summary": "タクシー", "amount": 1500, "debit_account": "旅費交通費",
+         "credit_account": "現金"}
+
+
+@pytest.fixture(autouse=True)
+def tenant(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    master = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    monkeypatch.setattr(db_manager, "_master_engine", master)
+    with db_manager.get_master_session() as s:
+        s.add(Client(name="Idem", code="I001", api_key="i-key"))
+        s.commit()
+    yield tmp_path
+
+
+def _count(model) -> int:
+    db = db_manager.get_session_for_client("I001")
+    try:
+        return db.query(model).count()
+    finally:
+        db.close()
+
+
+def test_retry_replays_the_stored_response():
+    client = TestClient(app)
+    headers = {**HEADERS, "Idempotency-Key": "k-1"}
+    first = client.post("/api/journal/", json=ENTRY, headers=headers)
+    assert first.status_code == 200 and "idempotent-replayed" not in first.headers
+    again = client.post("/api/journal/", json=ENTRY, headers=headers)
+    assert again.headers["idempotent-replayed"] == "true"
+    assert again.status_code == 200 and again.json() == first.json()
+    assert _count(JournalEntry) == 1
+
+    # Another key, or none, is a new request
+    client.post("/api/journal/", json=ENTRY, headers={**HEADERS, "Idempotency-Key": "k-2"})
+    client.post("/api/journal/", json=ENTRY, headers=HEADERS)
+    assert _count(JournalEntry) == 3
+
+    reused = client.post("/api/journal/", json={**ENTRY, "amount": 999}, headers=headers)
+    assert reused.status_code == 422
+    assert _count(JournalEntry) == 3
+
+
+def test_correction_is_recorded_once():
+    client = TestClient(app)
+    entry_id = client.post("/api/journal/", json=ENTRY, headers=HEADERS).json()["id"]
+    payload = {"entry_id": entry_id, "new_debit": "会議費", "new_credit": "現金", "reason": "打合せ"}
+    headers = {**HEADERS, "Idempotency-Key": "fix-1"}
+    for _ in range(3):
+        assert client.post("/api/journal/correct", json=payload, headers=headers).json() == {"status": "corrected"}
+    assert _count(CorrectionHistory) == 1
+
+
+def test_in_progress_and_failed_requests(monkeypatch):
+    client = TestClient(app)
+    key = "POST /api/journal/ busy"
+    assert idempotency.claim("I001", key)[0] == idempotency.CLAIMED
+    busy = client.post("/api/journal/", json=ENTRY, headers={**HEADERS, "Idempotency-Key": "busy"})
+    assert busy.status_code == 409 and busy.headers["retry-after"] == "1"
+
+    # A stalled first request stops blocking after IDEMPOTENCY_PENDING_SECONDS
+    later = datetime.utcnow() + timedelta(hours=1)
+    assert idempotency.claim("I001", key, now=later)[0] == idempotency.CLAIMED
+
+    # Server errors are not stored, so the retry runs again
+    def boom(*args, **kwargs):
+        raise RuntimeError("index down")
+
+    with monkeypatch.context() as m:
+        m.setattr("backend.api.journal.get_duplicate_index", boom)
+        with pytest.raises(RuntimeError):
+            client.post("/api/journal/", json=ENTRY, headers={**HEADERS, "Idempotency-Key": "flaky"})
+    ok = client.post("/api/journal/", json=ENTRY, headers={**HEADERS, "Idempotency-Key": "flaky"})
+    assert ok.status_code == 200 and "idempotent-replayed" not in ok.headers
+
+
+def test_expired_keys_are_purged_and_reusable():
+    client = TestClient(app)
+    headers = {**HEADERS, "Idempotency-Key": "old"}
+    client.post("/api/journal/", json=ENTRY, headers=headers)
+    later = datetime.utcnow() + timedelta(days=2)
+    assert idempotency.claim("I001", "POST /api/journal/ old", now=later)[0] == idempotency.CLAIMED
+    assert idempotency.purge_expired("I001", now=later + timedelta(days=2)) == 1
+
+
+def test_upload_retry_does_not_requeue():
+    client = TestClient(app)
+    headers = {**HEADERS, "Idempotency-Key": "scan-1"}
+    pdf = b"%PDF-1.4\n%%EOF\n"
+    first = client.post("/api/scan/import", files={"file": ("a.pdf", pdf, "application/pdf")}, headers=headers)
+    # requests/httpx choose a new multipart boundary on every attempt
+    again = client.post("/api/scan/import", files={"file": ("a.pdf", pdf, "application/pdf")}, headers=headers)
+    assert again.headers["idempotent-replayed"] == "true"
+    assert again.json()["job_id"] == first.json()["job_id"]
+    assert [j.id for j in jobs.list("I001")] == [first.json()["job_id"]]
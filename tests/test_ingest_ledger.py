@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import db_manager, ingest_ledger
+from backend.ingest_ledger import DUPLICATE, FAILED, POSTED, RETRY, SUGGESTED, IngestLedger, ingest_file
+
+
+@pytest.fixture(autouse=True)
+def tenant_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(ingest_ledger, "_ledgers", {})
+    yield tmp_path
+
+
+def test_processed_once_and_survives_restart(tenant_dir):
+    calls = []
+
+    def processor(path, code):
+        calls.append(path.name)
+        return {"saved": True, "entry": {"id": 7}}
+
+    doc = tenant_dir / "a.xml"
+    doc.write_text("<Root><Amount>100</Amount></Root>")
+    assert ingest_file("L001", doc, processor)["saved"] is True
+    assert ingest_file("L001", doc, processor) is None
+
+    # Fresh ledger loaded from the tenant DB
+    ingest_ledger._ledgers.clear()
+    assert ingest_file("L001", doc, processor) is None
+    entry = ingest_ledger.get_ledger("L001").get(str(doc.resolve()))
+    assert entry.state == POSTED and entry.entry_id == 7
+    assert calls == ["a.xml"]
+
+    copy = tenant_dir / "a_copy.xml"
+    copy.write_bytes(doc.read_bytes())
+    result = ingest_file("L001", copy, processor)
+    assert result["duplicate"] is True
+    assert ingest_ledger.get_ledger("L001").get(str(copy.resolve())).state == DUPLICATE
+    assert calls == ["a.xml"]
+
+
+def test_low_confidence_is_not_resent(tenant_dir):
+    calls = []
+    doc = tenant_dir / "b.xml"
+    doc.write_text("<Root/>")
+    processor = lambda path, code: calls.append(1) or {"saved": False}
+    ingest_file("L001", doc, processor)
+    ingest_file("L001", doc, processor)
+    assert calls == [1]
+    assert ingest_ledger.get_ledger("L001").entries(SUGGESTED)
+
+
+def test_failures_back_off_then_give_up(tenant_dir, monkeypatch):
+    monkeypatch.setattr(ingest_ledger.settings, "ingest_max_attempts", 2)
+    doc = tenant_dir / "c.xml"
+    doc.write_text("<Root/>")
+
+    def boom(path, code):
+        raise RuntimeError("llm down")
+
+    assert ingest_file("L001", doc, boom) is None
+    ledger = ingest_ledger.get_ledger("L001")
+    key = str(doc.resolve())
+    assert ledger.get(key).state == RETRY
+    st = doc.stat()
+    assert not ledger.needs_processing(key, st.st_size, st.st_mtime)
+    later = datetime.utcnow() + timedelta(hours=1)
+    assert ledger.due_retries(later) == [key]
+    assert ledger.needs_processing(key, st.st_size, st.st_mtime, now=later)
+
+    ledger.get(key).retry_after = None
+    ingest_file("L001", doc, boom)
+    assert IngestLedger("L001").get(key).state == FAILED
+
+
+def test_rewritten_path_no_longer_claims_its_old_content(tenant_dir):
+    calls = []
+
+    def processor(path, code):
+        calls.append(path.name)
+        return {"saved": True, "entry": {"id": len(calls)}}
+
+    doc = tenant_dir / "d.xml"
+    doc.write_text("<Root><Amount>100</Amount></Root>")
+    ingest_file("L001", doc, processor)
+    old_content = doc.read_bytes()
+    doc.write_text("<Root><Amount>200000</Amount></Root>")
+    ingest_file("L001", doc, processor)
+
+    # d.xml no longer holds the first content, so a file with it is new rather than a duplicate
+    later = tenant_dir / "e.xml"
+    later.write_bytes(old_content)
+    assert ingest_file("L001", later, processor)["saved"] is True
+    assert ingest_ledger.get_ledger("L001").get(str(later.resolve())).state == POSTED
+    assert calls == ["d.xml", "d.xml", "e.xml"]
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from backend.ingest_pool import IngestPool, QueueFull
+
+
+def test_round_robin_keeps_small_tenant_responsive():
+    order = []
+    gate = threading.Event()
+
+    def handler(code, item):
+        gate.wait(5)
+        order.append((code, item))
+
+    pool = IngestPool(handler, workers=1, max_queue_per_tenant=100, tenant_concurrency=1, weights={"BIG": 2})
+    for i in range(6):
+        pool.submit("BIG", i)
+    pool.submit("SMALL", 0)
+    pool.submit("SMALL", 1)
+    pool.start()
+    gate.set()
+    deadline = time.monotonic() + 5
+    while len(order) < 8 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pool.stop()
+
+    codes = [c for c, _ in order]
+    assert codes[:6] == ["BIG", "BIG", "SMALL", "BIG", "BIG", "SMALL"]
+    metrics = pool.metrics()
+    assert metrics["BIG"]["processed"] == 6 and metrics["SMALL"]["processed"] == 2
+    assert metrics["BIG"]["queue_depth"] == 0
+    assert metrics["BIG"]["rate_per_minute"] > 0
+
+
+def test_bounded_queue_applies_backpressure():
+    pool = IngestPool(lambda code, item: None, workers=1, max_queue_per_tenant=2)
+    pool.submit("A", 1)
+    pool.submit("A", 2)
+    with pytest.raises(QueueFull):
+        pool.submit("A", 3)
+    with pytest.raises(QueueFull):
+        pool.submit("A", 3, block=True, timeout=0.05)
+    # Other tenants are unaffected
+    pool.submit("B", 1)
+    assert pool.depth("A") == 2 and pool.depth("B") == 1
+
+
+def test_completion_callback_receives_errors():
+    done = threading.Event()
+    seen = []
+
+    def handler(code, item):
+        raise ValueError(item)
+
+    def on_done(result, error):
+        seen.append(error)
+        done.set()
+
+    pool = IngestPool(handler, workers=2)
+    pool.start()
+    pool.submit("A", "bad", on_done=on_done)
+    assert done.wait(5)
+    pool.stop()
+    assert isinstance(seen[0], ValueError)
+    assert pool.metrics()["A"]["failed"] == 1
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from backend import db_manager, duplicate_index, journal_events
+from backend.auto_journal import record_correction
+from backend.main import app
+from backend.models_base import Base
+from backend.models_client import Client
+from backend.models_journal import JournalEntry
+from backend.settings import settings
+from utils.sse import iter_events
+
+HEADERS = {"X-Client-Key": "v-key"}
+
+
+@pytest.fixture(autouse=True)
+def tenant(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    monkeypatch.setattr(journal_events, "_feeds", {})
+    monkeypatch.setattr(settings, "journal_events_poll_seconds", 0.1)
+    master = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    monkeypatch.setattr(db_manager, "_master_engine", master)
+    with db_manager.get_master_session() as s:
+        s.add(Client(name="Events", code="V001", api_key="v-key"))
+        s.commit()
+    yield tmp_path
+
+
+def _insert(summary: str, amount: float = 500) -> int:
+    db = db_manager.get_session_for_client("V001")
+    try:
+        e = JournalEntry(date=date(2026, 10, 3), summary=summary, amount=amount, debit_account="消耗品費",
+                         credit_account="現金", confidence=0.97, reviewed=True, pdf_path="/scans/r.pdf")
+        db.add(e)
+        db.commit()
+        return e.id
+    finally:
+        db.close()
+
+
+async def _take(gen, n: int, timeout: float = 5.0) -> list:
+    out = []
+    while len(out) < n:
+        item = await asyncio.wait_for(gen.__anext__(), timeout)
+        if item != journal_events.KEEPALIVE:
+            out.append(item)
+    return out
+
+
+def test_log_records_inserts_updates_deletes_and_corrections():
+    entry_id = _insert("レシート")
+    record_correction("V001", entry_id, "会議費", "現金", "打合せ", reviewer="user")
+    # Rows carry the entry as it is now
+    assert [d.entry.debit_account for d in journal_events.deltas_since("V001", 0)] == ["会議費"] * 3
+    with db_manager.get_engine_for_client("V001").begin() as conn:
+        conn.exec_driver_sql("DELETE FROM journal_entries WHERE id = ?", (entry_id,))
+    deltas = journal_events.deltas_since("V001", 0)
+    assert [d.op for d in deltas] == ["insert", "update", "correction", "delete"]
+    assert all(d.entry is None and d.entry_id == entry_id for d in deltas)
+
+
+def test_subscribers_receive_writes_from_threads():
+    async def scenario():
+        gen = journal_events.subscribe("V001", keepalive=0.2)
+        first = asyncio.ensure_future(_take(gen, 2))
+        await asyncio.sleep(0.3)  # subscribed; the feed starts from the current end of the log
+        loop = asyncio.get_running_loop()
+        # e.g. the ScanSnap ingest pool posting from a worker thread
+        await loop.run_in_executor(None, _insert, "自動仕訳 1")
+        await loop.run_in_executor(None, _insert, "自動仕訳 2")
+        got = await first
+        await gen.aclose()
+        return got
+
+    got = asyncio.run(scenario())
+    assert [(d.op, d.entry.summary) for d in got] == [("insert", "自動仕訳 1"), ("insert", "自動仕訳 2")]
+    assert got[0].entry.reviewed and got[0].entry.pdf_path == "/scans/r.pdf"
+    assert journal_events._feeds == {}  # the feed stops with its last subscriber
+
+
+def test_reconnect_replays_missed_events_or_resets():
+    _insert("A")
+    seen = journal_events.latest_event_id("V001")
+    _insert("B")
+    _insert("C")
+
+    async def resume(last):
+        gen = journal_events.subscribe("V001", last, keepalive=0.2)
+        try:
+            return await _take(gen, 1 if last == 0 else 2)
+        finally:
+            await gen.aclose()
+
+    assert [d.entry.summary for d in asyncio.run(resume(seen))] == ["B", "C"]
+
+    with db_manager.get_engine_for_client("V001").begin() as conn:
+        conn.exec_driver_sql("UPDATE journal_events SET changed_at = '2000-01-01 00:00:00.000'")
+    assert journal_events.trim_events("V001") == 3
+    _insert("D")
+    assert asyncio.run(resume(0)) == [journal_events.RESET]
+
+
+def test_stream_endpoint_formats_server_sent_events(monkeypatch):
+    entry_id = _insert("切手")
+    delta = journal_events.deltas_since("V001", 0)[0]
+    seen = {}
+
+    async def finite(client_code, last_event_id=None, keepalive=None):
+        seen["args"] = (client_code, last_event_id)
+        for item in (delta, journal_events.KEEPALIVE, journal_events.RESET):
+            yield item
+
+    monkeypatch.setattr(journal_events, "subscribe", finite)
+    client = TestClient(app)
+    r = client.get("/api/journal/events", headers={**HEADERS, "Last-Event-ID": "7"})
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in r.headers
+    assert seen["args"] == ("V001", 7)
+    events = list(iter_events(r.text.split("\n")))
+    assert events[0].retry == 3000
+    assert [(e.event, e.id) for e in events[1:]] == [("journal", str(delta.id)), ("reset", None)]
+    body = json.loads(events[1].data)
+    assert body["op"] == "insert" and body["entry_id"] == entry_id and body["entry"]["summary"] == "切手"
+
+    assert client.get("/api/journal/events", headers={"X-Client-Key": "nope"}).status_code == 401
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+from backend import db_manager
+from backend.leader import LeaderLease
+from backend.models_base import Base
+
+
+@pytest.fixture(autouse=True)
+def master(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(db_manager, "_master_engine", engine)
+    yield engine
+
+
+def _lease(holder, events):
+    return LeaderLease(
+        "ingest",
+        on_acquire=lambda: events.append((holder, "acquire")),
+        on_release=lambda: events.append((holder, "release")),
+        ttl_seconds=0.3,
+        holder=holder,
+    )
+
+
+def test_single_leader_and_takeover_after_expiry():
+    events = []
+    a, b = _lease("a", events), _lease("b", events)
+    a.tick()
+    b.tick()
+    assert (a.is_leader, b.is_leader) == (True, False)
+
+    # "a" keeps renewing, so "b" stays on standby past the original expiry
+    time.sleep(0.2)
+    a.tick()
+    time.sleep(0.2)
+    b.tick()
+    assert not b.is_leader
+
+    # "a" stops heartbeating (crash); "b" takes over once the lease expires
+    time.sleep(0.35)
+    b.tick()
+    assert b.is_leader
+    a.tick()
+    assert not a.is_leader
+    assert events == [("a", "acquire"), ("b", "acquire"), ("a", "release")]
+
+
+def test_clean_stop_hands_over_immediately():
+    events = []
+    a, b = _lease("a", events), _lease("b", events)
+    a.start()
+    try:
+        b.tick()
+        assert not b.is_leader
+        a.stop()
+        b.tick()
+        assert b.is_leader
+    finally:
+        a.stop()
+        b.stop()
+    assert events == [("a", "acquire"), ("a", "release"), ("b", "acquire"), ("b", "release")]
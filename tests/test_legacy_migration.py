@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend import account_resolver, db_manager, duplicate_index, legacy_migration, txn_classifier
+from backend import models as legacy
+from backend.models_base import Base
+from backend.models_client import Client
+from backend.models_journal import JournalEntry
+from backend.models_migration import MigrationCheckpoint
+
+
+@pytest.fixture(autouse=True)
+def tenants(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(account_resolver, "_resolvers", {})
+    monkeypatch.setattr(txn_classifier, "_classifiers", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    master = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    monkeypatch.setattr(db_manager, "_master_engine", master)
+    with db_manager.get_master_session() as s:
+        s.add(Client(name="Existing", code="L001"))
+        s.commit()
+    yield tmp_path
+
+
+@pytest.fixture
+def legacy_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'kaikei.db'}"
+    engine = create_engine(url)
+    legacy.Base.metadata.create_all(engine)
+    with Session(engine) as s:
+        s.add_all([
+            legacy.Account(id=1, code="101", name="現金", type="asset"),
+            legacy.Account(id=2, code="601", name="消耗品費", type="expense"),
+            legacy.Client(id=1, name="Existing", code="L001"),
+            legacy.Client(id=2, name="New", code="L002", api_key="k2"),
+        ])
+        s.add_all([
+            legacy.Journal(date=date(2024, 1, 1 + i % 28), client_id=1 + i % 3 if i % 3 < 2 else None,
+                           debit_account_id=2 if i % 50 else 99, credit_account_id=1, amount=100.25 + i,
+                           summary=f"row {i}", tax_type="課税10%")
+            for i in range(1000)
+        ])
+        s.commit()
+    engine.dispose()
+    return url
+
+
+def _migrated(code):
+    db = db_manager.get_session_for_client(code)
+    try:
+        return db.query(JournalEntry).filter(JournalEntry.legacy_id.isnot(None)).order_by(JournalEntry.legacy_id).all()
+    finally:
+        db.close()
+
+
+def test_migrates_verifies_and_resumes(legacy_url, monkeypatch):
+    real_insert, calls = legacy_migration.insert, []
+
+    def failing_insert(table):
+        calls.append(table)
+        if len(calls) == 3:
+            raise RuntimeError("disk full")
+        return real_insert(table)
+
+    monkeypatch.setattr(legacy_migration, "insert", failing_insert)
+    report = legacy_migration.run_migration(legacy_url, clients=["L001"], batch_size=100, workers=1)
+    assert not report["ok"] and "disk full" in report["tenants"]["L001"]["error"]
+    assert len(_migrated("L001")) == 200
+
+    monkeypatch.setattr(legacy_migration, "insert", real_insert)
+    report = legacy_migration.run_migration(legacy_url, unassigned="L001", batch_size=100, workers=2)
+    assert report["ok"] and report["unassigned_left_behind"] == 0
+    assert report["tenants"]["L001"]["streams"]["legacy_journals"]["resumed_after_id"] > 0
+    assert report["tenants"]["L001"]["verify"]["migrated"]["rows"] == 667
+    assert report["tenants"]["L002"]["verify"]["migrated"]["rows"] == 333
+
+    rows = _migrated("L002")
+    assert rows[0].debit_account == "消耗品費" and rows[0].credit_account == "現金" and rows[0].tax_type == "課税10%"
+    unknown = [r for r in rows if r.debit_account is None]
+    assert unknown and not any(r.reviewed for r in unknown)
+    with db_manager.get_master_session() as s:
+        assert s.query(Client).filter(Client.code == "L002").one().api_key == "k2"
+    db = db_manager.get_session_for_client("L002")
+    assert db.get(MigrationCheckpoint, "legacy_journals").rows == 333
+    db.close()
+    assert account_resolver.get_resolver("L002").resolve("消耗品費") is not None
+
+    # New legacy rows are picked up by a re-run; nothing is copied twice
+    engine = create_engine(legacy_url)
+    with Session(engine) as s:
+        s.add(legacy.Journal(date=date(2024, 2, 1), client_id=2, debit_account_id=2, credit_account_id=1, amount=5))
+        s.commit()
+    engine.dispose()
+    report = legacy_migration.run_migration(legacy_url, unassigned="L001")
+    assert report["ok"] and report["tenants"]["L002"]["copied"] == 1 and report["tenants"]["L001"]["copied"] == 0
+
+
+def test_verification_catches_drift(legacy_url):
+    legacy_migration.run_migration(legacy_url, clients=["L002"])
+    db = db_manager.get_session_for_client("L002")
+    db.query(JournalEntry).filter(JournalEntry.legacy_id == 2).one().amount += 1
+    db.commit()
+    db.close()
+    report = legacy_migration.run_migration(legacy_url, clients=["L002"], verify_only=True)
+    assert not report["ok"]
+    assert report["tenants"]["L002"]["verify"]["legacy"]["rows"] == report["tenants"]["L002"]["verify"]["migrated"]["rows"]
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+
+from backend import account_resolver, db_manager, duplicate_index, llm_trainer, maintenance, txn_classifier
+from backend.models_base import Base
+from backend.models_client import Client
+from backend.models_journal import CorrectionHistory, JournalEntry
+from backend.models_maintenance import MaintenanceRun
+
+
+@pytest.fixture(autouse=True)
+def tenants(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(account_resolver, "_resolvers", {})
+    monkeypatch.setattr(txn_classifier, "_classifiers", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    master = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    monkeypatch.setattr(db_manager, "_master_engine", master)
+    with db_manager.get_master_session() as s:
+        s.add_all([Client(name="Busy", code="M001"), Client(name="Dormant", code="M002")])
+        s.commit()
+    db = db_manager.get_session_for_client("M001")
+    e1 = JournalEntry(date=date(2024, 4, 3), summary="アマゾン", amount=1200, debit_account="消耗品費", credit_account="未払金")
+    e2 = JournalEntry(date=date(2024, 4, 20), summary="アマゾン", amount=800, debit_account="消耗品費", credit_account="普通預金")
+    db.add_all([e1, e2])
+    db.flush()
+    db.add_all([
+        CorrectionHistory(entry_id=e1.id, new_debit="備品", new_credit="未払金", reason="old"),
+        CorrectionHistory(entry_id=e2.id, new_debit="消耗品費", new_credit="普通預金", reason="new"),
+    ])
+    db.commit()
+    db.close()
+    yield tmp_path
+
+
+def test_runs_active_tenants_with_history(monkeypatch):
+    summary = maintenance.run_maintenance()
+    assert [s["job"] for s in summary] == ["warm_caches", "compact_examples", "purge_idempotency", "archive_years", "optimize_db"]
+    # M002 never had a DB written, so it is not active
+    assert all(s["tenants"] == 1 and s["ok"] == 1 for s in summary)
+    assert "M001" in txn_classifier._classifiers and "M001" in duplicate_index._indexes
+
+    examples = json.loads(llm_trainer.generate_client_examples("M001"))
+    assert [e["reviewer_reason"] for e in examples] == ["new"]
+
+    with db_manager.get_master_session() as s:
+        runs = s.query(MaintenanceRun).filter(MaintenanceRun.client_code == "M001").all()
+        assert {r.job for r in runs} == set(maintenance.JOBS) and all(r.status == "ok" for r in runs)
+
+    # Maintenance's own writes do not make the tenant look active again
+    with db_manager.get_master_session() as s:
+        s.query(Client).filter(Client.code == "M001").one().last_activity_at = None
+        s.commit()
+    assert maintenance.active_tenants() == []
+
+
+def test_budget_and_failures_are_recorded(monkeypatch):
+    calls = []
+
+    def flaky(code, budget):
+        calls.append(code)
+        raise RuntimeError("boom")
+
+    job = maintenance.MaintenanceJob("flaky", flaky, 1, 0.0)
+    result = maintenance.run_job(job, ["M001", "M002"])
+    # Zero budget: nothing runs, the remainder is recorded as skipped
+    assert calls == [] and result["skipped"] == 2
+
+    job.budget_seconds = 60
+    result = maintenance.run_job(job, ["M001"])
+    assert result["failed"] == 1
+    with db_manager.get_master_session() as s:
+        statuses = [r.status for r in s.query(MaintenanceRun).filter(MaintenanceRun.job == "flaky").order_by(MaintenanceRun.id)]
+    assert statuses == ["skipped", "error"]
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend import db_manager, duplicate_index, read_model
+from backend import models as legacy
+from backend.api.journal import JournalRead
+from backend.main import app
+from backend.models_base import Base
+from backend.models_client import Client
+from backend.models_journal import JournalEntry
+
+
+@pytest.fixture(autouse=True)
+def tenant(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    master = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    monkeypatch.setattr(db_manager, "_master_engine", master)
+    with db_manager.get_master_session() as s:
+        s.add(Client(name="Read", code="R001", api_key="r-key"))
+        s.commit()
+    db = db_manager.get_session_for_client("R001")
+    db.add_all([
+        JournalEntry(date=date(2026, 10, 1), summary="コピー用紙", amount=1980.5, debit_account="消耗品費",
+                     credit_account="現金", confidence=0.91, reviewed=None, tax_type="課税仕入10%"),
+        JournalEntry(date=date(2026, 10, 2), summary="電気代", amount=8000, debit_account="水道光熱費",
+                     credit_account="普通預金", reviewed=True, pdf_path="/scans/a.pdf"),
+    ])
+    db.commit()
+    db.close()
+    yield tmp_path
+
+
+def test_list_matches_pydantic_shape(monkeypatch):
+    client = TestClient(app)
+    body = client.get("/api/journal/", headers={"X-Client-Key": "r-key"}).json()
+    assert [r["id"] for r in body] == [2, 1]
+    db = db_manager.get_session_for_client("R001")
+    expected = [
+        json.loads(JournalRead(id=r.id, date=r.date, summary=r.summary, amount=r.amount, debit_account=r.debit_account,
+                               credit_account=r.credit_account, confidence=r.confidence, ai_reason=r.ai_reason,
+                               reviewed=bool(r.reviewed), pdf_path=r.pdf_path, document_sha256=r.document_sha256,
+                               tax_type=r.tax_type).json())
+        for r in db.query(JournalEntry).order_by(JournalEntry.id.desc())
+    ]
+    db.close()
+    assert body == expected
+
+    # The stdlib fallback encodes the same document
+    rows = read_model.journal_rows("R001")
+    fast = read_model.dumps(rows)
+    monkeypatch.setattr(read_model, "orjson", None)
+    assert json.loads(read_model.dumps(rows)) == json.loads(fast) == expected
+
+
+def test_legacy_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'kaikei.db'}")
+    legacy.Base.metadata.create_all(engine)
+    with Session(engine) as s:
+        s.add_all([legacy.Account(id=1, code="101", name="現金", type="asset"),
+                   legacy.Account(id=2, code="601", name="消耗品費", type="expense"),
+                   legacy.Client(id=1, name="L", code="L1")])
+        s.add_all([legacy.Journal(date=date(2024, 1, d), client_id=1, debit_account_id=2, credit_account_id=1,
+                                  amount=d * 100, summary=f"d{d}") for d in (3, 9, 5)])
+        s.add(legacy.Journal(date=date(2024, 1, 1), client_id=None, debit_account_id=2, credit_account_id=1, amount=1))
+        s.commit()
+        rows = read_model.legacy_journal_rows(s, 1)
+        assert [(r.date, r.amount) for r in rows] == [("2024-01-09", 900), ("2024-01-05", 500), ("2024-01-03", 300)]
+        assert [a.code for a in read_model.legacy_account_rows(s)] == ["101", "601"]
+        assert json.loads(read_model.dumps(rows[:1])) == [{"id": 2, "date": "2024-01-09", "debit_account_id": 2,
+                                                           "credit_account_id": 1, "amount": 900.0,
+                                                           "summary": "d9", "tax_type": None}]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import random
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from backend import db_manager
+from backend.models_bank import BankTransaction
+from backend.models_journal import JournalEntry
+from backend.reconcile import decide_match, make_item, match_items, run_reconciliation
+
+
+@pytest.fixture(autouse=True)
+def tenant_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    yield tmp_path
+
+
+def test_exact_prefers_vendor_and_date():
+    bank = [make_item("bank", 1, date(2024, 3, 10), -5500, "カード スターバックス")]
+    journal = [
+        make_item("journal", 10, date(2024, 3, 9), 5500, "ローソン"),
+        make_item("journal", 11, date(2024, 3, 8), 5500, "スターバックス"),
+        make_item("journal", 12, date(2024, 3, 30), 5500, "スターバックス"),
+    ]
+    (p,) = match_items(bank, journal, tolerance=5, min_score=0.3)
+    assert p.method == "exact"
+    assert [j.id for j in p.journal] == [11]
+
+
+def test_split_payment_both_directions():
+    bank = [
+        make_item("bank", 1, date(2024, 4, 1), -33000, "振込 アスクル"),
+        make_item("bank", 2, date(2024, 4, 20), -4000, "振込 ヤマト"),
+        make_item("bank", 3, date(2024, 4, 21), -6000, "振込 ヤマト"),
+    ]
+    journal = [
+        make_item("journal", 10, date(2024, 3, 30), 11000, "アスクル"),
+        make_item("journal", 11, date(2024, 3, 31), 22000, "アスクル"),
+        make_item("journal", 12, date(2024, 4, 2), 7000, "アスクル"),
+        make_item("journal", 13, date(2024, 4, 19), 10000, "ヤマト運輸"),
+    ]
+    proposals = {frozenset(r for r in p.refs): p for p in match_items(bank, journal, tolerance=5, min_score=0.3)}
+    assert frozenset({("bank", 1), ("journal", 10), ("journal", 11)}) in proposals
+    assert frozenset({("bank", 2), ("bank", 3), ("journal", 13)}) in proposals
+    assert all(p.method == "split" for p in proposals.values())
+
+
+def test_persisted_confirm_and_reject():
+    db = db_manager.get_session_for_client("R001")
+    db.add_all([
+        BankTransaction(provider="p", account_ref="a", provider_txn_id="1", date=date(2024, 5, 1),
+                        amount=-1200, description="カード アマゾン"),
+        BankTransaction(provider="p", account_ref="a", provider_txn_id="2", date=date(2024, 5, 3),
+                        amount=-880, description="カード ローソン"),
+        JournalEntry(date=date(2024, 4, 30), summary="アマゾン", amount=1200, debit_account="消耗品費", credit_account="未払金"),
+        JournalEntry(date=date(2024, 5, 3), summary="ローソン", amount=880, debit_account="会議費", credit_account="未払金"),
+    ])
+    db.commit()
+    db.close()
+
+    assert run_reconciliation("R001")["exact"] == 2
+    # Re-running replaces proposals rather than piling them up
+    assert run_reconciliation("R001")["proposed"] == 2
+
+    from backend.models_reconcile import ReconcileMatch
+    db = db_manager.get_session_for_client("R001")
+    first, second = [m.id for m in db.query(ReconcileMatch).order_by(ReconcileMatch.id)]
+    db.close()
+    assert decide_match("R001", first, confirm=True).status == "confirmed"
+    assert decide_match("R001", second, confirm=False).status == "rejected"
+    with pytest.raises(ValueError):
+        decide_match("R001", second, confirm=True)
+
+    # Confirmed lines are out of the pool and the rejected pair is not proposed again
+    result = run_reconciliation("R001")
+    assert result["proposed"] == 0
+    assert (result["unmatched_bank"], result["unmatched_journal"]) == (1, 1)
+
+
+def test_year_of_transactions_is_fast():
+    rng = random.Random(7)
+    vendors = [f"取引先{i}" for i in range(300)]
+    start = date(2024, 1, 1)
+    bank, journal = [], []
+    for i in range(15_000):
+        day = start + timedelta(days=rng.randrange(365))
+        amount = rng.randrange(100, 200_000)
+        vendor = rng.choice(vendors)
+        journal.append(make_item("journal", i, day, amount, vendor))
+        if rng.random() < 0.9:
+            bank.append(make_item("bank", i, day + timedelta(days=rng.randrange(3)), -amount, f"振込 {vendor}"))
+    started = time.perf_counter()
+    proposals = match_items(bank, journal, tolerance=5, min_score=0.3)
+    elapsed = time.perf_counter() - started
+    assert len(proposals) >= len(bank) * 0.95
+    assert elapsed < 1.0
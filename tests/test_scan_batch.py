@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import pytest
+
+from backend import account_resolver, auto_journal_scan, db_manager, duplicate_index
+from backend.auto_journal_scan import iter_scansnap_records, process_scansnap_xml
+from backend.models_journal import JournalEntry
+
+
+@pytest.fixture(autouse=True)
+def tenant_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    monkeypatch.setattr(account_resolver, "_resolvers", {})
+
+    def fake_classify(summary, amount, date, client_code):
+        confident = int(amount) % 2 == 0
+        return {"debit_account": "消耗品費", "credit_account": "現金", "confidence": 0.9 if confident else 0.2, "reason": ""}
+
+    monkeypatch.setattr(auto_journal_scan, "classify_with_llm", fake_classify)
+    yield tmp_path
+
+
+def _batch(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<Root>")
+        for i in range(count):
+            f.write(f"<Receipt><Date>2024-05-{i % 28 + 1:02d}</Date><Vendor>店舗{i}</Vendor><Amount>{100 + i}</Amount></Receipt>")
+        f.write("</Root>")
+
+
+def test_single_root_record_keeps_legacy_shape(tenant_dir):
+    doc = tenant_dir / "one.xml"
+    doc.write_text("<Root><Date>2024-05-01</Date><Vendor>文具店</Vendor><Amount>500</Amount></Root>", encoding="utf-8")
+    assert list(iter_scansnap_records(doc))[0]["vendor"] == "文具店"
+    result = process_scansnap_xml(doc, client_code="B001")
+    assert result["saved"] is True and result["entry"]["amount"] == 500
+
+
+def test_batch_file_reports_each_record(tenant_dir, monkeypatch):
+    monkeypatch.setattr(auto_journal_scan.settings, "scan_batch_size", 7)
+    doc = tenant_dir / "batch.xml"
+    _batch(doc, 30)
+    assert len(list(iter_scansnap_records(doc))) == 30
+
+    result = process_scansnap_xml(doc, client_code="B001")
+    assert result["batch"] is True
+    assert [r["index"] for r in result["records"]] == list(range(30))
+    assert result["saved_count"] == 15 and result["suggested_count"] == 15
+    db = db_manager.get_session_for_client("B001")
+    try:
+        assert db.query(JournalEntry).count() == 15
+    finally:
+        db.close()
+
+
+def test_bad_date_fails_only_its_record(tenant_dir):
+    doc = tenant_dir / "bad_date.xml"
+    doc.write_text(
+        "<Root>"
+        "<Receipt><Date>2024-05-01</Date><Vendor>文具店</Vendor><Amount>500</Amount></Receipt>"
+        "<Receipt><Date>2024-13-45</Date><Vendor>書店</Vendor><Amount>600</Amount></Receipt>"
+        "<Receipt><Date>2024/05/03</Date><Vendor>花屋</Vendor><Amount>700</Amount></Receipt>"
+        "<Receipt><Date>2024-05-04</Date><Vendor>薬局</Vendor><Amount>701</Amount></Receipt>"
+        "</Root>",
+        encoding="utf-8",
+    )
+    result = process_scansnap_xml(doc, client_code="B001")
+    assert [r["saved"] for r in result["records"]] == [True, False, True, False]
+    assert "error" in result["records"][1]
+    assert result["saved_count"] == 2 and result["failed_count"] == 1 and result["suggested_count"] == 1
+    db = db_manager.get_session_for_client("B001")
+    try:
+        assert db.query(JournalEntry).count() == 2
+    finally:
+        db.close()
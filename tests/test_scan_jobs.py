@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import io
+import json
+import time
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from backend import account_resolver, db_manager, duplicate_index, ingest_ledger
+from backend.main import app
+from backend.settings import settings
+from backend.models_base import Base
+from backend.models_client import Client
+
+
+@pytest.fixture(autouse=True)
+def tenant_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    monkeypatch.setattr(account_resolver, "_resolvers", {})
+    master = create_engine(f"sqlite:///{tmp_path / 'master.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=master)
+    monkeypatch.setattr(db_manager, "_master_engine", master)
+    monkeypatch.setattr(ingest_ledger, "_ledgers", {})
+    with db_manager.get_master_session() as s:
+        s.add(Client(name="Scan", code="J001", api_key="jkey"))
+        s.commit()
+
+    from utils import llm_client as llm_mod
+
+    def fake_chat(self, messages, temperature=0.0, response_format=None):
+        return json.dumps({"debit_account": "旅費交通費", "credit_account": "現金", "confidence": 0.9, "reason": "test"})
+
+    monkeypatch.setattr(llm_mod.LLMClient, "chat", fake_chat)
+    yield tmp_path
+
+
+def _xml(amount: int) -> bytes:
+    return (
+        f"<Root><Date>2024-04-01</Date><Vendor>JR東日本</Vendor><Amount>{amount}</Amount></Root>"
+    ).encode("utf-8")
+
+
+def _wait_job(client, job_id):
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/scan/jobs/{job_id}", headers={"X-Client-Key": "jkey"}).json()
+        if job["finished_at"]:
+            return job
+        time.sleep(0.05)
+    raise AssertionError("job did not finish")
+
+
+def test_upload_returns_job_and_processes_in_background():
+    client = TestClient(app)
+    res = client.post("/api/scan/import", files={"file": ("r.xml", _xml(480), "text/xml")}, headers={"X-Client-Key": "jkey"})
+    assert res.status_code == 200
+    job_id = res.json()["job_id"]
+    job = _wait_job(client, job_id)
+    assert job["status"] == "done" and job["saved"] == 1
+    assert job["items"][0]["result"]["entry"]["amount"] == 480
+
+    listed = client.get("/api/scan/jobs", headers={"X-Client-Key": "jkey"}).json()
+    assert [j["job_id"] for j in listed] == [job_id]
+    assert client.get(f"/api/scan/jobs/{job_id}", headers={"X-Client-Key": "other"}).status_code == 401
+
+    # Same content again is reported as a duplicate without reprocessing
+    res = client.post("/api/scan/import", files={"file": ("again.xml", _xml(480), "text/xml")}, headers={"X-Client-Key": "jkey"})
+    job = _wait_job(client, res.json()["job_id"])
+    assert job["items"][0]["result"]["duplicate"] is True
+
+
+def test_zip_and_multiple_files():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("batch/a.xml", _xml(100))
+        zf.writestr("../b.xml", _xml(200))
+        zf.writestr("readme.txt", "ignored")
+    client = TestClient(app)
+    res = client.post(
+        "/api/scan/import",
+        files=[
+            ("files", ("batch.zip", buf.getvalue(), "application/zip")),
+            ("files", ("c.xml", _xml(300), "text/xml")),
+        ],
+        headers={"X-Client-Key": "jkey"},
+    )
+    job = _wait_job(client, res.json()["job_id"])
+    assert sorted(i["result"]["entry"]["amount"] for i in job["items"]) == [100, 200, 300]
+
+
+def test_zip_beyond_limits_is_rejected(tenant_env, monkeypatch):
+    monkeypatch.setattr(settings, "scan_zip_max_ratio", 50)
+    bomb = io.BytesIO()
+    with zipfile.ZipFile(bomb, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("a.xml", _xml(100) + b" " * 200_000)
+    crowded = io.BytesIO()
+    with zipfile.ZipFile(crowded, "w") as zf:
+        for i in range(4):
+            zf.writestr(f"{i}.xml", _xml(100 + i))
+    monkeypatch.setattr(settings, "scan_zip_max_members", 3)
+
+    client = TestClient(app)
+    before = len(client.get("/api/scan/jobs", headers={"X-Client-Key": "jkey"}).json())
+    for name, body in (("bomb.zip", bomb.getvalue()), ("crowded.zip", crowded.getvalue()), ("bad.zip", b"PK\x03\x04junk")):
+        res = client.post("/api/scan/import", files={"file": (name, body, "application/zip")},
+                          headers={"X-Client-Key": "jkey"})
+        assert res.status_code == 400, name
+    assert len(client.get("/api/scan/jobs", headers={"X-Client-Key": "jkey"}).json()) == before
+    assert not any(p.is_file() for p in (tenant_env / settings.scan_upload_dir).rglob("*"))
+
+
+def test_metrics_and_schedule_need_a_key_and_show_only_that_client(monkeypatch):
+    from backend.api import scan_import
+
+    monkeypatch.setattr(scan_import.pool, "metrics", lambda: {"J001": {"queue_depth": 1}, "OTHER": {"queue_depth": 9}})
+    monkeypatch.setattr(
+        scan_import.scan_schedule, "snapshot", lambda: {"J001": {"folder": "/a"}, "OTHER": {"folder": "/b"}}
+    )
+    client = TestClient(app)
+    for path in ("/api/scan/metrics", "/api/scan/schedule"):
+        assert client.get(path).status_code == 422
+        assert client.get(path, headers={"X-Client-Key": "nope"}).status_code == 401
+        res = client.get(path, headers={"X-Client-Key": "jkey"})
+        assert res.status_code == 200
+        assert list(res.json()) == ["J001"]
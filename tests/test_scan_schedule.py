@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import random
+
+from backend.scan_schedule import AdaptiveScanSchedule
+from backend.scan_watcher import ScanWatcher
+
+
+def _schedule(jitter=0.0):
+    return AdaptiveScanSchedule(backoff=2.0, jitter=jitter, clock=lambda: 0.0, rng=random.Random(1))
+
+
+def test_backoff_when_idle_and_tighten_on_activity():
+    s = _schedule()
+    s.configure({"A001": ("/scans/a", 30, 600)}, now=0)
+    (t,) = s.due(now=1000)
+    assert t.client_code == "A001"
+    assert [s.record("A001", 0, now=1000 + i) for i in range(6)] == [360, 600, 600, 600, 600, 600]
+    assert s.due(now=1500) == []
+    assert s.record("A001", 3, now=1500) == 30
+    assert s.snapshot(now=1500)["A001"]["next_scan_in_seconds"] == 30
+    assert s.due(now=1529) == [] and len(s.due(now=1530)) == 1
+
+
+def test_stagger_jitter_and_reconfigure():
+    s = _schedule(jitter=0.1)
+    s.configure({f"T{i:04d}": (f"/scans/{i}", 30, 1800) for i in range(1000)}, now=0)
+    # First scans are spread over the starting interval rather than all due at once
+    early = s.due(now=18)
+    assert 0 < len(early) < 200
+
+    for t in early + s.due(now=180):
+        interval = s.record(t.client_code, 0, now=180)
+        assert interval == 360
+    due_at = sorted(v["next_scan_in_seconds"] for v in s.snapshot(now=180).values())
+    assert 324 <= due_at[0] and due_at[-1] <= 396 and due_at[0] != due_at[-1]
+
+    # Per-client bounds from the registry clamp the learned interval; removed tenants drop out
+    s.configure({"T0001": ("/scans/1", 10, 60)}, now=200)
+    assert list(s.snapshot(now=200)) == ["T0001"]
+    assert s.snapshot(now=200)["T0001"]["interval_seconds"] == 60
+    assert [t.client_code for t in s.due(now=10_000)] == ["T0001"]
+
+
+def test_activity_rescans_an_idle_tenant_sooner(tmp_path):
+    s = _schedule()
+    s.configure({"A001": (str(tmp_path), 30, 600), "B002": ("/scans/b", 30, 600)}, now=0)
+    s.due(now=1000)
+    for code in ("A001", "B002"):
+        for _ in range(4):
+            s.record(code, 0, now=1000)
+    assert s.snapshot(now=1000)["A001"]["next_scan_in_seconds"] == 600
+
+    # A file event (or an upload) for A001 pulls its next scan in; B002 stays backed off
+    watcher = ScanWatcher(handler=lambda code, path: None, mode="poll", on_activity=lambda code: s.activity(code, now=1000))
+    (tmp_path / "new.xml").write_text("<Root/>")
+    assert watcher.notify("A001", tmp_path / "new.xml")
+    assert [t.client_code for t in s.due(now=1030)] == ["A001"]
+    assert s.snapshot(now=1030)["B002"]["next_scan_in_seconds"] == 570
+
+
+def test_failed_scan_keeps_the_tenant_scheduled(monkeypatch):
+    from backend import scheduler
+
+    s = _schedule()
+    s.configure({"A001": ("/gone", 30, 600), "B002": ("/scans/b", 30, 600)}, now=0)
+    monkeypatch.setattr(s, "clock", lambda: 1000.0)
+    polled = []
+
+    def poll(folders):
+        polled.extend(folders)
+        if "A001" in folders:
+            raise OSError("share unmounted")
+        return 1
+
+    monkeypatch.setattr(scheduler, "scan_schedule", s)
+    monkeypatch.setattr(scheduler.watcher, "poll", poll)
+    scheduler.watch_scansnap_folders()
+
+    assert sorted(polled) == ["A001", "B002"]
+    snap = s.snapshot(now=1000)
+    assert snap["A001"]["idle_scans"] == 1 and snap["A001"]["next_scan_in_seconds"] > 0
+    assert snap["B002"]["interval_seconds"] == 30
+
+
+def test_scheduler_uses_the_configured_time_zone():
+    from backend import scheduler
+    from backend.settings import settings
+
+    assert str(scheduler.scheduler.timezone) == settings.scheduler_timezone
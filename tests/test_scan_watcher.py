@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from backend.scan_watcher import Observer, ScanWatcher
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_poll_debounces_and_skips_unchanged(tmp_path):
+    seen = []
+    watcher = ScanWatcher(handler=lambda code, path: seen.append((code, path.name)), mode="poll", debounce_seconds=1.0)
+    (tmp_path / "a.xml").write_text("<Root/>")
+    (tmp_path / "note.txt").write_text("x")
+
+    assert watcher.poll({"A001": str(tmp_path)}) == 1
+    now = time.monotonic()
+    assert watcher.flush_ready(now) == 0  # not yet stable
+    assert watcher.flush_ready(now + 1.5) == 1
+    assert watcher.queue.get_nowait() == ("A001", str((tmp_path / "a.xml").resolve()))
+
+    # Unchanged directory is not listed again; unchanged file is not re-queued
+    assert watcher.poll({"A001": str(tmp_path)}) == 0
+    assert watcher.notify("A001", tmp_path / "a.xml") is False
+    assert watcher.flush_ready(now + 10) == 0
+
+
+@pytest.mark.skipif(Observer is None, reason="watchdog not installed")
+def test_event_mode_processes_new_file(tmp_path):
+    seen = []
+    watcher = ScanWatcher(handler=lambda code, path: seen.append(path.name), mode="events", debounce_seconds=0.1)
+    watcher.start({"A001": str(tmp_path)})
+    try:
+        assert watcher.events_active
+        (tmp_path / "b.xml").write_text("<Root/>")
+        assert _wait_for(lambda: seen == ["b.xml"])
+    finally:
+        watcher.stop()
+
+
+def test_missing_folder_is_skipped_and_restart_keeps_working(tmp_path):
+    seen = []
+    watcher = ScanWatcher(handler=lambda code, path: seen.append(path.name), mode="poll", debounce_seconds=0.1)
+    # A folder that can be stat'ed but not listed, like a share that drops mid-scan
+    blocked = tmp_path / "blocked.xml"
+    blocked.write_text("<Root/>")
+    assert watcher.poll({"A001": str(tmp_path / "missing"), "B002": str(blocked)}) == 0
+
+    watcher.stop()  # never started: must not leave a stop sentinel behind
+    watcher.start({"A001": str(tmp_path)})
+    try:
+        (tmp_path / "c.xml").write_text("<Root/>")
+        assert watcher.poll({"A001": str(tmp_path)}) == 1
+        assert _wait_for(lambda: "c.xml" in seen)
+    finally:
+        watcher.stop()
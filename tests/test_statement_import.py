@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import time
+from datetime import date
+
+import pytest
+
+from backend import db_manager, duplicate_index, txn_classifier
+from backend.models_bank import StagedTransaction
+from backend.models_journal import JournalEntry
+from backend.models_archive import ArchivePartition
+from backend.statement_import import (
+    ArchivedPeriodError, detect_format, import_statement, parse_amount, parse_date, post_staged,
+)
+
+
+@pytest.fixture(autouse=True)
+def tenant_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_manager, "_engine_cache", {})
+    monkeypatch.setattr(txn_classifier, "_classifiers", {})
+    monkeypatch.setattr(duplicate_index, "_indexes", {})
+    yield tmp_path
+
+
+def _rows(code):
+    db = db_manager.get_session_for_client(code)
+    try:
+        return db.query(StagedTransaction).order_by(StagedTransaction.id).all()
+    finally:
+        db.close()
+
+
+def _zengin_record(io_kind: str, amount: int, payer: str, yymmdd: str = "060115") -> bytes:
+    rec = (
+        b"2" + b"00000001" + yymmdd.encode() + yymmdd.encode() + io_kind.encode() + b"11"
+        + str(amount).zfill(12).encode() + b"0" * 12 + b"0" * 12 + b" " + b"0" * 7 + b"000" + b"0" * 10
+        + payer.encode("cp932").ljust(48) + b" " * 15 + b" " * 15 + b" " * 20 + b" " * 20 + b" "
+    )
+    assert len(rec) == 200
+    return rec
+
+
+def test_parsers():
+    assert parse_date("2024/1/5") == date(2024, 1, 5)
+    assert parse_date("令和6年1月5日") == date(2024, 1, 5)
+    assert parse_date("20240105") == date(2024, 1, 5)
+    assert parse_amount("1,280円") == 1280.0
+    assert parse_amount("△500") == -500.0
+    assert detect_format(b"OFXHEADER:100\r\nDATA:OFXSGML") == "ofx"
+    assert detect_format(_zengin_record("1", 1, "X").replace(b"2", b"1", 1) + b"\r\n") == "zengin"
+    assert detect_format("日付,摘要,金額\n".encode("cp932")) == "csv"
+
+
+def test_zengin_fixed_width(tenant_dir):
+    header = b"1" + b"0" * 199
+    body = _zengin_record("1", 330000, "ｶ)ｻﾝﾌﾟﾙ") + _zengin_record("2", 8200, "ﾄｳｷﾖｳﾃﾞﾝﾘﾖｸ")
+    trailer = b"8" + b"0" * 199 + b"9" + b"0" * 199
+    path = tenant_dir / "zengin.txt"
+    path.write_bytes(header + b"\r\n" + body + trailer)
+
+    result = import_statement("Z001", path)
+    assert result["format"] == "zengin" and result["rows"] == 2
+    rows = _rows("Z001")
+    assert [(r.date, r.amount) for r in rows] == [(date(2024, 1, 15), 330000.0), (date(2024, 1, 15), -8200.0)]
+    assert rows[0].description == "ｶ)ｻﾝﾌﾟﾙ"
+
+    # Same file again is not staged twice
+    assert import_statement("Z001", path)["duplicate"] is True
+    assert len(_rows("Z001")) == 2
+
+
+def test_csv_with_preamble_and_classification(tenant_dir):
+    db = db_manager.get_session_for_client("C001")
+    db.add(JournalEntry(date=date(2023, 12, 1), summary="東京電力", amount=8000,
+                        debit_account="水道光熱費", credit_account="普通預金"))
+    db.commit()
+    db.close()
+    text = (
+        "口座番号,1234567\n"
+        "照会期間,2024/01/01～2024/01/31\n"
+        "日付,摘要,お引出し（円）,お預入れ（円）,差引残高（円）\n"
+        "2024/01/05,口座振替 東京電力,\"8,200\",,\"91,800\"\n"
+        "2024/01/25,振込 カ）サンプル,,\"330,000\",\"421,800\"\n"
+        "合計,,\"8,200\",\"330,000\",\n"
+    )
+    path = tenant_dir / "bank.csv"
+    path.write_bytes(text.encode("cp932"))
+
+    assert import_statement("C001", path)["rows"] == 2
+    rows = _rows("C001")
+    assert [(r.amount, r.balance) for r in rows] == [(-8200.0, 91800.0), (330000.0, 421800.0)]
+    assert (rows[0].debit_account, rows[0].credit_account) == ("水道光熱費", "普通預金")
+    assert rows[1].debit_account is None
+
+    assert post_staged("C001", rows[0].import_id) == {"posted": 1, "skipped": 1, "duplicates": []}
+    assert [r.status for r in _rows("C001")] == ["posted", "pending"]
+
+
+def test_ofx_sgml_on_one_line(tenant_dir):
+    ofx = (
+        "OFXHEADER:100\nDATA:OFXSGML\nENCODING:USASCII\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>"
+        "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240105120000[+9:JST]<TRNAMT>-1280<FITID>A1<NAME>AMAZON"
+        "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240110<TRNAMT>5000<FITID>A2<NAME>REFUND<MEMO>RETURN"
+        "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"
+    )
+    path = tenant_dir / "card.ofx"
+    path.write_text(ofx, encoding="ascii")
+
+    assert import_statement("O001", path)["rows"] == 2
+    rows = _rows("O001")
+    assert [(r.date, r.amount, r.description) for r in rows] == [
+        (date(2024, 1, 5), -1280.0, "AMAZON"),
+        (date(2024, 1, 10), 5000.0, "REFUND RETURN"),
+    ]
+
+
+def test_large_csv_imports_quickly(tenant_dir):
+    path = tenant_dir / "large.csv"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("取引日,お取引内容,出金金額,入金金額,残高\n")
+        for i in range(100_000):
+            f.write(f"2024/{1 + i % 12}/{1 + i % 28},カード ショップ{i % 500},{i % 9000 + 100},,\n")
+    started = time.perf_counter()
+    assert import_statement("L001", path)["rows"] == 100_000
+    assert time.perf_counter() - started < 30
+
+
+def _staged_csv(tenant_dir, name, lines):
+    text = "日付,摘要,お引出し（円）,お預入れ（円）,差引残高（円）\n" + "".join(lines)
+    path = tenant_dir / name
+    path.write_bytes(text.encode("cp932"))
+    import_id = import_statement("C001", path)["import_id"]
+    db = db_manager.get_session_for_client("C001")
+    try:
+        for r in db.query(StagedTransaction).filter(StagedTransaction.import_id == import_id):
+            r.debit_account, r.credit_account = "消耗品費", "普通預金"
+        db.commit()
+    finally:
+        db.close()
+    return import_id
+
+
+def test_post_skips_lines_already_booked_from_scans(tenant_dir):
+    db = db_manager.get_session_for_client("C001")
+    db.add(JournalEntry(date=date(2024, 2, 5), summary="文具店", amount=1200, debit_account="消耗品費",
+                        credit_account="現金"))
+    db.commit()
+    scanned_id = db.query(JournalEntry.id).scalar()
+    db.close()
+    import_id = _staged_csv(tenant_dir, "feb.csv", ["2024/02/06,文具店,\"1,200\",,\"10,000\"\n",
+                                                    "2024/02/07,書店,800,,\"9,200\"\n"])
+
+    result = post_staged("C001", import_id)
+    assert result["posted"] == 1
+    assert [d["duplicate_of"] for d in result["duplicates"]] == [[scanned_id]]
+    assert [r.status for r in _rows("C001")] == ["pending", "posted"]
+    assert post_staged("C001", import_id, allow_duplicates=True)["posted"] == 1
+
+
+def test_post_rejects_archived_fiscal_year(tenant_dir):
+    import_id = _staged_csv(tenant_dir, "old.csv", ["2023/03/10,書店,800,,\"9,200\"\n"])
+    db = db_manager.get_session_for_client("C001")
+    db.add(ArchivePartition(fiscal_year=2022, start_date=date(2022, 4, 1), end_date=date(2023, 4, 1),
+                            path=str(tenant_dir / "fy2022.db")))
+    db.commit()
+    db.close()
+
+    with pytest.raises(ArchivedPeriodError):
+        post_staged("C001", import_id)
+    assert [r.status for r in _rows("C001")] == ["pending"]
@@ -2,7 +2,9 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Awaitable, TypeVar
+import json
+import uuid
+from typing import Any, Callable
 
 import httpx
 from PyQt6.QtCore import QDate
@@ -11,6 +13,7 @@ from PyQt6.QtWidgets import (
     QDateEdit,
     QFormLayout,
     QHBoxLayout,
+    QLabel,
     QMessageBox,
     QPushButton,
     QTableWidget,
@@ -19,43 +22,91 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from utils import wire_format
+from utils.async_worker import AsyncTask, AsyncWorker
+
 
 class JournalAPIClient:
-    """Async HTTP client used by the UI to communicate with FastAPI."""
+    """Async HTTP client used by the UI to communicate with FastAPI.
+
+    One pooled ``httpx.AsyncClient`` is opened on first use and reused for every
+    request, so it must always be awaited on the same event loop (the window's
+    :class:`~utils.async_worker.AsyncWorker`). Close it with :meth:`aclose`.
+    """
 
-    def __init__(self, base_url: str, client_key: str | None = None) -> None:
+    def __init__(self, base_url: str, client_key: str | None = None, timeout: float = 10.0) -> None:
         self.base_url = base_url.rstrip("/")
         self.client_key = client_key
-
-    def _headers(self) -> dict[str, str]:
+        self.cache = wire_format.ETagCache()
+        self.timeout = timeout
+        self._http: httpx.AsyncClient | None = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout, limits=httpx.Limits(max_connections=8, max_keepalive_connections=4)
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def _headers(self, accept: str | None = None) -> dict[str, str]:
         headers: dict[str, str] = {}
         if self.client_key:
             headers["X-Client-Key"] = self.client_key
+        if accept:
+            headers["Accept"] = accept
         return headers
 
+    async def _get_list(self, url: str) -> list[dict[str, Any]]:
+        headers = {**self._headers(wire_format.ACCEPT), **self.cache.headers(url, self.client_key)}
+        response = await self.http.get(url, headers=headers)
+        return self.cache.resolve(url, self.client_key, response)
+
     async def list_accounts(self) -> list[dict[str, Any]]:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/api/accounts", headers=self._headers())
-            response.raise_for_status()
-            return response.json()
+        return await self._get_list(f"{self.base_url}/api/accounts")
 
-    async def create_journal(self, entry: dict[str, Any]) -> dict[str, Any]:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.base_url}/api/journal", json=entry, headers=self._headers())
+    async def list_journals(self) -> list[dict[str, Any]]:
+        return await self._get_list(f"{self.base_url}/api/journal")
+
+    async def create_journal(
+        self, entry: dict[str, Any], idempotency_key: str | None = None, retries: int = 2
+    ) -> dict[str, Any]:
+        """POST one entry, retrying network errors with the same ``Idempotency-Key`` so it is booked once."""
+        headers = {**self._headers(), "Idempotency-Key": idempotency_key or uuid.uuid4().hex}
+        for attempt in range(retries + 1):
+            try:
+                response = await self.http.post(f"{self.base_url}/api/journal", json=entry, headers=headers)
+            except httpx.TransportError:
+                if attempt == retries:
+                    raise
+                await asyncio.sleep(0.5 * (attempt + 1))
+                continue
+            if response.status_code == 409 and "retry-after" in response.headers and attempt < retries:
+                # The first attempt is still being processed on the server
+                await asyncio.sleep(float(response.headers["retry-after"]))
+                continue
             response.raise_for_status()
             return response.json()
-
-
-T = TypeVar("T")
+        raise RuntimeError("unreachable")
 
 
 class JournalEntryWidget(QWidget):
     COLUMN_HEADERS = ["日付", "借方科目", "貸方科目", "金額", "摘要", "税区分"]
 
-    def __init__(self, api_base_url: str) -> None:
+    def __init__(self, api_base_url: str, worker: AsyncWorker | None = None) -> None:
         super().__init__()
         self.api_client = JournalAPIClient(api_base_url)
+        # Requests run on the worker's loop; results come back as signals, so the window never blocks
+        self._owns_worker = worker is None
+        self.worker = worker or AsyncWorker(self)
         self.accounts: list[dict[str, Any]] = []
+        self._idempotency_keys: dict[str, str] = {}
+        self._save_task: AsyncTask | None = None
 
         self.table = QTableWidget(0, len(self.COLUMN_HEADERS))
         self.table.setHorizontalHeaderLabels(self.COLUMN_HEADERS)
@@ -64,15 +115,21 @@ class JournalEntryWidget(QWidget):
         self.add_button = QPushButton("行を追加")
         self.remove_button = QPushButton("選択行を削除")
         self.save_button = QPushButton("保存")
+        self.cancel_button = QPushButton("キャンセル")
+        self.cancel_button.setEnabled(False)
+        self.status_label = QLabel("")
 
         self.add_button.clicked.connect(self.add_row)
         self.remove_button.clicked.connect(self.remove_selected_rows)
         self.save_button.clicked.connect(self.save_entries)
+        self.cancel_button.clicked.connect(self.cancel_save)
 
         buttons_layout = QHBoxLayout()
         buttons_layout.addWidget(self.add_button)
         buttons_layout.addWidget(self.remove_button)
         buttons_layout.addWidget(self.save_button)
+        buttons_layout.addWidget(self.cancel_button)
+        buttons_layout.addWidget(self.status_label)
         buttons_layout.addStretch()
 
         layout = QVBoxLayout()
@@ -86,30 +143,46 @@ class JournalEntryWidget(QWidget):
         root_layout.addRow(container)
         self.setLayout(root_layout)
 
-        self._run_async(self._load_accounts())
         self.add_row()
-
-    async def _load_accounts(self) -> None:
-        try:
-            self.accounts = await self.api_client.list_accounts()
-        except httpx.HTTPError:
-            self.accounts = []
-
-    def _run_async(self, coroutine: Awaitable[T]) -> T:
-        try:
-            return asyncio.run(coroutine)
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            try:
-                return loop.run_until_complete(coroutine)
-            finally:
-                loop.close()
+        self.load_accounts()
+
+    def load_accounts(self) -> AsyncTask:
+        return self.worker.run(
+            lambda report: self.api_client.list_accounts(),
+            on_done=self._set_accounts,
+            on_error=lambda exc: self._set_accounts([]),
+        )
+
+    def _set_accounts(self, accounts: list[dict[str, Any]]) -> None:
+        self.accounts = accounts
+        # Rows added before the accounts arrived get their choices now; selections are kept
+        for row in range(self.table.rowCount()):
+            for column in (1, 2):
+                combo = self.table.cellWidget(row, column)
+                if isinstance(combo, QComboBox):
+                    selected = combo.currentData()
+                    combo.clear()
+                    self._fill_account_combobox(combo)
+                    if selected is not None:
+                        combo.setCurrentIndex(max(combo.findData(selected), 0))
+
+    def shutdown(self) -> None:
+        """Cancel a running save and close the HTTP client (and the worker, if this widget started it)."""
+        if self._save_task is not None:
+            self._save_task.cancel()
+        if self._owns_worker:
+            self.worker.shutdown(cleanup=self.api_client.aclose)
+        else:
+            self.worker.call(self.api_client.aclose(), timeout=3.0)
 
     # UI Helpers -----------------------------------------------------------------
-    def _create_account_combobox(self) -> QComboBox:
-        combo = QComboBox()
+    def _fill_account_combobox(self, combo: QComboBox) -> None:
         for account in self.accounts:
             combo.addItem(f"{account['code']} {account['name']}", account["id"])
+
+    def _create_account_combobox(self) -> QComboBox:
+        combo = QComboBox()
+        self._fill_account_combobox(combo)
         return combo
 
     def add_row(self) -> None:
@@ -175,21 +248,57 @@ class JournalEntryWidget(QWidget):
         return entry
 
     def save_entries(self) -> None:
-        entries: list[dict[str, Any]] = []
+        entries: list[tuple[int, dict[str, Any]]] = []
         for row in range(self.table.rowCount()):
             entry = self._collect_row_data(row)
             if entry:
-                entries.append(entry)
+                entries.append((row, entry))
 
         if not entries:
             QMessageBox.information(self, "保存", "保存対象の仕訳がありません。")
             return
 
-        try:
-            for entry in entries:
-                self._run_async(self.api_client.create_journal(entry))
-        except httpx.HTTPError as exc:
-            QMessageBox.critical(self, "エラー", f"仕訳の保存に失敗しました: {exc}")
-            return
-
-        QMessageBox.information(self, "保存", f"{len(entries)}件の仕訳を保存しました。")
+        # Saving again after a partial failure reuses the keys, so rows already booked are not doubled
+        keyed = []
+        for row, entry in entries:
+            content = f"{row}:{json.dumps(entry, sort_keys=True, ensure_ascii=False)}"
+            keyed.append((entry, self._idempotency_keys.setdefault(content, uuid.uuid4().hex)))
+
+        async def save(report: Callable[[Any], None]) -> int:
+            for i, (entry, key) in enumerate(keyed, 1):
+                await self.api_client.create_journal(entry, idempotency_key=key)
+                report((i, len(keyed)))
+            return len(keyed)
+
+        self._set_saving(True)
+        self._save_task = self.worker.run(
+            save,
+            on_done=self._on_saved,
+            on_error=self._on_save_failed,
+            on_progress=lambda p: self.status_label.setText(f"保存中 {p[0]}/{p[1]}"),
+            on_cancel=lambda: self._on_save_finished("保存を中断しました。"),
+        )
+
+    def cancel_save(self) -> None:
+        if self._save_task is not None:
+            self._save_task.cancel()
+
+    def _set_saving(self, saving: bool) -> None:
+        self.save_button.setEnabled(not saving)
+        self.cancel_button.setEnabled(saving)
+        self.status_label.setText("保存中…" if saving else "")
+
+    def _on_save_finished(self, message: str | None = None) -> None:
+        self._save_task = None
+        self._set_saving(False)
+        if message:
+            self.status_label.setText(message)
+
+    def _on_saved(self, count: int) -> None:
+        self._idempotency_keys.clear()
+        self._on_save_finished()
+        QMessageBox.information(self, "保存", f"{count}件の仕訳を保存しました。")
+
+    def _on_save_failed(self, exc: BaseException) -> None:
+        self._on_save_finished()
+        QMessageBox.critical(self, "エラー", f"仕訳の保存に失敗しました: {exc}")
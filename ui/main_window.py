@@ -1,8 +1,6 @@
 """PyQt6 main window containing navigation and central views."""
 from __future__ import annotations
 
-import asyncio
-
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import (
     QAction,
@@ -16,6 +14,7 @@ from PyQt6.QtWidgets import (
 )
 
 from ui.journal_entry import JournalEntryWidget
+from utils.async_worker import AsyncWorker
 from utils.settings import settings
 from ui.reports import ReportsWidget
 
@@ -32,7 +31,9 @@ class MainWindow(QMainWindow):
         self.stacked_widget = QStackedWidget()
         self.client_codes = settings.clients or []
         self.current_client_key: str | None = None
-        self.journal_widget = JournalEntryWidget(api_base_url=self.api_base_url)
+        # One background event loop for every view's HTTP requests
+        self.worker = AsyncWorker(self)
+        self.journal_widget = JournalEntryWidget(api_base_url=self.api_base_url, worker=self.worker)
         self.reports_widget = ReportsWidget()
 
         self.stacked_widget.addWidget(self.journal_widget)
@@ -79,13 +80,9 @@ class MainWindow(QMainWindow):
         self.statusBar().addWidget(status_label)
 
     def closeEvent(self, event) -> None:  # type: ignore[override]
-        # Ensure pending asyncio tasks used by the API client are closed gracefully
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = None
-        if loop and loop.is_running():
-            loop.stop()
+        # Cancel in-flight requests, close the pooled HTTP clients, then stop the worker loop
+        self.journal_widget.shutdown()
+        self.worker.shutdown()
         return super().closeEvent(event)
 
 
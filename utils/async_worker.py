@@ -0,0 +1,145 @@
+"""One asyncio loop on a background thread for the desktop windows.
+
+Widgets hand coroutines to :meth:`AsyncWorker.run` and get an :class:`AsyncTask`
+back straight away; results, errors and progress reports arrive as Qt signals
+on the GUI thread, so a save or reload never blocks the event loop of the
+window. HTTP clients created inside the worker's coroutines live on this one
+loop, which lets them keep their connection pool between requests.
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Optional, Set
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+
+_PROGRESS, _DONE, _FAILED, _CANCELLED = "progress", "done", "failed", "cancelled"
+
+
+class AsyncTask(QObject):
+    """Handle for one submitted coroutine; signals are delivered on the thread that created it."""
+
+    progress = pyqtSignal(object)
+    done = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+    # Progress and the outcome share one signal, always queued (even when emitted on the GUI thread),
+    # so they arrive in the order they were sent
+    _event = pyqtSignal(str, object)
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self._future: Optional[concurrent.futures.Future] = None
+        self._finished = False
+        self._cancel_requested = False
+        self._event.connect(self._dispatch, Qt.ConnectionType.QueuedConnection)
+
+    def report(self, value: Any) -> None:
+        """Called from the coroutine (worker thread); queued to the GUI thread."""
+        self._event.emit(_PROGRESS, value)
+
+    def cancel(self) -> bool:
+        # Only touches Python state, so it is safe after the QObject was deleted
+        if self._future is None or not self._future.cancel():
+            return False
+        # Progress the coroutine reports while it unwinds is dropped
+        self._cancel_requested = True
+        return True
+
+    def is_running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def _dispatch(self, kind: str, value: Any) -> None:
+        if self._finished:
+            return
+        if kind == _PROGRESS:
+            if not self._cancel_requested:
+                self.progress.emit(value)
+            return
+        self._finished = True
+        if kind == _CANCELLED:
+            self.cancelled.emit()
+        elif kind == _FAILED:
+            self.failed.emit(value)
+        else:
+            self.done.emit(value)
+        self.deleteLater()
+
+
+class AsyncWorker(QObject):
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self.loop = asyncio.new_event_loop()
+        self._tasks: Set[AsyncTask] = set()
+        self._thread = threading.Thread(target=self._serve, name="async-worker", daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        self.loop.close()
+
+    def run(
+        self,
+        factory: Callable[[Callable[[Any], None]], Awaitable[Any]],
+        on_done: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        on_progress: Optional[Callable[[Any], None]] = None,
+        on_cancel: Optional[Callable[[], None]] = None,
+    ) -> AsyncTask:
+        """Run ``factory(report)`` on the worker loop; ``report(value)`` emits progress to the GUI."""
+        task = AsyncTask(self)
+        for signal, slot in ((task.done, on_done), (task.failed, on_error), (task.progress, on_progress),
+                             (task.cancelled, on_cancel)):
+            if slot is not None:
+                signal.connect(slot)
+
+        async def wrapper() -> Any:
+            return await factory(task.report)
+
+        future = asyncio.run_coroutine_threadsafe(wrapper(), self.loop)
+        task._future = future
+        self._tasks.add(task)
+
+        def finished(f: concurrent.futures.Future) -> None:
+            # Runs on the worker thread, or at once on this thread if the coroutine already finished
+            # or was cancelled here
+            self._tasks.discard(task)
+            if f.cancelled():
+                task._event.emit(_CANCELLED, None)
+            elif f.exception() is not None:
+                task._event.emit(_FAILED, f.exception())
+            else:
+                task._event.emit(_DONE, f.result())
+
+        future.add_done_callback(finished)
+        return task
+
+    def call(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run ``coro`` on the worker loop and wait for it; for shutdown and tests, not GUI handlers."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def shutdown(self, cleanup: Optional[Callable[[], Awaitable[Any]]] = None, timeout: float = 3.0) -> None:
+        """Cancel running tasks, await ``cleanup`` (e.g. closing HTTP clients) and stop the loop."""
+        if not self._thread.is_alive():
+            return
+        for task in list(self._tasks):
+            task.cancel()
+
+        async def finish() -> None:
+            if cleanup is not None:
+                await cleanup()
+            pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for t in pending:
+                t.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        try:
+            self.call(finish(), timeout)
+        except (concurrent.futures.TimeoutError, RuntimeError):
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
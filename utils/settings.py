@@ -13,7 +13,6 @@ load_dotenv(BASE_DIR / ".env")
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///" + str(BASE_DIR / "kaikei.db")
-    scheduler_timezone: str = "Asia/Tokyo"
     bank_api_key: str | None = None
     card_api_key: str | None = None
     ai_model_path: str = str(BASE_DIR / "models" / "model.pkl")
@@ -0,0 +1,52 @@
+"""Minimal ``text/event-stream`` parser for the desktop clients."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+
+@dataclass
+class ServerEvent:
+    event: str = "message"
+    data: str = ""
+    id: Optional[str] = None
+    retry: Optional[int] = None
+
+
+class EventParser:
+    """Feed the stream line by line (without line endings); a complete event is returned at each blank line."""
+
+    def __init__(self) -> None:
+        self._current = ServerEvent()
+        self._data: list[str] = []
+
+    def feed(self, line: str) -> Optional[ServerEvent]:
+        if line == "":
+            current, data = self._current, self._data
+            self._current, self._data = ServerEvent(), []
+            if data:
+                current.data = "\n".join(data)
+                return current
+            return current if current.retry is not None else None
+        if line.startswith(":"):
+            return None
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "data":
+            self._data.append(value)
+        elif field == "event":
+            self._current.event = value
+        elif field == "id":
+            self._current.id = value
+        elif field == "retry" and value.isdigit():
+            self._current.retry = int(value)
+        return None
+
+
+def iter_events(lines: Iterable[str]) -> Iterator[ServerEvent]:
+    """Events from the stream's lines; comments and empty events are skipped."""
+    parser = EventParser()
+    for line in lines:
+        event = parser.feed(line)
+        if event is not None:
+            yield event
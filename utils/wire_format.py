@@ -0,0 +1,69 @@
+"""Decoding of list responses negotiated through ``Accept`` (MessagePack, NDJSON or JSON), with an ETag cache."""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Tuple
+
+import httpx
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+MSGPACK = "application/msgpack"
+NDJSON = "application/x-ndjson"
+
+# MessagePack only when this side can decode it; the server falls back to JSON for anything else
+ACCEPT = (
+    f"{MSGPACK}, {NDJSON};q=0.9, application/json;q=0.8" if msgpack is not None
+    else f"{NDJSON}, application/json;q=0.8"
+)
+
+
+def _loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def decode(response: httpx.Response) -> Any:
+    """Body of ``response`` according to its content type (transfer encoding is already undone by httpx)."""
+    content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in (MSGPACK, "application/x-msgpack") and msgpack is not None:
+        return msgpack.unpackb(response.content, raw=False)
+    if content_type == NDJSON:
+        return [_loads(line) for line in response.content.splitlines() if line.strip()]
+    return _loads(response.content)
+
+
+class ETagCache:
+    """Last decoded body per URL and client key, revalidated with ``If-None-Match``."""
+
+    def __init__(self) -> None:
+        self._entries: Dict[Tuple[str, str | None], Tuple[str, Any]] = {}
+
+    def headers(self, url: str, client_key: str | None) -> Dict[str, str]:
+        entry = self._entries.get((url, client_key))
+        return {"If-None-Match": entry[0]} if entry else {}
+
+    def resolve(self, url: str, client_key: str | None, response: httpx.Response) -> Any:
+        """Cached body on 304, otherwise the decoded response (remembered when it carries an ETag)."""
+        key = (url, client_key)
+        if response.status_code == 304 and key in self._entries:
+            return self._entries[key][1]
+        response.raise_for_status()
+        data = decode(response)
+        etag = response.headers.get("etag")
+        if etag:
+            self._entries[key] = (etag, data)
+        else:
+            self._entries.pop(key, None)
+        return data
+
+    def clear(self) -> None:
+        self._entries.clear()